@@ -1,7 +1,6 @@
+import io
 import json
 import os
-import ssl
-import urllib.request
 import uuid
 import time
 from urllib.error import HTTPError
@@ -15,17 +14,16 @@ from services import (
 )
 from services.costbook import get_cost_book
 from services.cache import get_tts_cache
+from services import http_pool
 
+ARK_API_URL = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
 
-def _build_ssl_ctx():
-    try:
-        import certifi
-        return ssl.create_default_context(cafile=certifi.where())
-    except Exception:
-        try:
-            return ssl._create_unverified_context()
-        except Exception:
-            return None
+
+def _raise_for_status(response):
+    """上游返回4xx/5xx时抛出 HTTPError"""
+    if response.status >= 400:
+        raise HTTPError(ARK_API_URL, response.status, response.reason, response.headers,
+                        io.BytesIO(response.data))
 
 
 def _get_cors_headers(request_id=None, from_cache=None, cost_estimated=None, mode=None):
@@ -71,6 +69,145 @@ def _check_origin(headers):
     return origin in allowed_list
 
 
+def _wants_stream(data, headers):
+    """流式模式：请求体 stream=true 或 Accept: text/event-stream"""
+    if data.get("stream"):
+        return True
+    return "text/event-stream" in (headers.get('Accept') or '').lower()
+
+
+def _iter_response_bytes(response):
+    """按到达顺序产出响应体字节，不等待缓冲区填满"""
+    if response.chunked:
+        yield from response.read_chunked()
+        return
+    while True:
+        data = response.read1()
+        if not data:
+            return
+        yield data
+
+
+def _iter_sse_data(response):
+    """逐行读取上游SSE响应，产出每个 data: 字段的内容"""
+    buffer = b""
+    for data in _iter_response_bytes(response):
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for raw_line in lines:
+            line = raw_line.decode("utf-8").rstrip("\r")
+            if line.startswith("data:"):
+                yield line[5:].strip()
+
+
+def _iter_ark_chunks(response):
+    """解析火山方舟流式响应，产出每个 chat.completion.chunk"""
+    for data in _iter_sse_data(response):
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+def _iter_mock_chunks(content, piece_chars=8):
+    """把模拟内容切成与火山方舟流式响应相同格式的分块"""
+    for i in range(0, len(content), piece_chars):
+        yield {"choices": [{"index": 0, "delta": {"content": content[i:i + piece_chars]}}]}
+    yield {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+
+def _send_sse_headers(request_handler, request_id, mode):
+    cors_headers = _get_cors_headers(request_id=request_id, cost_estimated=0.0, mode=mode)
+    cors_headers["Content-Type"] = "text/event-stream; charset=utf-8"
+    cors_headers["Cache-Control"] = "no-cache"
+    cors_headers["X-Accel-Buffering"] = "no"  # 避免反向代理缓冲整段响应
+    request_handler.send_response(200)
+    for key, value in cors_headers.items():
+        request_handler.send_header(key, value)
+    request_handler.end_headers()
+
+
+def _send_sse_event(request_handler, data, event=None):
+    frame = f"event: {event}\n" if event else ""
+    frame += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    request_handler.wfile.write(frame.encode("utf-8"))
+    request_handler.wfile.flush()
+
+
+def _relay_stream(request_handler, chunks, request_id, mode, start_time, provider, extra=None):
+    """
+    把流式分块以SSE转发给客户端
+
+    每个增量内容发送一个 data: {"delta": ...} 帧；结束时发送 event: done 帧，
+    内容为与非流式模式相同的 ok/choices/latency 响应，并附带首字延迟 firstTokenLatency。
+    上游中途出错时发送 event: error 帧。
+
+    Returns:
+        上游流是否完整读完
+    """
+    _send_sse_headers(request_handler, request_id, mode)
+
+    content_parts = []
+    finish_reason = None
+    usage = None
+    first_token_latency = None
+    try:
+        try:
+            for chunk in chunks:
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices") or []:
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    delta = (choice.get("delta") or {}).get("content") or ""
+                    if not delta:
+                        continue
+                    if first_token_latency is None:
+                        first_token_latency = time.time() - start_time
+                    content_parts.append(delta)
+                    _send_sse_event(request_handler, {"delta": delta})
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            error_code = "TIMEOUT_ERROR" if "timeout" in str(e).lower() else "STREAM_ERROR"
+            _send_sse_event(request_handler, {
+                "ok": False,
+                "errorCode": error_code,
+                "message": f"Stream interrupted: {e}",
+                "partialContent": "".join(content_parts),
+                "cost": 0.0,
+                "fromCache": False,
+                "requestId": request_id,
+                "provider": provider,
+                "latency": round(time.time() - start_time, 3)
+            }, event="error")
+            return False
+
+        response = {
+            "ok": True,
+            "errorCode": None,
+            "message": "Success",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(content_parts)},
+                "finish_reason": finish_reason
+            }],
+            "cost": 0.0,
+            "fromCache": False,
+            "requestId": request_id,
+            "provider": provider,
+            "latency": round(time.time() - start_time, 3),
+            "firstTokenLatency": round(first_token_latency, 3) if first_token_latency is not None else None,
+            "stream": True
+        }
+        if usage:
+            response["usage"] = usage
+        if extra:
+            response.update(extra)
+        _send_sse_event(request_handler, response, event="done")
+        return True
+    except (BrokenPipeError, ConnectionResetError):
+        # 客户端中途断开：退出后关闭上游连接，停止生成
+        return False
+
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
@@ -162,6 +299,7 @@ class handler(BaseHTTPRequestHandler):
             
             # 检查是否为干跑模式
             is_dry_run_mode = is_dry_run() or dry_run_param
+            stream_mode = _wants_stream(data, self.headers)
             
             # 参数验证
             if not prompt:
@@ -185,6 +323,12 @@ class handler(BaseHTTPRequestHandler):
             # 如果是干跑模式或测试模式，返回模拟响应
             if is_dry_run_mode or not ark_api_key or ark_api_key in ['your_ark_api_key_here', 'sk-your-real-api-key-here']:
                 latency = time.time() - start_time
+                mock_content = "这是一个测试早教故事。小熊宝宝今天学会了一个新本领——认识颜色！红红的苹果、黄黄的香蕉、绿绿的树叶..."
+                
+                if stream_mode:
+                    _relay_stream(self, _iter_mock_chunks(mock_content), request_id, mode, start_time,
+                                  provider="mock", extra={"dryRun": True} if is_dry_run_mode else None)
+                    return
                 
                 mock_response = {
                     "ok": True,
@@ -192,7 +336,7 @@ class handler(BaseHTTPRequestHandler):
                     "message": "Success" if not is_dry_run_mode else "Dry run completed successfully",
                     "choices": [{
                         "message": {
-                            "content": "这是一个测试早教故事。小熊宝宝今天学会了一个新本领——认识颜色！红红的苹果、黄黄的香蕉、绿绿的树叶..."
+                            "content": mock_content
                         }
                     }],
                     "cost": 0.0,
@@ -227,23 +371,29 @@ class handler(BaseHTTPRequestHandler):
                 "max_tokens": 5000,
                 "temperature": 0.7
             }
+            if stream_mode:
+                ark_payload["stream"] = True
+                ark_payload["stream_options"] = {"include_usage": True}
             
             req_data = json.dumps(ark_payload).encode("utf-8")
-            req = urllib.request.Request(
-                "https://ark.cn-beijing.volces.com/api/v3/chat/completions",
-                data=req_data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {ark_api_key}"
-                }
-            )
+            req_headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {ark_api_key}"
+            }
             
-            # 发送请求
-            ctx = _build_ssl_ctx()
+            # 发送请求（共享连接池，复用到火山方舟的 keep-alive 连接）
             try:
-                if ctx is not None:
-                    with urllib.request.urlopen(req, timeout=30, context=ctx) as response:
-                        response_data = response.read()
+                response = http_pool.request("POST", ARK_API_URL, body=req_data, headers=req_headers,
+                                             timeout=30, stream=stream_mode)
+                stream_completed = False
+                try:
+                    # 上游返回错误状态码时尚未发送响应头，转为 HTTPError 沿用下方的错误处理
+                    _raise_for_status(response)
+                    if stream_mode:
+                        stream_completed = _relay_stream(self, _iter_ark_chunks(response), request_id, mode,
+                                                         start_time, provider="volcengine_ark")
+                    else:
+                        response_data = response.data
                         latency = time.time() - start_time
                         
                         # 解析火山方舟API的响应并返回JSON格式
@@ -320,22 +470,12 @@ class handler(BaseHTTPRequestHandler):
                                 self.send_header(key, value)
                             self.end_headers()
                             self.wfile.write(json.dumps(wrapped_response, ensure_ascii=False).encode('utf-8'))
-                else:
-                    with urllib.request.urlopen(req, timeout=30) as response:
-                        response_data = response.read()
-                        latency = time.time() - start_time
-                        
-                        # 简化处理，直接返回原始响应
-                        self.send_response(200)
-                        cors_headers = _get_cors_headers(
-                            request_id=request_id, 
-                            cost_estimated=0.0, 
-                            mode=mode
-                        )
-                        for key, value in cors_headers.items():
-                            self.send_header(key, value)
-                        self.end_headers()
-                        self.wfile.write(response_data)
+                finally:
+                    if stream_mode and stream_completed:
+                        response.drain_conn()  # 读完结尾的空分块，连接才能放回池中复用
+                    elif stream_mode:
+                        response.close()  # 中途断开的流不能复用
+                    response.release_conn()
                         
             except HTTPError as e:
                 latency = time.time() - start_time
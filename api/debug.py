@@ -1,21 +1,36 @@
 # api/debug.py
 import json
 from http.server import BaseHTTPRequestHandler
-from .state import LAST_TTS_DEBUG_INFO # Import the shared state
+from urllib.parse import urlparse, parse_qs
+from .state import TTS_TRACES # Import the shared state
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        """
+        Recent TTS traces, newest first.
+
+        Optional filters (combined with AND): job_id, reqid, voice, outcome (ok / error); limit (default 20).
+        `data` keeps the old shape: the debug log of the newest matching trace.
+        """
+        query = parse_qs(urlparse(self.path).query)
+        filters = {name: query.get(name, [""])[0] for name in ("job_id", "reqid", "voice", "outcome")}
+        try:
+            limit = max(1, min(int(query.get("limit", ["20"])[0]), 200))
+        except ValueError:
+            limit = 20
+
+        traces = TTS_TRACES.query(limit=limit, **filters)
+
         self.send_response(200)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        
-        debug_info = {}
-        if LAST_TTS_DEBUG_INFO:
-            debug_info = LAST_TTS_DEBUG_INFO[0]
-            
+
         response = {
-            "message": "Last TTS call debug information.",
-            "data": debug_info
+            "message": "Recent TTS call debug information.",
+            "data": traces[0]["debug_log"] if traces else {},
+            "filters": {name: value for name, value in filters.items() if value},
+            "traces": traces,
+            "store": TTS_TRACES.get_stats()
         }
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8'))
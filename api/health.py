@@ -1,5 +1,7 @@
 import json
 from http.server import BaseHTTPRequestHandler
+from services.http_pool import get_pool_stats
+from services.container import CONTAINER
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -8,5 +10,5 @@ class handler(BaseHTTPRequestHandler):
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        response = {"status": "ok"}
+        response = {"status": "ok", "http_pool": get_pool_stats(), "services": CONTAINER.get_stats()}
         self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,13 @@
+from http.server import BaseHTTPRequestHandler
+from services.metrics import REGISTRY
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """Prometheus text-format metrics for the request path, upstream TTS, caches and jobs."""
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
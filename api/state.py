@@ -1,7 +1,6 @@
 # api/state.py
 # A simple in-memory store for sharing data between API handlers.
-from collections import deque
+from services.trace_store import TraceStore
 
-# Use a deque with maxlen=1 to always store only the last item.
-# This is thread-safe for single-item assignment in CPython.
-LAST_TTS_DEBUG_INFO = deque(maxlen=1)
+# Debug traces of the most recent syntheses (bounded by count and bytes, queryable via /api/debug).
+TTS_TRACES = TraceStore()
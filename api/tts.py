@@ -1,7 +1,14 @@
+import os
+import copy
 import json
+import time
+import uuid
+import base64
+import asyncio
 import traceback
 import logging
 from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import sys
 from pathlib import Path
 
@@ -10,8 +17,10 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from services import get_speech_service
+from services.synthesis import synthesize_cached, synthesize_cached_async, synthesize_segmented
+from services.costbook import get_cost_book
 from services.logger_setup import truncate_and_sample
-from .state import LAST_TTS_DEBUG_INFO # Import shared state
+from .state import TTS_TRACES # Import shared state
 
 # Get a logger for this module
 logger = logging.getLogger(__name__)
@@ -25,8 +34,9 @@ def _get_cors_headers():
     }
 
 def _sanitize_debug_log(log: dict) -> dict:
-    """Remove sensitive information from the debug log before storing."""
+    """Remove sensitive information from the debug log before storing (on a copy: coalesced requests share steps)."""
     if not log: return {}
+    log = copy.deepcopy(log)
     # Sanitize tokens from payload
     if "steps" in log and isinstance(log["steps"], list):
         for step in log["steps"]:
@@ -35,6 +45,185 @@ def _sanitize_debug_log(log: dict) -> dict:
                     step["payload"]["app"]["token"] = "***REDACTED***"
     return log
 
+def _wants_binary(request_handler) -> bool:
+    """Negotiate binary audio: `?format=binary` or an Accept header that names an audio type."""
+    query = parse_qs(urlparse(request_handler.path).query)
+    if query.get("format", [""])[0].lower() in ("binary", "wav", "audio"):
+        return True
+    accept = (request_handler.headers.get("Accept") or "").lower()
+    return "audio/" in accept
+
+def _audio_headers(trace_id: str, from_cache: bool, segment_stats: dict = None, debug_log: dict = None) -> dict:
+    """Response headers describing a synthesized clip."""
+    headers = {
+        "X-Trace-Id": trace_id,
+        "X-From-Cache": "true" if from_cache else "false",
+    }
+    if segment_stats is not None:
+        headers["X-Segments-Total"] = str(segment_stats["total"])
+        headers["X-Segments-Cached"] = str(segment_stats["from_cache"])
+    if debug_log and debug_log.get("total_duration_s"):
+        headers["X-Synthesis-Duration"] = str(debug_log["total_duration_s"])
+    return headers
+
+def send_audio_response(request_handler, audio_data: bytes, trace_id: str, from_cache: bool,
+                        segment_stats: dict = None, debug_log: dict = None):
+    """
+    Write a synthesized clip to the client.
+
+    Binary mode writes the raw WAV bytes straight to wfile and moves the debug
+    info to X-* headers; X-Trace-Id ties the response to the stored debug log.
+    Otherwise keep the original base64-in-JSON envelope.
+    """
+    headers = _audio_headers(trace_id, from_cache, segment_stats, debug_log)
+    headers.update(_get_cors_headers())
+
+    if _wants_binary(request_handler):
+        request_handler.send_response(200)
+        request_handler.send_header('Content-Type', 'audio/wav')
+        request_handler.send_header('Content-Length', str(len(audio_data)))
+        request_handler.send_header('Access-Control-Expose-Headers', ', '.join(
+            key for key in headers if key.startswith('X-')))
+        for key, value in headers.items():
+            request_handler.send_header(key, value)
+        request_handler.end_headers()
+        request_handler.wfile.write(audio_data)
+        return
+
+    # --- 统一返回JSON格式 ---
+    # 构建标准的JSON响应体（Base64编码音频）
+    response_payload = {
+        "ok": True,
+        "audio_base64": base64.b64encode(audio_data).decode('ascii'),
+        "mime_type": "audio/wav", # 明确告知前端MIME类型
+        "from_cache": from_cache,
+        "trace_id": trace_id,
+        "debug_info": debug_log
+    }
+    if segment_stats is not None:
+        response_payload["segments"] = segment_stats
+    body = json.dumps(response_payload, ensure_ascii=False).encode('utf-8')
+
+    request_handler.send_response(200)
+    request_handler.send_header('Content-Type', 'application/json; charset=utf-8')
+    request_handler.send_header('Content-Length', str(len(body)))
+    for key, value in headers.items():
+        request_handler.send_header(key, value)
+    request_handler.end_headers()
+    request_handler.wfile.write(body)
+
+def parse_tts_params(data: dict) -> dict:
+    """Extract synthesis parameters from a request body."""
+    text = data.get("text", "").strip()
+    # 长文本按句分段缓存；也可由请求显式开启/关闭
+    segment_threshold = int(os.getenv('TTS_SEGMENT_THRESHOLD', '300'))
+    return {
+        "text": text,
+        "voice_type": data.get("voice_type", "default"),
+        "emotion": data.get("emotion", "neutral"),
+        "quality": data.get("quality", "draft"),
+        "segmented": data.get("segmented", len(text) > segment_threshold),
+    }
+
+def _log_tts_request(params: dict):
+    """Log the request details."""
+    logger.info(f"TTS request received for voice '{params['voice_type']}' with text length {len(params['text'])}.")
+    logger.debug(
+        "TTS request parameters", 
+        extra={'text': params["text"], 'voice_type': params["voice_type"],
+               'emotion': params["emotion"], 'quality': params["quality"]}
+    )
+
+def _record_tts_error(params: dict, provider: str, start_time: float, error: Exception):
+    """Record the latency of a failed synthesis and keep its sanitized debug log."""
+    get_cost_book().record_latency(time.time() - start_time, error=True,
+                                   provider=provider, voice=params["voice_type"])
+    debug_log = _sanitize_debug_log(getattr(error, 'debug_log', None)) or {"error_info": str(error)}
+    TTS_TRACES.add(debug_log, params["voice_type"], "error")
+
+def _record_tts_result(params: dict, speech_service, start_time: float, audio_data: bytes, debug_log: dict,
+                       from_cache: bool, segment_stats: dict = None) -> dict:
+    """Record latency for a finished synthesis, store its sanitized debug log and build the result."""
+    voice_type = params["voice_type"]
+
+    # Latency histograms only (per provider / voice / cache hit); TTS is not booked against the budget
+    get_cost_book().record_latency(time.time() - start_time, from_cache=from_cache,
+                                   provider=speech_service.get_provider_name(), voice=voice_type)
+    
+    # Store sanitized debug info and log it
+    sanitized_log = _sanitize_debug_log(debug_log)
+    trace_id = sanitized_log.get("job_id") or f"tts-{uuid.uuid4().hex[:12]}"
+    sanitized_log["trace_id"] = trace_id
+    TTS_TRACES.add(sanitized_log, voice_type, "ok", trace_id=trace_id)
+    logger.debug("TTS synthesis successful", extra={
+        "audio_info": truncate_and_sample(audio_data, field_name="audio"),
+        "debug_log": sanitized_log
+    })
+
+    return {
+        "audio_data": audio_data,
+        "debug_log": sanitized_log,
+        "trace_id": trace_id,
+        "from_cache": from_cache,
+        "segment_stats": segment_stats,
+    }
+
+def run_tts(params: dict) -> dict:
+    """
+    Synthesize one request (cache + single-flight, segmented for long text)
+    and record its sanitized debug log.
+
+    Returns a dict with audio_data, debug_log, trace_id, from_cache and segment_stats.
+    """
+    text = params["text"]
+    voice_type = params["voice_type"]
+    emotion = params["emotion"]
+    quality = params["quality"]
+    _log_tts_request(params)
+
+    speech_service = get_speech_service()
+    start_time = time.time()
+    # Synthesize (cache + single-flight for identical concurrent requests) and get debug info
+    segment_stats = None
+    try:
+        if params["segmented"]:
+            audio_data, debug_log, segment_stats = synthesize_segmented(
+                speech_service, text, voice_type=voice_type, emotion=emotion, quality=quality
+            )
+            from_cache = segment_stats["from_cache"] == segment_stats["total"]
+        else:
+            audio_data, debug_log, from_cache = synthesize_cached(
+                speech_service, text, voice_type=voice_type, emotion=emotion, quality=quality
+            )
+    except Exception as e:
+        _record_tts_error(params, speech_service.get_provider_name(), start_time, e)
+        raise
+
+    return _record_tts_result(params, speech_service, start_time, audio_data, debug_log,
+                              from_cache, segment_stats)
+
+async def run_tts_async(params: dict, speech_service) -> dict:
+    """
+    run_tts for an asyncio adapter (unsegmented text only): the submit and the
+    polls run on the caller's event loop instead of blocking a thread. Cache and
+    cost book access take file locks and touch disk, so they run in worker threads.
+
+    Returns the same dict as run_tts.
+    """
+    _log_tts_request(params)
+    start_time = time.time()
+    try:
+        audio_data, debug_log, from_cache = await synthesize_cached_async(
+            speech_service, params["text"], voice_type=params["voice_type"],
+            emotion=params["emotion"], quality=params["quality"]
+        )
+    except Exception as e:
+        await asyncio.to_thread(_record_tts_error, params, speech_service.get_provider_name(), start_time, e)
+        raise
+
+    return await asyncio.to_thread(_record_tts_result, params, speech_service, start_time,
+                                   audio_data, debug_log, from_cache)
+
 # --- Main Handler ---
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -49,60 +238,18 @@ class handler(BaseHTTPRequestHandler):
             raw_data = self.rfile.read(content_length)
             data = json.loads(raw_data.decode("utf-8")) if raw_data else {}
 
-            # Extract parameters
-            text = data.get("text", "").strip()
-            voice_type = data.get("voice_type", "default")
-            emotion = data.get("emotion", "neutral")
-            quality = data.get("quality", "draft")
+            params = parse_tts_params(data)
 
-            if not text:
+            if not params["text"]:
                 self.send_response(400)
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
                 self.wfile.write(json.dumps({"error": "Text is required"}).encode('utf-8'))
                 return
 
-            # Log the request details
-            logger.info(f"TTS request received for voice '{voice_type}' with text length {len(text)}.")
-            logger.debug(
-                "TTS request parameters", 
-                extra={'text': text, 'voice_type': voice_type, 'emotion': emotion, 'quality': quality}
-            )
-
-            speech_service = get_speech_service()
-            # Synthesize and get debug info
-            audio_data, debug_log = speech_service.synthesize(
-                text, voice_type=voice_type, emotion=emotion, quality=quality
-            )
-            
-            # Store sanitized debug info and log it
-            sanitized_log = _sanitize_debug_log(debug_log)
-            LAST_TTS_DEBUG_INFO.append(sanitized_log)
-            logger.debug("TTS synthesis successful", extra={
-                "audio_info": truncate_and_sample(audio_data, field_name="audio"),
-                "debug_log": sanitized_log
-            })
-
-            # --- 统一返回JSON格式 ---
-            # 将二进制音频数据编码为Base64字符串
-            import base64
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-
-            # 构建标准的JSON响应体
-            response_payload = {
-                "ok": True,
-                "audio_base64": audio_base64,
-                "mime_type": "audio/wav", # 明确告知前端MIME类型
-                "debug_info": sanitized_log
-            }
-
-            # 发送标准的JSON响应
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            for key, value in _get_cors_headers().items():
-                self.send_header(key, value)
-            self.end_headers()
-            self.wfile.write(json.dumps(response_payload, ensure_ascii=False).encode('utf-8'))
+            result = run_tts(params)
+            send_audio_response(self, result["audio_data"], result["trace_id"], result["from_cache"],
+                                result["segment_stats"], result["debug_log"])
 
         except Exception as e:
             logger.error("Unhandled exception in /api/tts", exc_info=True)
@@ -112,7 +259,6 @@ class handler(BaseHTTPRequestHandler):
             debug_info = None
             if hasattr(e, 'debug_log'):
                 debug_info = _sanitize_debug_log(e.debug_log)
-                LAST_TTS_DEBUG_INFO.append(debug_info)
 
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
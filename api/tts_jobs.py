@@ -0,0 +1,126 @@
+import json
+import logging
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import sys
+from pathlib import Path
+
+# --- Project-level Imports ---
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services import get_async_speech_service
+from services.jobs import get_job_manager, JobManager, JobTableFullError
+from .tts import parse_tts_params, run_tts, run_tts_async, send_audio_response
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+JOBS_PATH = '/api/tts/jobs'
+
+# --- Helper Functions ---
+def _get_cors_headers():
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+        "Access-Control-Allow-Headers": "Content-Type, X-Auth-Token",
+        "Access-Control-Expose-Headers": "Location, Retry-After",
+    }
+
+def _send_json(request_handler, status_code: int, data: dict, headers: dict = None):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    request_handler.send_response(status_code)
+    request_handler.send_header('Content-Type', 'application/json; charset=utf-8')
+    request_handler.send_header('Content-Length', str(len(body)))
+    for key, value in _get_cors_headers().items():
+        request_handler.send_header(key, value)
+    for key, value in (headers or {}).items():
+        request_handler.send_header(key, value)
+    request_handler.end_headers()
+    request_handler.wfile.write(body)
+
+def _status_url(job_id: str) -> str:
+    return f"{JOBS_PATH}?id={job_id}"
+
+# --- Main Handler ---
+class handler(BaseHTTPRequestHandler):
+    """
+    Asynchronous TTS jobs.
+
+    POST takes the same body as /api/tts and answers 202 with a job ID right away;
+    the synthesis runs on the job manager's background executor. In prod mode,
+    unsegmented jobs run as coroutines on the job event loop (the asyncio adapter
+    with its shared poll scheduler), so hundreds can wait on the upstream at once
+    without holding a worker thread each.
+    GET ?id=<job_id> answers 202 with the job status while it is pending, and the
+    audio (same JSON / binary negotiation as /api/tts) once it is done.
+    """
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        for key, value in _get_cors_headers().items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def do_POST(self):
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            raw_data = self.rfile.read(content_length)
+            data = json.loads(raw_data.decode("utf-8")) if raw_data else {}
+
+            params = parse_tts_params(data)
+            if not params["text"]:
+                _send_json(self, 400, {"error": "Text is required"})
+                return
+
+            meta = {"voice_type": params["voice_type"], "text_length": len(params["text"])}
+            async_service = None if params["segmented"] else get_async_speech_service()
+            try:
+                if async_service is not None:
+                    job = get_job_manager().submit_async(lambda: run_tts_async(params, async_service), meta=meta)
+                else:
+                    job = get_job_manager().submit(lambda: run_tts(params), meta=meta)
+            except JobTableFullError as e:
+                _send_json(self, 503, {"error": "Service Unavailable", "message": str(e)}, {"Retry-After": "5"})
+                return
+
+            logger.info(f"TTS job {job['id']} queued for voice '{params['voice_type']}'.")
+            status_url = _status_url(job["id"])
+            _send_json(self, 202, {
+                "ok": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": status_url
+            }, {"Location": status_url})
+
+        except Exception as e:
+            logger.error("Unhandled exception in /api/tts/jobs", exc_info=True)
+            _send_json(self, 500, {"error": "Internal Server Error", "message": str(e)})
+
+    def do_GET(self):
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            job_id = query.get("id", [""])[0]
+            if not job_id:
+                _send_json(self, 400, {"error": "Query parameter 'id' is required"})
+                return
+
+            job = get_job_manager().get(job_id)
+            if job is None:
+                _send_json(self, 404, {"error": "Job not found or expired", "job_id": job_id})
+                return
+
+            status = job["status"]
+            if status == "done":
+                result = job["result"]
+                send_audio_response(self, result["audio_data"], result["trace_id"], result["from_cache"],
+                                    result["segment_stats"], result["debug_log"])
+            elif status == "error":
+                _send_json(self, 500, dict(JobManager.describe(job), ok=False))
+            else:
+                _send_json(self, 202, dict(JobManager.describe(job), ok=True, status_url=_status_url(job_id)),
+                           {"Retry-After": "1"})
+
+        except Exception as e:
+            logger.error("Unhandled exception in /api/tts/jobs", exc_info=True)
+            _send_json(self, 500, {"error": "Internal Server Error", "message": str(e)})
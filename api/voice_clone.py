@@ -1,7 +1,5 @@
 import json
 import os
-import ssl
-import urllib.request
 import base64
 import uuid
 import time
@@ -31,17 +29,6 @@ from services.logger_setup import truncate_and_sample
 logger = logging.getLogger(__name__)
 
 
-def _build_ssl_ctx():
-    try:
-        import certifi
-        return ssl.create_default_context(cafile=certifi.where())
-    except Exception:
-        try:
-            return ssl._create_unverified_context()
-        except Exception:
-            return None
-
-
 def _get_cors_headers(request_id=None, from_cache=False, cost_estimated=0.0, mode=None):
     allowed_origin = os.environ.get('ALLOWED_ORIGIN', '*')
     
@@ -251,6 +238,7 @@ class handler(BaseHTTPRequestHandler):
         # 初始化响应变量
         from_cache = False
         cost_estimated = 0.0
+        reservation_id = None
         mode = get_current_mode()
         
         try:
@@ -409,11 +397,13 @@ class handler(BaseHTTPRequestHandler):
                     logger.warning(f"Failed to estimate cost: {e}", exc_info=True)
                     cost_estimated = 0.1
                 
-                # 检查每日费用限制
+                # 检查每日费用限制：原子预留预估费用，并发请求不会同时通过检查
                 cost_book = get_cost_book()
                 daily_limit = get_daily_cost_limit()
+                if not is_dry_run_mode:
+                    reservation_id = cost_book.reserve(cost_estimated, daily_limit)
                 
-                if not is_dry_run_mode and cost_book.will_exceed_today(daily_limit):
+                if not is_dry_run_mode and reservation_id is None:
                     cors_headers = _get_cors_headers(
                         request_id=request_id, 
                         cost_estimated=cost_estimated, 
@@ -474,7 +464,10 @@ class handler(BaseHTTPRequestHandler):
                     
                     # 记录调用
                     latency = time.time() - start_time
-                    cost_book.commit(cost=cost_estimated, latency=latency, from_cache=False)
+                    cost_book.commit(cost=cost_estimated, latency=latency, from_cache=False,
+                                     provider=speech_service.get_provider_name(), voice=speaker_id,
+                                     reservation_id=reservation_id)
+                    reservation_id = None
                     
                     # 返回成功响应
                     cors_headers = _get_cors_headers(
@@ -508,7 +501,10 @@ class handler(BaseHTTPRequestHandler):
                 except Exception as clone_error:
                     # 记录错误
                     latency = time.time() - start_time
-                    cost_book.commit(cost=0.0, latency=latency, from_cache=False, error=True)
+                    cost_book.commit(cost=0.0, latency=latency, from_cache=False, error=True,
+                                     provider=speech_service.get_provider_name(), voice=speaker_id,
+                                     reservation_id=reservation_id)
+                    reservation_id = None
                     
                     # 错误分类
                     error_code = "VOICE_CLONE_ERROR"
@@ -682,7 +678,8 @@ class handler(BaseHTTPRequestHandler):
             
             try:
                 cost_book = get_cost_book()
-                cost_book.commit(cost=0.0, latency=latency, from_cache=False, error=True)
+                cost_book.commit(cost=0.0, latency=latency, from_cache=False, error=True,
+                                 reservation_id=reservation_id)
             except:
                 pass
             
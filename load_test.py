@@ -1,22 +1,42 @@
 #!/usr/bin/env python3
 """
-TTS API 负载测试脚本
-测试 TTS API 在并发请求下的性能和稳定性
+TTS API 负载测试脚本（开环）
+
+用法:
+    # 固定到达率：每秒10个请求，持续60秒
+    python load_test.py --url http://localhost:8000 --profile constant --rate 10 --duration 60
+
+    # 线性爬坡：从每秒2个升到每秒40个
+    python load_test.py --profile ramp --rate 2 --to-rate 40 --duration 120
+
+    # 阶梯：从每秒5个开始，每30秒增加5个，共6级
+    python load_test.py --profile step --rate 5 --step-rate 5 --step-seconds 30 --steps 6
+
+    # 浸泡：每秒10个持续30分钟，按分钟输出窗口统计以观察漂移
+    python load_test.py --profile soak --rate 10 --duration 1800 --window 60 --output soak.json
+
+    # 与上次结果对比
+    python load_test.py --profile constant --rate 10 --duration 60 --compare soak.json
+
+功能:
+1. 按预定到达时间发出请求（asyncio + httpx），不等待前一个请求完成，服务变慢时负载不会随之降低
+2. 延迟从"计划发出时间"算起（修正协调遗漏），同时记录从实际发出算起的服务时间
+3. 支持 constant / ramp / step / soak 四种负载曲线，按时间窗口输出到达率、吞吐量、错误和延迟分位
+4. 结果以 JSON 输出（含可合并的直方图），便于不同版本之间对比
 """
 
+import sys
 import json
-import urllib.request
-import urllib.error
 import time
-import threading
-import statistics
-import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from services.histogram import LatencyHistogram
 
-# 测试配置
-BASE_URL = "http://localhost:8003"
-CONCURRENT_USERS = 5  # 并发用户数
-REQUESTS_PER_USER = 10  # 每个用户的请求数
 TEST_TEXTS = [
     "这是第一个测试文本，用于语音合成。",
     "今天天气真好，阳光明媚。",
@@ -25,277 +45,248 @@ TEST_TEXTS = [
     "测试不同长度的文本内容。"
 ]
 VOICE_TYPES = ["zh_female_qingxin", "zh_male_chunhou"]
-RESOURCE_IDS = ["", "test-resource-1", "test-resource-2"]
-
-# 全局统计
-stats_lock = threading.Lock()
-request_stats = {
-    "total_requests": 0,
-    "successful_requests": 0,
-    "failed_requests": 0,
-    "response_times": [],
-    "error_codes": {},
-    "cache_hits": 0,
-    "cache_misses": 0
-}
-
-def make_request(text, voice_type, resource_id="", quality="draft"):
-    """发送单个 TTS 请求"""
-    start_time = time.time()
-    
-    payload = {
-        "text": text,
-        "voice_type": voice_type,
-        "quality": quality
-    }
-    
-    headers = {"Content-Type": "application/json"}
-    
-    if resource_id:
-        headers["X-Api-Resource-Id"] = resource_id
-    
-    url = f"{BASE_URL}/api/tts"
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=data, headers=headers)
-    
-    try:
-        with urllib.request.urlopen(req, timeout=60) as response:
-            response_data = response.read().decode('utf-8')
-            end_time = time.time()
-            
-            result = {
-                "success": True,
-                "status_code": response.getcode(),
-                "response_time": end_time - start_time,
-                "data": json.loads(response_data) if response_data else {},
-                "request_id": None,
-                "from_cache": False,
-                "audio_size": 0
-            }
-            
-            # 解析响应数据
-            if result["data"]:
-                result["request_id"] = result["data"].get("requestId")
-                result["from_cache"] = result["data"].get("fromCache", False)
-                audio_data = result["data"].get("data", "")
-                result["audio_size"] = len(audio_data) if audio_data else 0
-            
-            return result
-            
-    except urllib.error.HTTPError as e:
-        end_time = time.time()
-        error_data = e.read().decode('utf-8') if e.fp else ""
-        
+
+
+def build_profile(args) -> tuple:
+    """返回 (到达率函数 rate(t)，总时长秒数，默认窗口秒数)"""
+    if args.profile == 'constant':
+        return (lambda t: args.rate), args.duration, 10.0
+    if args.profile == 'ramp':
+        to_rate = args.to_rate if args.to_rate is not None else args.rate * 10
+        return (lambda t: args.rate + (to_rate - args.rate) * t / args.duration), args.duration, args.duration / 10
+    if args.profile == 'step':
+        duration = args.step_seconds * args.steps
+        return (lambda t: args.rate + args.step_rate * min(int(t // args.step_seconds), args.steps - 1)), \
+            duration, args.step_seconds
+    if args.profile == 'soak':
+        return (lambda t: args.rate), args.duration, 60.0
+    raise ValueError(f"Unknown profile: {args.profile}")
+
+
+# 累计到达数按该时间片逐段累加，片内到达率取中点值
+ARRIVAL_SLICE_S = 0.01
+
+
+def arrival_times(rate: Callable[[float], float], duration: float, poisson: bool, rng: random.Random):
+    """
+    按到达率生成计划发出时间（相对测试开始的秒数）
+
+    对累计到达数 Λ(t) = ∫rate 求反：Λ(t) 每增加一个目标量（均匀到达为1，泊松到达为指数分布）发出一个请求。
+    到达率≤0的时段不发请求，从0开始的爬坡也按曲线逐渐加压，而不是由一个极小的瞬时到达率跳过整个测试。
+    """
+    def next_target() -> float:
+        return rng.expovariate(1.0) if poisson else 1.0
+
+    t = 0.0
+    cumulative = 0.0
+    target = next_target()
+    while t < duration:
+        end = min(t + ARRIVAL_SLICE_S, duration)
+        current = max(rate((t + end) / 2), 0.0)
+        while current > 0 and cumulative + current * (end - t) >= target:
+            t += (target - cumulative) / current
+            cumulative = target
+            if t >= duration:
+                return
+            yield t
+            target += next_target()
+        cumulative += current * (end - t)
+        t = end
+
+
+class Window:
+    """一个时间窗口内（按计划发出时间归属）的统计"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.offered = 0
+        self.ok = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self, length: float) -> Dict[str, Any]:
         return {
-            "success": False,
-            "status_code": e.code,
-            "response_time": end_time - start_time,
-            "error": str(e),
-            "error_data": json.loads(error_data) if error_data else {},
-            "request_id": None
+            "start_s": round(self.start, 3),
+            "offered_rps": round(self.offered / length, 3),
+            "ok_rps": round(self.ok / length, 3),
+            "errors": self.errors,
+            "latency": self.latency.summary()
         }
-        
-    except Exception as e:
-        end_time = time.time()
+
+
+class LoadRun:
+    def __init__(self, args):
+        self.args = args
+        self.rate, self.duration, default_window = build_profile(args)
+        self.window = args.window or default_window
+        self.rng = random.Random(args.seed)
+        self.latency = LatencyHistogram()        # 从计划发出时间算起（修正协调遗漏）
+        self.service_time = LatencyHistogram()   # 从实际发出算起
+        self.windows: Dict[int, Window] = {}
+        self.status: Dict[str, int] = {}
+        self.offered = 0
+        self.ok = 0
+        self.cache_hits = 0
+        self.max_send_lag = 0.0
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+
+    def _request_body(self, index: int) -> Dict[str, Any]:
+        text = self.rng.choice(TEST_TEXTS)
+        if self.rng.random() < self.args.unique_ratio:
+            text = f"{text}（第{index}次）"  # 不同文本，绕过缓存
+        return {"text": text, "voice_type": self.rng.choice(VOICE_TYPES), "quality": "draft"}
+
+    def _window(self, intended: float) -> Window:
+        index = int(intended // self.window)
+        window = self.windows.get(index)
+        if window is None:
+            window = self.windows[index] = Window(index * self.window)
+        return window
+
+    async def _one(self, client: httpx.AsyncClient, semaphore: Optional[asyncio.Semaphore],
+                   index: int, intended_at: float, start_clock: float):
+        window = self._window(intended_at)
+        window.offered += 1
+        body = self._request_body(index)
+        headers = {"Accept": "audio/wav"}
+        if self.args.resource_id:
+            headers["X-Api-Resource-Id"] = self.args.resource_id
+
+        if semaphore is not None:
+            await semaphore.acquire()
+        sent = time.perf_counter()
+        self.in_flight += 1
+        self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+        try:
+            response = await client.post("/api/tts", json=body, headers=headers)
+            await response.aread()
+            outcome = str(response.status_code)
+            ok = response.status_code == 200
+            if ok and response.headers.get("X-From-Cache") == "true":
+                self.cache_hits += 1
+        except httpx.TimeoutException:
+            outcome, ok = "timeout", False
+        except httpx.HTTPError as e:
+            outcome, ok = type(e).__name__, False
+        finally:
+            self.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+        done = time.perf_counter()
+        latency = done - start_clock - intended_at
+        self.latency.record(latency)
+        self.service_time.record(done - sent)
+        window.latency.record(latency)
+        self.status[outcome] = self.status.get(outcome, 0) + 1
+        if ok:
+            self.ok += 1
+            window.ok += 1
+        else:
+            window.errors += 1
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        limits = httpx.Limits(max_connections=args.max_in_flight or None,
+                              max_keepalive_connections=args.max_in_flight or 100)
+        semaphore = asyncio.Semaphore(args.max_in_flight) if args.max_in_flight else None
+        tasks: List[asyncio.Task] = []
+        started_at = time.time()
+
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            start_clock = time.perf_counter()
+            for index, intended in enumerate(arrival_times(self.rate, self.duration, args.poisson, self.rng)):
+                delay = start_clock + intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # 调度延迟：事件循环被占用时实际发出晚于计划，延迟仍从计划时间算起
+                self.max_send_lag = max(self.max_send_lag, time.perf_counter() - start_clock - intended)
+                self.offered += 1
+                tasks.append(asyncio.create_task(self._one(client, semaphore, index, intended, start_clock)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start_clock
+
+        return self._report(started_at, elapsed)
+
+    def _report(self, started_at: float, elapsed: float) -> Dict[str, Any]:
+        config = {key: value for key, value in vars(self.args).items() if key not in ('output', 'compare')}
+        config["window"] = self.window
+        windows = []
+        for index in sorted(self.windows):
+            window = self.windows[index]
+            length = min(self.window, self.duration - window.start)
+            windows.append(window.to_dict(length))
         return {
-            "success": False,
-            "status_code": 0,
-            "response_time": end_time - start_time,
-            "error": str(e),
-            "request_id": None
+            "tool": "load_test",
+            "version": 2,
+            "config": config,
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started_at)),
+            "elapsed_s": round(elapsed, 3),
+            "offered": self.offered,
+            "ok": self.ok,
+            "success_rate": round(self.ok / self.offered, 4) if self.offered else 0.0,
+            "offered_rps": round(self.offered / self.duration, 3),
+            "ok_rps": round(self.ok / elapsed, 3) if elapsed else 0.0,
+            "status": dict(sorted(self.status.items())),
+            "cache_hits": self.cache_hits,
+            "max_send_lag_s": round(self.max_send_lag, 6),
+            "max_in_flight": self.max_in_flight_seen,
+            "latency": self.latency.summary(),
+            "service_time": self.service_time.summary(),
+            "windows": windows,
+            "histograms": {"latency": self.latency.to_dict(), "service_time": self.service_time.to_dict()}
         }
 
-def update_stats(result):
-    """更新全局统计信息"""
-    with stats_lock:
-        stats = request_stats
-        stats["total_requests"] += 1
-        stats["response_times"].append(result["response_time"])
-        
-        if result["success"]:
-            stats["successful_requests"] += 1
-            
-            # 缓存统计
-            if result.get("from_cache"):
-                stats["cache_hits"] += 1
-            else:
-                stats["cache_misses"] += 1
-        else:
-            stats["failed_requests"] += 1
-            
-            # 错误码统计
-            error_code = result.get("status_code", 0)
-            if error_code in stats["error_codes"]:
-                stats["error_codes"][error_code] += 1
-            else:
-                stats["error_codes"][error_code] = 1
-
-def worker_thread(worker_id, requests_count):
-    """工作线程函数"""
-    print(f"Worker {worker_id} 开始执行 {requests_count} 个请求")
-    
-    results = []
-    
-    for i in range(requests_count):
-        # 随机选择测试参数
-        import random
-        text = random.choice(TEST_TEXTS)
-        voice_type = random.choice(VOICE_TYPES)
-        resource_id = random.choice(RESOURCE_IDS)
-        
-        print(f"Worker {worker_id} 请求 {i+1}/{requests_count}: text_len={len(text)}, voice={voice_type}, resource={'yes' if resource_id else 'no'}")
-        
-        result = make_request(text, voice_type, resource_id)
-        result["worker_id"] = worker_id
-        result["request_index"] = i + 1
-        
-        results.append(result)
-        update_stats(result)
-        
-        # 请求间隔（避免过于密集）
-        time.sleep(0.1)
-    
-    print(f"Worker {worker_id} 完成所有请求")
-    return results
-
-def print_progress():
-    """打印进度信息"""
-    while True:
-        time.sleep(2)
-        with stats_lock:
-            total = request_stats["total_requests"]
-            success = request_stats["successful_requests"]
-            failed = request_stats["failed_requests"]
-            
-            if total == 0:
-                continue
-                
-            print(f"\r进度: {total}/{CONCURRENT_USERS * REQUESTS_PER_USER} 请求 | 成功: {success} | 失败: {failed}", end="", flush=True)
-            
-            # 检查是否完成
-            if total >= CONCURRENT_USERS * REQUESTS_PER_USER:
-                break
-
-def calculate_statistics():
-    """计算并打印统计信息"""
-    stats = request_stats
-    
-    if not stats["response_times"]:
-        print("没有收集到响应时间数据")
-        return
-    
-    response_times = stats["response_times"]
-    
-    print(f"\n{'='*60}")
-    print(f"负载测试结果统计")
-    print(f"{'='*60}")
-    
-    # 基本统计
-    print(f"总请求数: {stats['total_requests']}")
-    print(f"成功请求: {stats['successful_requests']}")
-    print(f"失败请求: {stats['failed_requests']}")
-    print(f"成功率: {stats['successful_requests']/stats['total_requests']*100:.1f}%")
-    
-    # 缓存统计
-    total_cache_requests = stats['cache_hits'] + stats['cache_misses']
-    if total_cache_requests > 0:
-        cache_hit_rate = stats['cache_hits'] / total_cache_requests * 100
-        print(f"缓存命中率: {cache_hit_rate:.1f}% ({stats['cache_hits']}/{total_cache_requests})")
-    
-    # 响应时间统计
-    print(f"\n响应时间统计 (秒):")
-    print(f"  平均响应时间: {statistics.mean(response_times):.3f}")
-    print(f"  中位数响应时间: {statistics.median(response_times):.3f}")
-    print(f"  最小响应时间: {min(response_times):.3f}")
-    print(f"  最大响应时间: {max(response_times):.3f}")
-    
-    if len(response_times) > 1:
-        print(f"  响应时间标准差: {statistics.stdev(response_times):.3f}")
-    
-    # 百分位数
-    sorted_times = sorted(response_times)
-    p50 = sorted_times[int(len(sorted_times) * 0.5)]
-    p90 = sorted_times[int(len(sorted_times) * 0.9)]
-    p95 = sorted_times[int(len(sorted_times) * 0.95)]
-    p99 = sorted_times[int(len(sorted_times) * 0.99)]
-    
-    print(f"  P50: {p50:.3f}")
-    print(f"  P90: {p90:.3f}")
-    print(f"  P95: {p95:.3f}")
-    print(f"  P99: {p99:.3f}")
-    
-    # 吞吐量
-    total_time = max(response_times) if response_times else 1
-    throughput = stats['successful_requests'] / total_time
-    print(f"\n吞吐量: {throughput:.2f} 请求/秒")
-    
-    # 错误统计
-    if stats['error_codes']:
-        print(f"\n错误码统计:")
-        for code, count in sorted(stats['error_codes'].items()):
-            print(f"  HTTP {code}: {count} 次")
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]):
+    """输出两次运行的主要指标对比"""
+    print(f"{'metric':>22} {'baseline':>12} {'current':>12} {'change':>9}", file=sys.stderr)
+    rows = [("ok_rps", baseline["ok_rps"], report["ok_rps"]),
+            ("success_rate", baseline["success_rate"], report["success_rate"])]
+    for section in ("latency", "service_time"):
+        for key in ("p50", "p90", "p99", "max"):
+            rows.append((f"{section}.{key}", baseline[section][key], report[section][key]))
+    for name, old, new in rows:
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{name:>22} {old:>12} {new:>12} {change:>9}", file=sys.stderr)
+
 
 def main():
-    """主函数"""
-    print(f"TTS API 负载测试")
-    print(f"测试目标: {BASE_URL}")
-    print(f"并发用户: {CONCURRENT_USERS}")
-    print(f"每用户请求数: {REQUESTS_PER_USER}")
-    print(f"总请求数: {CONCURRENT_USERS * REQUESTS_PER_USER}")
-    print(f"开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}")
-    
-    # 启动进度监控线程
-    progress_thread = threading.Thread(target=print_progress, daemon=True)
-    progress_thread.start()
-    
-    # 执行负载测试
-    start_time = time.time()
-    
-    with ThreadPoolExecutor(max_workers=CONCURRENT_USERS) as executor:
-        # 提交所有工作线程
-        futures = []
-        for worker_id in range(CONCURRENT_USERS):
-            future = executor.submit(worker_thread, worker_id + 1, REQUESTS_PER_USER)
-            futures.append(future)
-        
-        # 等待所有线程完成
-        all_results = []
-        for future in as_completed(futures):
-            try:
-                results = future.result()
-                all_results.extend(results)
-            except Exception as e:
-                print(f"\n工作线程异常: {e}")
-    
-    end_time = time.time()
-    total_duration = end_time - start_time
-    
-    print(f"\n\n测试完成，总耗时: {total_duration:.2f} 秒")
-    
-    # 计算和打印统计信息
-    calculate_statistics()
-    
-    # 性能评估
-    print(f"\n{'='*60}")
-    print(f"性能评估")
-    print(f"{'='*60}")
-    
-    success_rate = request_stats['successful_requests'] / request_stats['total_requests'] * 100
-    avg_response_time = statistics.mean(request_stats['response_times']) if request_stats['response_times'] else 0
-    
-    if success_rate >= 95 and avg_response_time <= 5.0:
-        print("✅ 性能优秀：成功率 ≥ 95% 且平均响应时间 ≤ 5秒")
-        exit_code = 0
-    elif success_rate >= 90 and avg_response_time <= 10.0:
-        print("⚠️  性能良好：成功率 ≥ 90% 且平均响应时间 ≤ 10秒")
-        exit_code = 0
-    else:
-        print("❌ 性能不佳：成功率 < 90% 或平均响应时间 > 10秒")
-        exit_code = 1
-    
-    print(f"结束时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    sys.exit(exit_code)
+    parser = argparse.ArgumentParser(description="TTS API 开环负载测试")
+    parser.add_argument('--url', default='http://localhost:8000', help='服务地址')
+    parser.add_argument('--profile', choices=['constant', 'ramp', 'step', 'soak'], default='constant')
+    parser.add_argument('--rate', type=float, default=5.0, help='到达率（请求/秒）；ramp/step 的起始值')
+    parser.add_argument('--to-rate', type=float, default=None, help='ramp 的结束到达率（默认为起始值的10倍）')
+    parser.add_argument('--duration', type=float, default=30.0, help='constant/ramp/soak 的持续时间（秒）')
+    parser.add_argument('--step-rate', type=float, default=5.0, help='step 每级增加的到达率')
+    parser.add_argument('--step-seconds', type=float, default=30.0, help='step 每级持续时间（秒）')
+    parser.add_argument('--steps', type=int, default=4, help='step 级数')
+    parser.add_argument('--window', type=float, default=0.0, help='统计窗口（秒），默认随负载曲线而定')
+    parser.add_argument('--poisson', action='store_true', help='按泊松过程（指数间隔）到达，默认均匀间隔')
+    parser.add_argument('--max-in-flight', type=int, default=0,
+                        help='最大并发请求数（0 为不限）；排队等待的时间同样计入延迟')
+    parser.add_argument('--timeout', type=float, default=60.0, help='单个请求超时（秒）')
+    parser.add_argument('--unique-ratio', type=float, default=0.0, help='使用唯一文本（不命中缓存）的请求比例')
+    parser.add_argument('--resource-id', default='', help='X-Api-Resource-Id 请求头')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子（文本/音色选择与泊松到达）')
+    parser.add_argument('--min-success', type=float, default=0.95, help='成功率低于该值时退出码为1')
+    parser.add_argument('--output', default='', help='结果 JSON 写入的文件（同时输出到标准输出）')
+    parser.add_argument('--compare', default='', help='对比的基线结果 JSON 文件')
+    args = parser.parse_args()
+
+    report = asyncio.run(LoadRun(args).run())
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+    sys.exit(0 if report["success_rate"] >= args.min_success else 1)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
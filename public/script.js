@@ -719,8 +719,42 @@ function blobToBase64(blob) {
   });
 }
 
+// 读取 /api/generate 的SSE流：每个增量回调 onDelta，返回 done 帧中的完整响应
+async function readArkStream(response, onDelta) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder('utf-8');
+  let buffer = '';
+  let content = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let dataLine = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLine += line.slice(5).trim();
+      }
+      if (!dataLine) continue;
+      const payload = JSON.parse(dataLine);
+      if (event === 'done') return payload;
+      if (event === 'error') throw new Error(payload.message || '流式生成中断');
+      if (payload.delta) {
+        content += payload.delta;
+        onDelta(content);
+      }
+    }
+  }
+  throw new Error('流式响应意外结束');
+}
+
 // Ark文本生成API封装
-async function arkGenerate(prompt, model) {
+// 传入 onDelta 时使用流式模式，生成过程中以累计文本回调
+async function arkGenerate(prompt, model, onDelta) {
   try {
     // 检查是否为测试模式
     if (state.testMode) {
@@ -731,16 +765,20 @@ async function arkGenerate(prompt, model) {
       'Content-Type': 'application/json',
       'X-Auth-Token': await getAuthTokenAsync() // 使用异步Token获取函数
     };
+    const stream = typeof onDelta === 'function';
 
 
     const response = await fetch(`${API_BASE}/api/generate`, {
       method: 'POST',
       headers: headers,
-      body: JSON.stringify({ prompt, model }),
+      body: JSON.stringify({ prompt, model, stream }),
       cache: 'no-store' // 明确禁用缓存
     });
 
-    const data = await response.json();
+    const isEventStream = (response.headers.get('Content-Type') || '').includes('text/event-stream');
+    const data = stream && response.ok && isEventStream
+      ? await readArkStream(response, onDelta)
+      : await response.json();
 
     // 添加调试信息
     console.log('API Response:', data);
@@ -1570,7 +1608,11 @@ el.generateContent.addEventListener('click', async() => {
   setLoading(el.generateContent, true);
   try {
     const model = (state.modelEndpoint && state.modelEndpoint.trim()) ? state.modelEndpoint.trim() : 'doubao-1.5-pro-32k-250115';
-    const data = await arkGenerate(prompt, model);
+    const data = await arkGenerate(prompt, model, (partial) => {
+      // 流式生成过程中逐步显示文本
+      el.contentText.textContent = cleanTextForReading(partial);
+      el.resultSection.style.display = 'block';
+    });
     const text = data.choices && data.choices[0] && data.choices[0].message ? data.choices[0].message.content : '';
     // 清理文本中的井号字符
     const cleanedText = cleanTextForReading(text);
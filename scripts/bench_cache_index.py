@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+TTS缓存索引基准测试
+
+用法:
+    python scripts/bench_cache_index.py [--sizes 1000,10000,100000] [--lookups 2000]
+    python scripts/bench_cache_index.py --writers 4 --per-writer 2000     # 多进程并发写一致性检查
+
+功能:
+1. 分别以 1k / 10k / 100k 条目填充 TTSCache 索引
+2. 测量 TTSCache.get 命中的平均延迟和 p99
+3. 对比旧版每次命中整文件重写 metadata.json 的代价
+4. --writers: 多个进程同时向同一索引追加记录，全部写完后检查每个进程内存中的条目数都与 journal 一致
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.cache import TTSCache
+from services.cache_index import CacheIndex
+
+
+def populate(cache: TTSCache, size: int, sample_count: int) -> list:
+    """向索引写入 size 条记录，并为其中 sample_count 条生成实际缓存文件"""
+    now = time.time()
+    sampled = []
+    for i in range(size):
+        text = f"睡前故事第{i}段：小兔子和月亮说晚安。"
+        key = cache._generate_cache_key(text, "zh_female_qingxin")
+        cache.index.record_set(key, {
+            "file": f"{key}.bin",
+            "text": text,
+            "voice": "zh_female_qingxin",
+            "params": {},
+            "created": now,
+            "accessed": now,
+            "size": 2048
+        })
+        if i < sample_count:
+            with open(cache._get_cache_file_path(key), 'wb') as f:
+                f.write(b'\x00' * 2048)
+            sampled.append(text)
+    return sampled
+
+
+def bench_hits(cache: TTSCache, texts: list, lookups: int) -> list:
+    """测量命中延迟（秒）"""
+    latencies = []
+    for _ in range(lookups):
+        text = random.choice(texts)
+        start = time.perf_counter()
+        data = cache.get(text, "zh_female_qingxin")
+        latencies.append(time.perf_counter() - start)
+        assert data is not None
+    return latencies
+
+
+def bench_legacy_save(entries: dict, rounds: int = 5) -> float:
+    """测量旧版 _save_metadata 单次整文件重写的耗时（秒）"""
+    metadata = {"version": "1.0", "entries": entries, "stats": {"hits": 0, "misses": 0, "total_size": 0}}
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+        return (time.perf_counter() - start) / rounds
+    finally:
+        os.unlink(path)
+
+
+def _writer(index_dir: str, worker: int, count: int, barrier, results):
+    """并发写入进程：追加 count 条记录，等所有进程写完后报告内存中的条目数"""
+    index = CacheIndex(Path(index_dir), compact_threshold=10 ** 9)
+    barrier.wait()
+    for i in range(count):
+        index.record_set(f"w{worker}-{i}", {"file": f"w{worker}-{i}.bin", "size": 1, "accessed": time.time()})
+    barrier.wait()
+    index.refresh()
+    results.put((worker, len(index), index.stats["total_size"]))
+    index.close()
+
+
+def check_writers(writers: int, per_writer: int) -> bool:
+    """多进程并发追加后，每个进程的内存状态都应包含全部记录"""
+    index_dir = tempfile.mkdtemp(prefix='tts-index-writers-')
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        barrier = ctx.Barrier(writers)
+        results = ctx.Queue()
+        processes = [ctx.Process(target=_writer, args=(index_dir, w, per_writer, barrier, results))
+                     for w in range(writers)]
+        for process in processes:
+            process.start()
+        reports = sorted(results.get(timeout=300) for _ in processes)
+        for process in processes:
+            process.join()
+
+        expected = writers * per_writer
+        on_disk = len(CacheIndex(Path(index_dir), compact_threshold=10 ** 9))
+        ok = on_disk == expected and all(count == expected and size == expected for _, count, size in reports)
+        for worker, count, size in reports:
+            print(f"writer {worker}: {count} entries in memory, total_size {size}")
+        print(f"journal: {on_disk} entries, expected {expected} -> {'OK' if ok else 'MISMATCH'}")
+        return ok
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS缓存索引基准测试")
+    parser.add_argument('--sizes', default='1000,10000,100000', help='逗号分隔的条目数')
+    parser.add_argument('--lookups', type=int, default=2000, help='每个规模的命中查询次数')
+    parser.add_argument('--writers', type=int, default=0, help='并发写进程数（>0 时只做多进程一致性检查）')
+    parser.add_argument('--per-writer', type=int, default=2000, help='每个写进程追加的记录数')
+    args = parser.parse_args()
+
+    if args.writers > 0:
+        sys.exit(0 if check_writers(args.writers, args.per_writer) else 1)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    print(f"{'entries':>10} {'hit avg(us)':>12} {'hit p99(us)':>12} {'legacy save(ms)':>16}")
+    for size in sizes:
+        cache_dir = tempfile.mkdtemp(prefix='tts-bench-')
+        try:
+            # 关闭填充阶段的自动压缩，只测稳定状态下的命中
+            os.environ['TTS_CACHE_COMPACT_THRESHOLD'] = str(size * 10)
+            cache = TTSCache(cache_dir)
+            texts = populate(cache, size, min(size, 500))
+            cache.index.compact()
+
+            latencies = bench_hits(cache, texts, args.lookups)
+            legacy = bench_legacy_save(cache.index.entries)
+
+            avg_us = sum(latencies) / len(latencies) * 1e6
+            p99_us = percentile(latencies, 99) * 1e6
+            print(f"{size:>10} {avg_us:>12.1f} {p99_us:>12.1f} {legacy * 1000:>16.1f}")
+            cache.index.close()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+费用账本多进程并发写基准
+
+用法:
+    python scripts/bench_costbook.py [--writers 4] [--per-writer 5000] [--compact-threshold 0]
+
+功能:
+1. 多个进程同时向同一账本 commit（第 w 个进程每条费用 w+1，回放错位时总费用会偏离），
+   测量每个进程的提交吞吐量
+2. 全部写完后检查每个进程内存中的 total_calls / total_cost 与日志一致，
+   并用一个新实例从磁盘重新加载核对（压缩后写入快照的汇总同样要一致）
+3. --compact-threshold 大于0时写入过程中会触发后台压缩，同时检查日志替换期间的一致性
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.costbook import CostBook
+
+
+def _writer(storage_path: str, worker: int, count: int, compact_threshold: int, barrier, results):
+    """并发写入进程：提交 count 条记录，等所有进程写完后报告内存中的汇总"""
+    book = CostBook(storage_path, compact_threshold=compact_threshold or 10 ** 9)
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(count):
+        book.commit(cost=float(worker + 1), latency=0.01, from_cache=bool(i % 2), provider="bench", voice=f"voice-{worker}")
+    elapsed = time.perf_counter() - start
+    barrier.wait()
+    book.refresh()
+    results.put((worker, book.data["total_calls"], book.data["total_cost"], count / elapsed))
+    book.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="费用账本多进程并发写基准")
+    parser.add_argument('--writers', type=int, default=4, help='并发写进程数')
+    parser.add_argument('--per-writer', type=int, default=5000, help='每个写进程提交的记录数')
+    parser.add_argument('--compact-threshold', type=int, default=0, help='日志压缩阈值（0 为写入期间不压缩）')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='costbook-bench-')
+    storage_path = str(Path(directory) / 'costbook.json')
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        barrier = ctx.Barrier(args.writers)
+        results = ctx.Queue()
+        processes = [ctx.Process(target=_writer, args=(storage_path, w, args.per_writer,
+                                                       args.compact_threshold, barrier, results))
+                     for w in range(args.writers)]
+        for process in processes:
+            process.start()
+        reports = sorted(results.get(timeout=600) for _ in processes)
+        for process in processes:
+            process.join()
+
+        expected = args.writers * args.per_writer
+        expected_cost = float(args.per_writer * sum(w + 1 for w in range(args.writers)))
+        reloaded = CostBook(storage_path, compact_threshold=10 ** 9)
+        ok = reloaded.data["total_calls"] == expected and reloaded.data["total_cost"] == expected_cost
+        print(f"{'writer':>6} {'commits/s':>10} {'total_calls':>12} {'total_cost':>12}")
+        for worker, calls, cost, rate in reports:
+            ok = ok and calls == expected and cost == expected_cost
+            print(f"{worker:>6} {rate:>10.0f} {calls:>12} {cost:>12.1f}")
+        print(f"{'disk':>6} {'-':>10} {reloaded.data['total_calls']:>12} {reloaded.data['total_cost']:>12.1f}")
+        print(f"expected {expected} calls, cost {expected_cost:.1f} -> {'OK' if ok else 'MISMATCH'}")
+        reloaded.close()
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+日志管线基准测试
+
+用法:
+    python scripts/bench_logging.py [--records 20000]
+
+功能:
+1. 直接挂载模式（旧版）：请求线程内完成格式化、掩码、写文件和轮转检查
+2. 队列模式（当前）：请求线程只入队，由后台监听线程格式化并写出
+3. 对比两种模式下每次 logger.debug/info 调用在请求线程上的耗时（平均值和 p99）
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import logging.handlers
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.logger_setup import CustomFormatter, BoundedQueueHandler
+
+
+def build_handlers(log_dir: Path):
+    formatter = CustomFormatter(
+        fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "bench.log", maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+def emit_records(logger: logging.Logger, count: int) -> list:
+    """模拟TTS请求路径上的日志调用，返回每次调用的耗时（秒）"""
+    durations = []
+    payload = '{"app": {"token": "x"}, "Authorization": "Bearer abcdef123456", "user": "mom@example.com"}'
+    for i in range(count):
+        start = time.perf_counter()
+        if i % 4 == 0:
+            logger.info(f"TTS request received for voice 'default' with text length {i % 300}.")
+        else:
+            logger.debug("TTS synthesis successful request=%s payload=%s", i, payload)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations: list) -> dict:
+    durations = sorted(durations)
+    return {
+        "avg_us": round(sum(durations) / len(durations) * 1e6, 2),
+        "p99_us": round(durations[int(len(durations) * 0.99)] * 1e6, 2),
+        "total_ms": round(sum(durations) * 1000, 1)
+    }
+
+
+def run_direct(log_dir: Path, count: int) -> dict:
+    logger = logging.getLogger("bench.direct")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handlers = build_handlers(log_dir)
+    for handler in handlers:
+        logger.addHandler(handler)
+    try:
+        return summarize(emit_records(logger, count))
+    finally:
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def run_queued(log_dir: Path, count: int) -> dict:
+    logger = logging.getLogger("bench.queued")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handlers = build_handlers(log_dir)
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=count + 1), policy="drop")
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        result = summarize(emit_records(logger, count))
+        drain_start = time.perf_counter()
+        listener.stop()  # 等待监听线程写完队列中的记录
+        result["drain_ms"] = round((time.perf_counter() - drain_start) * 1000, 1)
+        result["dropped"] = queue_handler.dropped
+        return result
+    finally:
+        logger.removeHandler(queue_handler)
+        for handler in handlers:
+            handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志管线基准测试")
+    parser.add_argument('--records', type=int, default=20000, help='每种模式写入的日志条数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        direct = run_direct(log_dir, args.records)
+        queued = run_queued(log_dir, args.records)
+
+    print(f"{'mode':>8} {'avg(us)':>10} {'p99(us)':>10} {'request thread total(ms)':>26}")
+    print(f"{'direct':>8} {direct['avg_us']:>10} {direct['p99_us']:>10} {direct['total_ms']:>26}")
+    print(f"{'queued':>8} {queued['avg_us']:>10} {queued['p99_us']:>10} {queued['total_ms']:>26}")
+    print(f"background drain: {queued['drain_ms']} ms, dropped: {queued['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
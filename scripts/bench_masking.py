@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+日志敏感信息掩码基准测试
+
+用法:
+    python scripts/bench_masking.py [--lines 20000] [--fuzz 50000]
+
+功能:
+1. 语料校验：真实TTS调试日志、边界用例和随机拼接的片段，逐行比对 mask_sensitive_data
+   与旧版（依次执行 SENSITIVE_PATTERNS 的六次 re.sub）输出完全一致，不一致时退出码为1
+2. 测量两种实现处理真实TTS调试日志的平均耗时
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.logger_setup import SENSITIVE_PATTERNS, mask_sensitive_data
+
+
+def legacy_mask(message: str) -> str:
+    """旧版实现：依次执行全部替换"""
+    for pattern, replacement in SENSITIVE_PATTERNS.items():
+        message = pattern.sub(replacement, message)
+    return message
+
+
+PREFIX = "2026-10-17 14:53:14 - api.tts - DEBUG - "
+
+# 按TTS请求路径上实际出现的日志构造，大部分行不含敏感信息
+REALISTIC_LINES = [
+    PREFIX + "TTS request parameters",
+    PREFIX + "TTS synthesis successful",
+    "2026-10-17 14:53:14 - api.tts - INFO - TTS request received for voice 'default' with text length 42.",
+    "2026-10-17 14:53:14 - root - INFO - Routing POST /api/tts -> /api/tts",
+    PREFIX + "[TTS INFO] request_id=abc12345 session_id=def67890 resource_id_hash=xyz98765 cache_hit=true latency=0.123s retry_count=0",
+    PREFIX + "Cache hit for key 3f2a9c1b7d voice=zh_female_xinlingjitang_moon_bigtts text='宝宝，今天妈妈给你讲一个小兔子的故事。'",
+    PREFIX + "Segment 3/7 synthesized in 0.412s (120 chars, provider=volcengine)",
+    PREFIX + "Request payload: {\"app\": {\"appid\": \"123456\", \"token\": \"access_token\", \"cluster\": \"volcano_tts\"}, "
+             "\"user\": {\"uid\": \"uid-1\"}, \"audio\": {\"voice_type\": \"zh_female_qingxin\", \"encoding\": \"mp3\"}, "
+             "\"request\": {\"reqid\": \"4b1c\", \"text\": \"小星星，亮晶晶\", \"operation\": \"query\"}}",
+    PREFIX + "Request headers: {\"Authorization\": \"Bearer abcdef0123456789\", \"Content-Type\": \"application/json\"}",
+    PREFIX + "Upstream response: {\"access_token\": \"tok-99887766\", \"expires_in\": 3600}",
+    PREFIX + "Volcengine credentials {\"AKID\": \"AKLTabc123\", \"AKSecret\": \"c2VjcmV0\"}",
+    PREFIX + "Incoming headers cookie: session=abc123; theme=dark",
+    PREFIX + "User profile phone=13800138000 email=mom@example.com",
+    PREFIX + "Voice clone upload finished for speaker S_abc123 (status=2)",
+]
+
+# 顺序替换会互相影响的写法，以及大小写折叠的边界
+EDGE_LINES = [
+    "abc@x.cookie=1;",
+    "cookie=a \"Authorization\": \"Bearer x;y\" rest",
+    "\"access_token\": \"x\"foo@bar.com",
+    "\"access_token\": \"abc \"Authorization\": \"Bearer x\" tail\"",
+    "\"Authorization\": \"Bearer a@b.com\" phone: 1234567890",
+    "phone=12345678901@mail.example.org",
+    "xcookie@a.com cookie: c=1",
+    "\"AKID\": \"x\"@a.bc",
+    "COOKIE=1; Phone: 8888888888; \"ACCESS_TOKEN\": \"A\"",
+    "cooİkie=x; cookıe=y; İphone=1234567",
+    "\"aKID\": \"z\" user@host.io",
+    "\"ı\": \"Authorızation\": \"Bearer q\"",
+    "token only here",
+    "宝宝@妈妈.中国 phone:1234567",
+    "",
+]
+
+FRAGMENTS = [
+    "\"Authorization\": \"Bearer ", "\"access_token\": \"", "\"AKID\": \"", "\"AKSecret\": \"", "cookie=", "'cookie': '",
+    "phone: ", "Phone=", "1234567", "89", "user", "@", "example", ".com", ".", "\"", ";", " ", ":", "=", "2", "x",
+    "token", "ak", "宝宝", "ı", "K", "-", "_", "]", "\\",
+]
+
+
+def fuzz_lines(count: int, seed: int = 20261017) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 14))) for _ in range(count)]
+
+
+def check_corpus(lines: list) -> int:
+    mismatches = 0
+    for line in lines:
+        expected = legacy_mask(line)
+        actual = mask_sensitive_data(line)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH\n  input:    {line!r}\n  expected: {expected!r}\n  actual:   {actual!r}")
+    return mismatches
+
+
+def time_per_line(func, lines: list) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return (time.perf_counter() - start) / len(lines) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志敏感信息掩码基准测试")
+    parser.add_argument('--lines', type=int, default=20000, help='计时用的日志行数')
+    parser.add_argument('--fuzz', type=int, default=50000, help='随机拼接的校验行数')
+    args = parser.parse_args()
+
+    corpus = REALISTIC_LINES + EDGE_LINES + fuzz_lines(args.fuzz)
+    mismatches = check_corpus(corpus)
+    print(f"corpus: {len(corpus)} lines, mismatches: {mismatches}")
+
+    rng = random.Random(1)
+    workload = [rng.choice(REALISTIC_LINES) for _ in range(args.lines)]
+    legacy_us = time_per_line(legacy_mask, workload)
+    current_us = time_per_line(mask_sensitive_data, workload)
+    clean = [line for line in REALISTIC_LINES if legacy_mask(line) == line]
+    print(f"{'impl':>10} {'all lines(us)':>15} {'clean lines(us)':>17}")
+    print(f"{'legacy':>10} {legacy_us:>15.2f} {time_per_line(legacy_mask, clean * 1000):>17.2f}")
+    print(f"{'current':>10} {current_us:>15.2f} {time_per_line(mask_sensitive_data, clean * 1000):>17.2f}")
+    print(f"speedup: {legacy_us / current_us:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+占位音频生成基准测试
+
+用法:
+    python scripts/bench_placeholder_audio.py [--duration 5.0] [--repeat 20]
+
+功能:
+1. 本地适配器哔声：对比旧版逐样本 struct.pack 与模板拼接，并校验输出逐字节一致
+2. fixtures 正弦波：对比逐样本计算 + 逐样本 writeframes 的旧写法与模板平铺
+3. 输出每次生成的平均耗时和加速比（要求不低于50倍，否则退出码为1）
+"""
+
+import io
+import sys
+import math
+import time
+import wave
+import struct
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.speech.local_adapter import LocalSpeechAdapter
+from scripts.make_fixtures import generate_placeholder_audio
+
+MIN_SPEEDUP = 50
+
+
+def legacy_local_beep(duration_seconds: float) -> bytes:
+    """旧版 LocalSpeechAdapter._generate_placeholder_audio"""
+    sample_rate = 22050
+    num_samples = int(sample_rate * duration_seconds)
+    beep_samples = int(sample_rate * 0.1)
+    samples = []
+    for i in range(min(beep_samples, num_samples)):
+        value = int(16384 * 0.3 * (1 if i < beep_samples // 10 else 0))
+        samples.append(value)
+    for i in range(num_samples - len(samples)):
+        samples.append(0)
+    audio_data = b''.join(struct.pack('<h', sample) for sample in samples)
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(audio_data)
+    return wav_buffer.getvalue()
+
+
+def legacy_fixture_tone(duration: float, sample_rate: int = 16000) -> bytes:
+    """旧版 make_fixtures 的写法（逐样本计算、逐样本 writeframes），波形换成同样的正弦波以便比较"""
+    frames = int(duration * sample_rate)
+    fade = int(sample_rate * 0.1)
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for i in range(frames):
+            sample = int(0.3 * 32767 * math.sin(2 * math.pi * 440 * i / sample_rate))
+            if i < fade:
+                sample = int(sample * i / fade)
+            elif i >= frames - fade:
+                sample = int(sample * (frames - i) / fade)
+            wav_file.writeframes(struct.pack('<h', sample))
+    return wav_buffer.getvalue()
+
+
+def average_seconds(func, repeat: int) -> float:
+    func()  # 预热（模板缓存）
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="占位音频生成基准测试")
+    parser.add_argument('--duration', type=float, default=5.0, help='音频时长（秒）')
+    parser.add_argument('--repeat', type=int, default=20, help='每种实现的重复次数')
+    args = parser.parse_args()
+
+    adapter = LocalSpeechAdapter()
+    ok = True
+
+    same = all(legacy_local_beep(d) == adapter._generate_placeholder_audio("", d) for d in (0.05, 0.1, 0.5, args.duration))
+    print(f"local beep output identical to legacy: {same}")
+    ok &= same
+
+    same = legacy_fixture_tone(args.duration) == generate_placeholder_audio("", args.duration)
+    print(f"fixture tone output identical to per-sample reference: {same}")
+    ok &= same
+
+    cases = [
+        ("local beep", lambda: legacy_local_beep(args.duration),
+         lambda: adapter._generate_placeholder_audio("", args.duration)),
+        ("fixture tone", lambda: legacy_fixture_tone(args.duration),
+         lambda: generate_placeholder_audio("", args.duration)),
+    ]
+    print(f"{'case':>14} {'legacy(ms)':>12} {'current(ms)':>12} {'speedup':>9}")
+    for name, legacy, current in cases:
+        legacy_s = average_seconds(legacy, max(1, args.repeat // 10))
+        current_s = average_seconds(current, args.repeat)
+        speedup = legacy_s / current_s
+        ok &= speedup >= MIN_SPEEDUP
+        print(f"{name:>14} {legacy_s * 1000:>12.3f} {current_s * 1000:>12.3f} {speedup:>8.0f}x")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+服务器并发基准测试
+
+用法:
+    python scripts/bench_server_concurrency.py [--workers 1,16] [--tts-jobs 8] [--probes 20]
+
+功能:
+1. 以 sandbox 模式（每次合成模拟 0.5-2 秒延迟）启动 server.py
+2. 同时发起若干个长耗时 /api/tts 请求
+3. 在这些请求进行期间反复探测 /api/health，统计健康检查延迟
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import threading
+import urllib.request
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def post_tts(port: int, text: str):
+    data = json.dumps({"text": text}).encode('utf-8')
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/api/tts", data=data,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+    except Exception:
+        pass
+
+
+def probe_health(port: int) -> float:
+    start = time.perf_counter()
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_case(workers: int, port: int, tts_jobs: int, probes: int) -> dict:
+    env = dict(os.environ, MODE='sandbox', TTS_MEMORY_CACHE_MB='0')
+    proc = subprocess.Popen(
+        [sys.executable, 'server.py', str(port), '--workers', str(workers)],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        run_id = time.time_ns()
+        jobs = [
+            threading.Thread(target=post_tts, args=(port, f"基准测试长文本{run_id}-{i}，模拟一次较慢的语音合成。"))
+            for i in range(tts_jobs)
+        ]
+        for job in jobs:
+            job.start()
+        time.sleep(0.2)  # 让TTS请求先占住服务器
+
+        latencies = [probe_health(port) for _ in range(probes)]
+        for job in jobs:
+            job.join()
+
+        latencies.sort()
+        return {
+            "workers": workers,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1)
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务器并发基准测试")
+    parser.add_argument('--workers', default='1,16', help='逗号分隔的工作线程数')
+    parser.add_argument('--tts-jobs', type=int, default=8, help='并发的长耗时TTS请求数')
+    parser.add_argument('--probes', type=int, default=20, help='健康检查探测次数')
+    parser.add_argument('--port', type=int, default=8790)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'health p50(ms)':>15} {'health max(ms)':>15}")
+    for workers in [int(w) for w in args.workers.split(',') if w]:
+        result = run_case(workers, args.port, args.tts_jobs, args.probes)
+        print(f"{result['workers']:>8} {result['p50_ms']:>15} {result['max_ms']:>15}")
+
+
+if __name__ == "__main__":
+    main()
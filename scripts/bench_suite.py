@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+services 热点路径微基准套件
+
+用法:
+    python scripts/bench_suite.py                          # 运行全部用例并输出结果
+    python scripts/bench_suite.py --list                   # 列出用例
+    python scripts/bench_suite.py --filter cache --sizes 1000,10000
+    python scripts/bench_suite.py --save scripts/bench_baseline.json
+    python scripts/bench_suite.py --compare scripts/bench_baseline.json [--threshold 0.2]
+
+功能:
+1. 覆盖 TTSCache.get/set/cleanup（1k / 10k / 100k 条目）、CostBook.commit、mask_sensitive_data、
+   CustomFormatter.format、占位音频生成、api/tts 的 base64/JSON 与二进制响应构建、get_speech_service()
+2. 每个用例在独立子进程中运行，先校准迭代次数（单轮不少于 --min-time 秒），再重复 --repeat 轮，取每次操作耗时的中位数
+3. --save 将结果写入 JSON 基线文件；--compare 按最快一轮与基线对比，慢于基线超过阈值的用例标记为回归，退出码为1
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 用例：名称 -> 准备函数；准备函数返回 (单次操作, 清理函数或None)
+Setup = Callable[[], Tuple[Callable[[], object], Optional[Callable[[], None]]]]
+BENCHMARKS: Dict[str, Setup] = {}
+CACHE_SIZES = (1000, 10000, 100000)
+VOICE = "zh_female_qingxin"
+
+
+def benchmark(name: str):
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# --- TTSCache ---
+
+def _populated_cache(size: int, memory_budget_bytes: int = 0):
+    """以 size 条索引记录填充临时缓存，其中前500条有实际缓存文件"""
+    from services.cache import TTSCache
+    os.environ['TTS_CACHE_COMPACT_THRESHOLD'] = str(size * 10)  # 填充过程中不触发压缩
+    cache_dir = tempfile.mkdtemp(prefix='tts-bench-')
+    cache = TTSCache(cache_dir, memory_budget_bytes=memory_budget_bytes)
+    now = time.time()
+    texts = []
+    for i in range(size):
+        text = f"睡前故事第{i}段：小兔子和月亮说晚安。"
+        key = cache._generate_cache_key(text, VOICE)
+        cache.index.record_set(key, {"file": f"{key}.bin", "text": text, "voice": VOICE, "params": {},
+                                     "created": now, "accessed": now, "size": 2048})
+        if i < 500:
+            with open(cache._get_cache_file_path(key), 'wb') as f:
+                f.write(b'\x00' * 2048)
+            texts.append(text)
+    cache.index.compact()
+
+    def teardown():
+        import shutil
+        cache.index.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return cache, texts, teardown
+
+
+def _register_cache_benchmarks(size: int):
+    @benchmark(f"cache.get.disk/{size}")
+    def cache_get_disk():
+        # 关闭内存层，测量索引查找 + 读文件
+        cache, texts, teardown = _populated_cache(size)
+        state = {"i": 0}
+
+        def op():
+            state["i"] += 1
+            return cache.get(texts[state["i"] % len(texts)], VOICE)
+        return op, teardown
+
+    @benchmark(f"cache.get.memory/{size}")
+    def cache_get_memory():
+        cache, texts, teardown = _populated_cache(size, memory_budget_bytes=64 * 1024 * 1024)
+        for text in texts:
+            cache.get(text, VOICE)  # 预热内存层
+        state = {"i": 0}
+
+        def op():
+            state["i"] += 1
+            return cache.get(texts[state["i"] % len(texts)], VOICE)
+        return op, teardown
+
+    @benchmark(f"cache.set/{size}")
+    def cache_set():
+        cache, _, teardown = _populated_cache(size)
+        audio = b'\x01' * 4096
+        state = {"i": 0}
+
+        def op():
+            state["i"] += 1
+            cache.set(f"新增文本{state['i']}", audio, VOICE)
+        return op, teardown
+
+    @benchmark(f"cache.cleanup/{size}")
+    def cache_cleanup():
+        # 无需删除任何条目时的一次完整扫描
+        cache, _, teardown = _populated_cache(size)
+        return (lambda: cache.cleanup(max_age_days=3650, max_size_mb=1024 * 1024)), teardown
+
+
+for _size in CACHE_SIZES:
+    _register_cache_benchmarks(_size)
+
+
+# --- CostBook ---
+
+@benchmark("costbook.commit")
+def costbook_commit():
+    import shutil
+    from services.costbook import CostBook
+    storage = tempfile.mkdtemp(prefix='costbook-bench-')
+    book = CostBook(os.path.join(storage, 'costbook.json'))
+
+    def teardown():
+        book.close()
+        shutil.rmtree(storage, ignore_errors=True)
+    return (lambda: book.commit(cost=0.0012, latency=0.35, provider="volcengine", voice=VOICE)), teardown
+
+
+# --- 日志 ---
+
+PLAIN_LINE = "2026-01-01 12:00:00 - api.tts - INFO - Routing POST /api/tts -> /api/tts status=200 latency=0.123s"
+SENSITIVE_LINE = ("Upstream request Authorization: Bearer;abcdef0123456789 token=xyz987 "
+                  "user mail someone@example.com phone 13800138000 cookie: sid=42")
+
+
+@benchmark("logging.mask.plain")
+def mask_plain():
+    from services.logger_setup import mask_sensitive_data
+    return (lambda: mask_sensitive_data(PLAIN_LINE)), None
+
+
+@benchmark("logging.mask.sensitive")
+def mask_sensitive():
+    from services.logger_setup import mask_sensitive_data
+    return (lambda: mask_sensitive_data(SENSITIVE_LINE)), None
+
+
+def _formatter():
+    from services.logger_setup import CustomFormatter
+    return CustomFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+@benchmark("logging.format.short")
+def format_short():
+    formatter = _formatter()
+    record = logging.LogRecord("bench", logging.INFO, __file__, 1, SENSITIVE_LINE, None, None)
+    return (lambda: formatter.format(record)), None
+
+
+@benchmark("logging.format.long")
+def format_long():
+    # 超过 LOG_MAX_LINE：截断并把完整内容追加到段文件；每次使用新记录，不命中同一记录的段引用缓存
+    from services.logger_setup import LOG_MAX_LINE
+    formatter = _formatter()
+    message = "debug payload chunk " * (LOG_MAX_LINE // 20 + 100)
+    return (lambda: formatter.format(logging.LogRecord("bench", logging.INFO, __file__, 1, message, None, None))), None
+
+
+# --- 占位音频 ---
+
+@benchmark("placeholder.local_beep_5s")
+def placeholder_local():
+    from services.speech.local_adapter import LocalSpeechAdapter
+    adapter = LocalSpeechAdapter()
+    return (lambda: adapter._generate_placeholder_audio("", 5.0)), None
+
+
+@benchmark("placeholder.tone_5s")
+def placeholder_tone():
+    from services.placeholder_audio import pcm16_wav, tone_pcm
+    return (lambda: pcm16_wav(tone_pcm(16000 * 5, 16000), 16000)), None
+
+
+# --- api/tts 响应构建 ---
+
+class _ResponseSink:
+    """只实现 send_audio_response 用到的请求处理器接口，响应写入内存"""
+
+    def __init__(self, accept: str):
+        self.path = "/api/tts"
+        self.headers = {"Accept": accept}
+        self.wfile = io.BytesIO()
+
+    def send_response(self, code):
+        pass
+
+    def send_header(self, key, value):
+        pass
+
+    def end_headers(self):
+        pass
+
+
+def _response_case(accept: str):
+    from api.tts import send_audio_response
+    from services.placeholder_audio import pcm16_wav, tone_pcm
+    audio = pcm16_wav(tone_pcm(16000 * 5, 16000), 16000)
+    debug_log = {"steps": [{"action": "submit", "http_status": 200}], "total_duration_s": 1.2}
+    sink = _ResponseSink(accept)
+
+    def op():
+        sink.wfile.seek(0)
+        sink.wfile.truncate()
+        send_audio_response(sink, audio, "trace-bench", False, None, debug_log)
+    return op, None
+
+
+@benchmark("api.tts.response.json")
+def response_json():
+    # base64 编码 + JSON 序列化
+    return _response_case("application/json")
+
+
+@benchmark("api.tts.response.binary")
+def response_binary():
+    return _response_case("audio/wav")
+
+
+# --- 服务构建 ---
+
+@benchmark("services.get_speech_service.local")
+def speech_service_local():
+    from services import get_speech_service
+    return (lambda: get_speech_service('local')), None
+
+
+@benchmark("services.get_speech_service.prod")
+def speech_service_prod():
+    from services import get_speech_service
+    return (lambda: get_speech_service('prod')), None
+
+
+# --- 运行与对比 ---
+
+def measure(op: Callable[[], object], min_time: float, repeat: int) -> Dict[str, float]:
+    """校准迭代次数后重复测量，返回每次操作的耗时（微秒）"""
+    op()  # 预热
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / iterations]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        samples.append((time.perf_counter() - start) / iterations)
+    return {
+        "us_per_op": round(statistics.median(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "iterations": iterations,
+        "repeat": repeat
+    }
+
+
+def run_one(name: str, min_time: float, repeat: int) -> Dict[str, float]:
+    # 用例中的 print（如适配器配置信息）不计入输出
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        op, teardown = BENCHMARKS[name]()
+        try:
+            return measure(op, min_time, repeat)
+        finally:
+            if teardown:
+                teardown()
+
+
+def run(names: List[str], min_time: float, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    每个用例在独立子进程中运行
+
+    同一进程里先运行的用例会改变堆的状态（例如大块内存是否需要重新映射），
+    使后面用例的耗时随运行顺序变化数倍；隔离后结果只取决于用例本身。
+    """
+    results = {}
+    for name in names:
+        output = subprocess.run(
+            [sys.executable, __file__, '--run-one', name, '--min-time', str(min_time), '--repeat', str(repeat)],
+            check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        result = results[name] = json.loads(output)
+        print(f"{name:<40} {result['us_per_op']:>14.3f} us/op  (min {result['min_us']:.3f}, x{result['iterations']})",
+              file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> int:
+    """
+    输出与基线的对比，返回回归的用例数
+
+    按各轮中最快的一轮（min_us）比较：后台负载只会让某些轮变慢，最快一轮最接近用例本身的开销。
+    """
+    regressions = 0
+    print(f"{'benchmark':<40} {'baseline(us)':>14} {'current(us)':>14} {'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>14} {result['min_us']:>14.3f} {'new':>9}")
+            continue
+        change = result["min_us"] / base["min_us"] - 1 if base["min_us"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<40} {base['min_us']:>14.3f} {result['min_us']:>14.3f} {change * 100:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="services 热点路径微基准套件")
+    parser.add_argument('--list', action='store_true', help='列出用例后退出')
+    parser.add_argument('--filter', default='', help='只运行名称包含该子串的用例（逗号分隔多个）')
+    parser.add_argument('--sizes', default='', help='TTSCache 用例的条目数（逗号分隔，默认 1000,10000,100000）')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每轮最短测量时间（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='测量轮数（取中位数）')
+    parser.add_argument('--save', default='', help='将结果写入的基线 JSON 文件')
+    parser.add_argument('--compare', default='', help='对比的基线 JSON 文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定为回归的变慢比例（0.2 即慢20%%）')
+    parser.add_argument('--run-one', default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args.min_time, max(1, args.repeat))))
+        return
+
+    names = list(BENCHMARKS)
+    if args.sizes:
+        sizes = {s.strip() for s in args.sizes.split(',') if s.strip()}
+        names = [name for name in names if not name.startswith("cache.") or name.rsplit('/', 1)[1] in sizes]
+    if args.filter:
+        patterns = [p for p in args.filter.split(',') if p]
+        names = [name for name in names if any(p in name for p in patterns)]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    results = run(names, args.min_time, max(1, args.repeat))
+
+    if args.save:
+        document = {
+            "version": 1,
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"Baseline written to {args.save}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{regressions} benchmark(s) regressed by more than {args.threshold * 100:.0f}%")
+            sys.exit(1)
+    elif not args.save:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,6 @@
 import os
 import sys
 import time
-import wave
-import struct
 from pathlib import Path
 
 # 添加项目根目录到Python路径
@@ -23,6 +21,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from services.fixtures import get_fixture_manager
+from services.placeholder_audio import pcm16_wav, silence_pcm, tone_pcm
 
 
 # 预设的中文短句（5-10秒）
@@ -44,7 +43,7 @@ VOICE_CONFIGS = [
 
 def generate_placeholder_audio(text: str, duration: float = 3.0, sample_rate: int = 16000) -> bytes:
     """
-    生成占位音频（简单的正弦波）
+    生成占位音频（440Hz正弦波，首尾0.1秒淡入淡出）
     
     Args:
         text: 文本内容（用于计算时长）
@@ -61,42 +60,9 @@ def generate_placeholder_audio(text: str, duration: float = 3.0, sample_rate: in
     if duration <= 0:
         duration = estimated_duration
     
-    # 生成正弦波音频
-    frequency = 440.0  # A4音符
+    # 一个周期的波形模板平铺到所需长度，不再逐样本计算和写入
     frames = int(duration * sample_rate)
-    
-    audio_data = []
-    for i in range(frames):
-        # 生成正弦波，添加淡入淡出效果
-        t = i / sample_rate
-        amplitude = 0.3
-        
-        # 淡入淡出
-        fade_duration = 0.1
-        if t < fade_duration:
-            amplitude *= t / fade_duration
-        elif t > duration - fade_duration:
-            amplitude *= (duration - t) / fade_duration
-        
-        # 正弦波
-        sample = amplitude * (0.5 * (1 + 0.5 * (t * 2)))  # 轻微的频率变化
-        sample *= 32767  # 转换为16位整数范围
-        audio_data.append(int(sample))
-    
-    # 创建WAV文件
-    import io
-    wav_buffer = io.BytesIO()
-    
-    with wave.open(wav_buffer, 'wb') as wav_file:
-        wav_file.setnchannels(1)  # 单声道
-        wav_file.setsampwidth(2)  # 16位
-        wav_file.setframerate(sample_rate)
-        
-        # 写入音频数据
-        for sample in audio_data:
-            wav_file.writeframes(struct.pack('<h', sample))
-    
-    return wav_buffer.getvalue()
+    return pcm16_wav(tone_pcm(frames, sample_rate, frequency=440, amplitude=0.3, fade_seconds=0.1), sample_rate)
 
 
 def generate_silence_audio(duration: float = 1.0, sample_rate: int = 16000) -> bytes:
@@ -111,20 +77,7 @@ def generate_silence_audio(duration: float = 1.0, sample_rate: int = 16000) -> b
         WAV格式的静音音频数据
     """
     frames = int(duration * sample_rate)
-    
-    import io
-    wav_buffer = io.BytesIO()
-    
-    with wave.open(wav_buffer, 'wb') as wav_file:
-        wav_file.setnchannels(1)  # 单声道
-        wav_file.setsampwidth(2)  # 16位
-        wav_file.setframerate(sample_rate)
-        
-        # 写入静音数据
-        silence_data = b'\x00\x00' * frames
-        wav_file.writeframes(silence_data)
-    
-    return wav_buffer.getvalue()
+    return pcm16_wav(silence_pcm(frames), sample_rate)
 
 
 def main():
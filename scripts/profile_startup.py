@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+冷启动导入耗时分析
+
+用法:
+    python scripts/profile_startup.py                              # server 与每个路由模块各自的冷启动
+    python scripts/profile_startup.py --target server --top 20
+    python scripts/profile_startup.py --save scripts/startup_baseline.json
+    python scripts/profile_startup.py --compare scripts/startup_baseline.json [--threshold 0.2]
+
+功能:
+1. 每个目标模块在全新的子进程中以 `python -X importtime` 导入，重复 --runs 次取中位数；
+   只统计目标模块自身引入的模块（解释器启动和 site 加载的模块不计入）
+2. 输出导入总耗时、按自身耗时排序的前 N 个模块，以及是否加载了 httpx / urllib3 / certifi 等重依赖
+   （每个路由模块单独导入，对应 Vercel 上各函数的冷启动）
+3. --save 写入 JSON 基线；--compare 与基线对比：总耗时变慢超过阈值、或新加载了重依赖时视为回归，退出码为1
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_TARGETS = ["server", "api.health", "api.metrics", "api.debug", "api.tts", "api.tts_jobs",
+                   "api.voice_clone", "api.ark"]
+HEAVY_MODULES = ("httpx", "httpcore", "h11", "urllib3", "certifi")
+
+# 子进程：计时导入目标模块，耗时（秒）写到标准输出最后一行
+CHILD_CODE = "import time; _t = time.perf_counter(); import {target}; print(time.perf_counter() - _t)"
+
+
+def parse_importtime(stderr: str, target: str) -> List[Tuple[str, int, int]]:
+    """
+    解析 -X importtime 输出，返回目标模块子树中的 (模块名, 自身微秒, 累计微秒)
+
+    输出按导入完成的顺序排列，子模块在父模块之前；顶层（无缩进）的目标模块之前、
+    上一个顶层条目之后的行就是它的子树。
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "| imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name[1:], int(self_us), int(cumulative_us)))
+
+    subtree: List[Tuple[str, int, int]] = []
+    for name, self_us, cumulative_us in entries:
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        module = name.strip()
+        if depth == 0:
+            if module == target:
+                subtree.append((module, self_us, cumulative_us))
+                return subtree
+            subtree = []
+        else:
+            subtree.append((module, self_us, cumulative_us))
+    return []
+
+
+def profile_target(target: str, runs: int) -> Dict[str, Any]:
+    walls, totals = [], []
+    self_times: Dict[str, List[int]] = {}
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(target=target)],
+            cwd=str(project_root), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {target} failed:\n{completed.stderr[-2000:]}")
+        walls.append(float(completed.stdout.strip().splitlines()[-1]))
+        subtree = parse_importtime(completed.stderr, target)
+        totals.append(subtree[-1][2] if subtree else 0)
+        for module, self_us, _ in subtree:
+            self_times.setdefault(module, []).append(self_us)
+
+    modules = {module: statistics.median(values) for module, values in self_times.items()}
+    heavy = sorted({module.split('.')[0] for module in modules if module.split('.')[0] in HEAVY_MODULES})
+    return {
+        "wall_ms": round(statistics.median(walls) * 1000, 2),
+        "import_ms": round(statistics.median(totals) / 1000, 2),
+        "module_count": len(modules),
+        "heavy": heavy,
+        "modules": {module: round(us / 1000, 3) for module, us in sorted(modules.items(), key=lambda x: -x[1])}
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """输出与基线的对比，返回回归数"""
+    regressions = 0
+    print(f"{'target':<18} {'baseline(ms)':>13} {'current(ms)':>12} {'change':>9}  new heavy imports")
+    for target, result in results.items():
+        base = baseline.get(target)
+        if base is None:
+            print(f"{target:<18} {'-':>13} {result['import_ms']:>12.2f} {'new':>9}")
+            continue
+        change = result["import_ms"] / base["import_ms"] - 1 if base["import_ms"] else 0.0
+        new_heavy = sorted(set(result["heavy"]) - set(base["heavy"]))
+        flag = ""
+        if change > threshold or new_heavy:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{target:<18} {base['import_ms']:>13.2f} {result['import_ms']:>12.2f} {change * 100:>+8.1f}%  "
+              f"{', '.join(new_heavy) or '-'}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时分析")
+    parser.add_argument('--target', action='append', default=[], help='要导入的模块（可重复），默认为 server 与各路由模块')
+    parser.add_argument('--runs', type=int, default=5, help='每个目标的导入次数（取中位数）')
+    parser.add_argument('--top', type=int, default=10, help='每个目标输出自身耗时最多的模块数')
+    parser.add_argument('--save', default='', help='将结果写入的基线 JSON 文件')
+    parser.add_argument('--compare', default='', help='对比的基线 JSON 文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定为回归的变慢比例（0.2 即慢20%%）')
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.target or DEFAULT_TARGETS:
+        result = results[target] = profile_target(target, max(1, args.runs))
+        print(f"{target}: import {result['import_ms']:.2f} ms (wall {result['wall_ms']:.2f} ms, "
+              f"{result['module_count']} modules, heavy: {', '.join(result['heavy']) or '-'})", file=sys.stderr)
+        for module, ms in list(result["modules"].items())[:args.top]:
+            print(f"    {ms:>9.3f} ms  {module}", file=sys.stderr)
+
+    if args.save:
+        document = {
+            "version": 1,
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": sys.version.split()[0],
+            "results": results
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"Baseline written to {args.save}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{regressions} target(s) regressed")
+            sys.exit(1)
+    elif not args.save:
+        print(json.dumps({target: {k: v for k, v in result.items() if k != "modules"}
+                          for target, result in results.items()}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+读取超长日志行的完整内容
+
+用法:
+    python scripts/read_log_chunk.py 000003:1048576:20480
+    python scripts/read_log_chunk.py "<截断的整行日志>"
+    grep TRUNCATED logs/app.log | python scripts/read_log_chunk.py
+
+功能:
+1. 按 segment:offset:length 引用打开对应段文件，一次 pread 读出完整内容
+2. 参数可以是引用本身或整行日志；不带参数时从标准输入逐行读取，把截断行替换为完整内容，其余行原样输出
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.log_segments import ChunkSegmentStore, TRUNCATED_MARKER_PATTERN, parse_chunk_ref
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取超长日志行的完整内容")
+    parser.add_argument('refs', nargs='*', help='segment:offset:length 引用或包含引用的整行日志')
+    parser.add_argument('--dir', default='logs/chunks', help='段文件目录')
+    args = parser.parse_args()
+
+    store = ChunkSegmentStore(Path(args.dir))
+    failed = 0
+
+    if args.refs:
+        for ref in args.refs:
+            if parse_chunk_ref(ref) is None:
+                print(f"无效的引用: {ref}", file=sys.stderr)
+                failed += 1
+                continue
+            try:
+                print(store.read(ref))
+            except (OSError, ValueError) as e:
+                print(f"读取失败 {ref}: {e}", file=sys.stderr)
+                failed += 1
+    else:
+        for line in sys.stdin:
+            line = line.rstrip("\n")
+            if TRUNCATED_MARKER_PATTERN.search(line) is None:
+                print(line)
+                continue
+            try:
+                print(store.read(line))
+            except (OSError, ValueError) as e:
+                # 段已被滚动删除时保留截断行
+                print(line)
+                print(f"读取失败: {e}", file=sys.stderr)
+                failed += 1
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
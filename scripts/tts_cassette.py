@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+TTS 磁带录制/回放工具
+
+用法:
+    # 录制：经真实上游（或 TTS_API_URL 指向的服务）合成，每次提交/轮询交互写入磁带
+    python scripts/tts_cassette.py record --cassette smoke [--texts texts.txt] [--concurrency 4]
+
+    # 录制本地替身服务的交互（无需网络和凭证）
+    python scripts/tts_cassette.py record --cassette smoke --standin
+
+    # 回放：不访问网络，按录制顺序返回响应；--speed 0 不等待，4 表示按录制耗时快4倍
+    # （轮询间隔取自磁带头部记录的录制配置，同样按 --speed 缩放）
+    python scripts/tts_cassette.py replay --cassette smoke --speed 0
+
+功能:
+1. 用真实的 ProductionSpeechAdapter 执行提交与轮询，磁带层替换其 http_client
+   （等价于设置 RECORD=true / REPLAY=true 与 TTS_CASSETTE）
+2. 回放时输出每段文本的耗时、轮询次数和总体延迟分布，可作为轮询代码的离线性能回归
+3. 回放结束后检查磁带是否被完整消费（未消费或未命中的交互都会使退出码为1）
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_TEXTS = [
+    "宝宝，今天的阳光很温暖。",
+    "小兔子和月亮说晚安，星星在天上眨眼睛。",
+    "妈妈给你唱一首摇篮曲，风轻轻地吹过窗台。",
+    "春天来了，小草从泥土里探出头来，花儿一朵一朵地开放。",
+]
+
+
+def load_texts(path: str) -> list:
+    if not path:
+        return DEFAULT_TEXTS
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run(texts: list, concurrency: int) -> dict:
+    from services.histogram import LatencyHistogram
+    from services.speech.prod_adapter import ProductionSpeechAdapter
+
+    adapter = ProductionSpeechAdapter()
+    histogram = LatencyHistogram()
+    results = [None] * len(texts)
+    lock = threading.Lock()
+
+    def one(index: int):
+        start = time.perf_counter()
+        try:
+            audio, debug_log = adapter.synthesize(texts[index])
+            elapsed = time.perf_counter() - start
+            polls = sum(1 for step in debug_log["steps"] if step["action"] == "poll")
+            results[index] = {"text": texts[index][:20], "ok": True, "seconds": round(elapsed, 3),
+                              "polls": polls, "bytes": len(audio)}
+            with lock:
+                histogram.record(elapsed)
+        except Exception as e:
+            results[index] = {"text": texts[index][:20], "ok": False, "error": str(e)[:200]}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(len(texts))))
+    return {
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "latency": histogram.summary(),
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 磁带录制/回放工具")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--cassette', default='default', help='磁带名称（services/fixtures/cassettes/<名称>.jsonl）或 .jsonl 路径')
+    parser.add_argument('--texts', default='', help='每行一段文本的文件，默认使用内置文本')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发合成数')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放速度倍数（0 表示不等待）')
+    parser.add_argument('--standin', action='store_true', help='录制时在进程内启动本地替身服务作为上游')
+    args = parser.parse_args()
+
+    os.environ['TTS_CASSETTE'] = args.cassette
+    os.environ['RECORD' if args.mode == 'record' else 'REPLAY'] = 'true'
+    os.environ['TTS_CASSETTE_SPEED'] = str(args.speed)
+
+    from services.fixtures.cassette import get_cassette_path, get_cassette_transport
+    path = get_cassette_path()
+    server = None
+    if args.mode == 'record':
+        if path.exists():
+            path.unlink()  # 重新录制，避免与旧记录混在一起
+        if args.standin:
+            from scripts.volc_standin import build_parser, start_standin
+            standin_args = build_parser().parse_args(['--port', '0'])
+            server = start_standin(standin_args)
+            host, port = server.server_address[:2]
+            os.environ['TTS_API_URL'] = f"http://{host}:{port}/api/v1/tts"
+            os.environ.setdefault('TTS_POLL_INTERVAL_MS', '50')
+    elif not path.exists():
+        print(f"Cassette not found: {path}")
+        sys.exit(1)
+
+    report = run(load_texts(args.texts), max(1, args.concurrency))
+    transport = get_cassette_transport()
+    if server is not None:
+        server.shutdown()
+
+    ok = all(result["ok"] for result in report["results"])
+    if args.mode == 'replay':
+        report["interactions"] = {"recorded": transport.total, "played": transport.played,
+                                  "remaining": transport.remaining()}
+        ok &= transport.remaining() == 0
+    report["cassette"] = str(path)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+火山引擎TTS本地替身服务
+
+用法:
+    python scripts/volc_standin.py [--port 8765] [--ready-after 3] [--sync-ratio 0.2]
+        [--rate-429 0.02] [--rate-5xx 0.01] [--submit-latency lognormal:0.08,0.5] [--query-latency uniform:0.01,0.05]
+
+    # 让 ProductionSpeechAdapter 走完整的提交/轮询代码路径，但请求发往本机
+    TTS_API_URL=http://127.0.0.1:8765/api/v1/tts TTS_POLL_INTERVAL_MS=50 MODE=prod python server.py 8000
+
+    # 直接压测适配器（进程内启动替身服务）
+    python scripts/volc_standin.py --drive 200 --concurrency 16
+
+    # asyncio 适配器：单个事件循环上同时挂起数百个合成，由共享调度器轮询
+    python scripts/volc_standin.py --drive 600 --concurrency 300 --async
+
+功能:
+1. 实现 /api/v1/tts 的 submit / query 协议：submit 按比例同步返回音频（code 0），
+   否则返回 3000 / 3032 和 reqid；同一 reqid 第 N 次 query 时返回音频
+2. 按概率注入 429 和 5xx（500 / 502 / 503）响应
+3. submit 与 query 的响应延迟分布可配置：fixed:S、uniform:A,B、normal:MU,SIGMA、
+   lognormal:MEDIAN,SIGMA、exp:MEAN（单位秒）
+4. GET /stats 返回各类响应计数
+5. --drive 在进程内压测适配器，--async 时改用 AsyncProductionSpeechAdapter 并输出同时等待轮询的峰值
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import base64
+import asyncio
+import argparse
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.placeholder_audio import pcm16_wav, tone_pcm
+
+TTS_PATH = "/api/v1/tts"
+SAMPLE_RATE = 16000
+
+
+def parse_latency(spec: str):
+    """解析延迟分布描述，返回每次调用产生一个延迟（秒）的函数"""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # 以中位数和对数标准差描述，便于直接对照线上 p50
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@lru_cache(maxsize=64)
+def audio_base64(chars: int) -> str:
+    """按文本长度生成占位音频（每字0.1秒，最长5秒），同长度复用"""
+    duration = min(max(chars, 1) * 0.1, 5.0)
+    return base64.b64encode(pcm16_wav(tone_pcm(int(SAMPLE_RATE * duration), SAMPLE_RATE), SAMPLE_RATE)).decode('ascii')
+
+
+class StandinState:
+    """替身服务的配置、任务表和计数"""
+
+    def __init__(self, args):
+        self.ready_after = args.ready_after
+        self.sync_ratio = args.sync_ratio
+        self.pending_codes = [int(code) for code in args.pending_codes.split(",")]
+        self.rate_429 = args.rate_429
+        self.rate_5xx = args.rate_5xx
+        self.submit_latency = parse_latency(args.submit_latency)
+        self.query_latency = parse_latency(args.query_latency)
+        self.token = args.token
+        self.tasks = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    state: StandinState = None
+    protocol_version = "HTTP/1.1"  # keep-alive，与真实服务一致地复用连接
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.state.lock:
+                self._send(200, {"counts": dict(self.state.counts), "pending_tasks": len(self.state.tasks)})
+        else:
+            self._send(404, {"code": 404, "message": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if self.path != TTS_PATH:
+            self._send(404, {"code": 404, "message": "not found"})
+            return
+        state = self.state
+
+        try:
+            payload = json.loads(raw)
+            request = payload["request"]
+            operation = request.get("operation", "submit")
+            reqid = request["reqid"]
+        except (ValueError, KeyError, TypeError):
+            state.count("bad_request")
+            self._send(400, {"code": 3001, "message": "invalid request"})
+            return
+
+        time.sleep(state.submit_latency() if operation == "submit" else state.query_latency())
+
+        if state.token and self.headers.get('Authorization') != f"Bearer;{state.token}":
+            state.count("401")
+            self._send(401, {"code": 3001, "message": "invalid token"})
+            return
+        roll = random.random()
+        if roll < state.rate_429:
+            state.count("429")
+            self._send(429, {"code": 3005, "message": "rate limited"})
+            return
+        if roll < state.rate_429 + state.rate_5xx:
+            status = random.choice((500, 502, 503))
+            state.count(str(status))
+            self._send(status, {"code": 3031, "message": "server error"})
+            return
+
+        if operation == "submit":
+            self._submit(reqid, request.get("text", ""))
+        else:
+            self._query(reqid)
+
+    def _submit(self, reqid: str, text: str):
+        state = self.state
+        if random.random() < state.sync_ratio:
+            state.count("submit_sync")
+            self._send(200, {"code": 0, "message": "Success", "reqid": reqid, "data": audio_base64(len(text))})
+            return
+        with state.lock:
+            state.tasks[reqid] = {"chars": len(text), "polls": 0}
+        state.count("submit_async")
+        self._send(200, {"code": random.choice(state.pending_codes), "message": "submitted", "reqid": reqid})
+
+    def _query(self, reqid: str):
+        state = self.state
+        with state.lock:
+            task = state.tasks.get(reqid)
+            if task is not None:
+                task["polls"] += 1
+                ready = task["polls"] >= state.ready_after
+                if ready:
+                    del state.tasks[reqid]
+        if task is None:
+            state.count("query_unknown")
+            self._send(200, {"code": 3011, "message": f"reqid not found: {reqid}"})
+        elif ready:
+            state.count("query_ready")
+            self._send(200, {"code": 0, "message": "Success", "reqid": reqid, "data": audio_base64(task["chars"])})
+        else:
+            state.count("query_pending")
+            self._send(200, {"code": random.choice(state.pending_codes), "message": "processing", "reqid": reqid})
+
+
+def start_standin(args) -> ThreadingHTTPServer:
+    """在后台线程启动替身服务，返回服务器对象（server_address 为实际监听地址）"""
+    handler = type("BoundStandinHandler", (StandinHandler,), {"state": StandinState(args)})
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def drive(url: str, total: int, concurrency: int):
+    """用真实的 ProductionSpeechAdapter 并发合成，输出延迟分布和错误分类"""
+    import os
+    os.environ['TTS_API_URL'] = url
+    os.environ.setdefault('TTS_POLL_INTERVAL_MS', '50')
+    from services.histogram import LatencyHistogram
+    from services.speech.prod_adapter import ProductionSpeechAdapter
+
+    adapter = ProductionSpeechAdapter()
+    histogram = LatencyHistogram()
+    errors = {}
+    lock = threading.Lock()
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            adapter.synthesize(f"第{i}段：小兔子和月亮说晚安。")
+            with lock:
+                histogram.record(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                category = str(e).split(" error", 1)[0] if " error during " in str(e) else type(e).__name__
+                errors[category] = errors.get(category, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "requests": total,
+        "concurrency": concurrency,
+        "throughput_rps": round(total / elapsed, 1),
+        "latency": histogram.summary(),
+        "errors": errors
+    }, ensure_ascii=False, indent=2))
+
+
+def drive_async(url: str, total: int, concurrency: int):
+    """用 AsyncProductionSpeechAdapter 在单个事件循环上并发合成，输出延迟分布和同时等待轮询的峰值"""
+    import os
+    os.environ['TTS_API_URL'] = url
+    os.environ.setdefault('TTS_POLL_INTERVAL_MS', '50')
+    from services.histogram import LatencyHistogram
+    from services.speech.async_prod_adapter import AsyncProductionSpeechAdapter
+
+    histogram = LatencyHistogram()
+    errors = {}
+
+    async def run():
+        adapter = AsyncProductionSpeechAdapter()
+        semaphore = asyncio.Semaphore(concurrency)
+        peak = 0
+        done = asyncio.Event()
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await adapter.synthesize_async(f"第{i}段：小兔子和月亮说晚安。")
+                    histogram.record(time.perf_counter() - start)
+                except Exception as e:
+                    category = str(e).split(" error", 1)[0] if " error during " in str(e) else type(e).__name__
+                    errors[category] = errors.get(category, 0) + 1
+
+        async def sample():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, adapter.in_flight())
+                await asyncio.sleep(0.005)
+
+        sampler = asyncio.create_task(sample())
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await sampler
+        scheduler = adapter.get_scheduler()
+        await asyncio.sleep(0)  # 让调度协程处理最后一次唤醒
+        idle = scheduler._runner is None and not scheduler.outstanding
+        await adapter.aclose()
+        return elapsed, peak, idle
+
+    elapsed, peak, idle = asyncio.run(run())
+    print(json.dumps({
+        "requests": total,
+        "concurrency": concurrency,
+        "mode": "async",
+        "peak_polling": peak,
+        "scheduler_idle_after": idle,
+        "throughput_rps": round(total / elapsed, 1),
+        "latency": histogram.summary(),
+        "errors": errors
+    }, ensure_ascii=False, indent=2))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="火山引擎TTS本地替身服务")
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（0 为随机端口）')
+    parser.add_argument('--ready-after', type=int, default=3, help='第几次 query 返回音频')
+    parser.add_argument('--sync-ratio', type=float, default=0.0, help='submit 直接返回音频的比例')
+    parser.add_argument('--pending-codes', default='3000,3032', help='未完成时随机返回的 code')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='返回 429 的概率')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='返回 500/502/503 的概率')
+    parser.add_argument('--submit-latency', default='fixed:0.05', help='submit 延迟分布')
+    parser.add_argument('--query-latency', default='fixed:0.01', help='query 延迟分布')
+    parser.add_argument('--token', default='', help='要求的 Access Token（为空时不校验）')
+    parser.add_argument('--drive', type=int, default=0, help='在进程内用 ProductionSpeechAdapter 发起的请求数')
+    parser.add_argument('--concurrency', type=int, default=8, help='--drive 的并发数')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='--drive 时使用 AsyncProductionSpeechAdapter（单个事件循环）')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.drive:
+        args.port = args.port if args.port != 8765 else 0
+    server = start_standin(args)
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}{TTS_PATH}"
+
+    if args.drive:
+        (drive_async if args.use_async else drive)(url, args.drive, args.concurrency)
+        server.shutdown()
+        return
+
+    print(f"Volcengine TTS stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
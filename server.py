@@ -3,7 +3,12 @@ import os
 import sys
 import json
 import logging
+import argparse
+import importlib
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import urlparse
 from dotenv import load_dotenv
@@ -23,13 +28,37 @@ except ImportError as e:
 
 
 # --- API 模块导入 ---
-# 在启动时导入所有API模块，以提高性能和可维护性
+# 路由模块在第一次请求时才导入（见 _resolve_route）：无服务器平台每次冷启动只为实际访问的路由付出导入开销
 try:
-    from api import ark, tts, voice_clone, health, debug
+    from services.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_IN_FLIGHT
 except ImportError as e:
-    logging.critical(f"无法导入API模块. {e}", exc_info=True)
+    logging.critical(f"无法导入指标模块. {e}", exc_info=True)
     sys.exit(1)
 
+_route_handlers = {}
+_route_lock = threading.Lock()
+
+
+def _resolve_route(module_name):
+    """导入路由模块并返回其 handler 类（每个模块只导入一次）"""
+    handler_class = _route_handlers.get(module_name)
+    if handler_class is None:
+        with _route_lock:
+            handler_class = _route_handlers.get(module_name)
+            if handler_class is None:
+                handler_class = importlib.import_module(module_name).handler
+                _route_handlers[module_name] = handler_class
+    return handler_class
+
+
+def preload_routes():
+    """导入全部路由模块（常驻进程启动后在后台预热，导入失败只记录日志）"""
+    for module_name in sorted(set(APIRouterHandler.API_ROUTES.values())):
+        try:
+            _resolve_route(module_name)
+        except Exception as e:
+            logging.critical(f"无法导入API模块 {module_name}. {e}", exc_info=True)
+
 # --- 主应用 ---
 
 class APIRouterHandler(SimpleHTTPRequestHandler):
@@ -40,15 +69,23 @@ class APIRouterHandler(SimpleHTTPRequestHandler):
     """
 
     # --- API 路由配置 ---
-    # 一个简单的路由字典，将URL路径映射到它们的处理器类。
+    # 一个简单的路由字典，将URL路径映射到处理器所在的模块（模块中的 handler 类）。
     API_ROUTES = {
-        '/api/ark': ark.handler,
-        '/api/generate': ark.handler,
-        '/api/tts': tts.handler,
-        '/api/voice_clone': voice_clone.handler,
-        '/api/health': health.handler, # 新增的健康检查路由
+        '/api/ark': 'api.ark',
+        '/api/generate': 'api.ark',
+        '/api/tts': 'api.tts',
+        '/api/tts/jobs': 'api.tts_jobs',
+        '/api/voice_clone': 'api.voice_clone',
+        '/api/health': 'api.health', # 新增的健康检查路由
+        '/api/debug': 'api.debug',
+        '/api/metrics': 'api.metrics',
     }
 
+    def send_response(self, code, message=None):
+        # 记录响应状态码，供请求指标使用
+        self._status_code = code
+        super().send_response(code, message)
+
     def _send_json_response(self, status_code, data, headers=None):
         """发送标准JSON响应的辅助函数。"""
         try:
@@ -68,13 +105,26 @@ class APIRouterHandler(SimpleHTTPRequestHandler):
         所有 /api/ 请求的中央分派器。
         """
         parsed_path = urlparse(self.path)
-        handler_class = self.API_ROUTES.get(parsed_path.path)
-
-        if not handler_class:
+        module_name = self.API_ROUTES.get(parsed_path.path)
+        # 未知路径统一记为 other，避免指标标签无限增长
+        route = parsed_path.path if module_name else "other"
+        self._status_code = None
+        start_time = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(route)
+        try:
+            self._handle_api_request(parsed_path, module_name)
+        finally:
+            HTTP_IN_FLIGHT.dec(route)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time, route, self.command)
+            HTTP_REQUESTS.inc(route, self.command, str(self._status_code or 0))
+
+    def _handle_api_request(self, parsed_path, module_name):
+        if not module_name:
             self._send_json_response(404, {"error": "API endpoint not found"})
             return
 
         try:
+            handler_class = _resolve_route(module_name)
             method_name = f'do_{self.command}'
             handler_method = getattr(handler_class, method_name, None)
 
@@ -120,27 +170,74 @@ class APIRouterHandler(SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Auth-Token, X-Api-Resource-Id')
         self.end_headers()
 
-def run_server(port=8000):
-    """启动本地开发服务器。"""
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    使用有界线程池并发处理请求的HTTP服务器。
+    - 每个连接交给线程池中的一个工作线程处理，慢请求（如TTS轮询）不再阻塞其他请求。
+    - 所有工作线程都忙时，accept 循环会等待空闲线程，未接受的连接留在 socket backlog 中。
+    - 工作线程不是守护线程：server_close 先关闭监听 socket，再等待进行中的请求处理完毕。
+    """
+
+    def __init__(self, server_address, handler_class, workers):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._slots = threading.BoundedSemaphore(workers)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._process_request_in_worker, request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run_server(port=8000, workers=16):
+    """启动本地开发服务器。workers 为 1 时使用单线程的 HTTPServer。"""
     server_address = ('', port)
-    httpd = HTTPServer(server_address, APIRouterHandler)
-    logging.info(f"Starting server on port {port}...")
+    if workers > 1:
+        httpd = ThreadPoolHTTPServer(server_address, APIRouterHandler, workers)
+    else:
+        httpd = HTTPServer(server_address, APIRouterHandler)
+    logging.info(f"Starting server on port {port} with {workers} worker(s)...")
     logging.info(f"Server running at http://localhost:{port}/")
+    # 常驻进程不在意冷启动，端口就绪后在后台导入全部路由，首个请求不再承担导入开销
+    threading.Thread(target=preload_routes, name='route-preload', daemon=True).start()
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         logging.info("\nShutting down server...")
-        httpd.shutdown()
+    finally:
+        httpd.server_close()
 
 # 为Vercel运行时导出处理器
 handler = APIRouterHandler
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="本地开发服务器")
+    parser.add_argument('port', nargs='?', default='8000', help='监听端口（默认 8000）')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '16')),
+                        help='并发工作线程数，1 表示单线程（默认读取 SERVER_WORKERS，否则为 16）')
+    args = parser.parse_args()
+
     port = 8000
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            logging.warning(f"无效的端口号 '{sys.argv[1]}', 使用默认端口 {port}.")
+    try:
+        port = int(args.port)
+    except ValueError:
+        logging.warning(f"无效的端口号 '{args.port}', 使用默认端口 {port}.")
     
-    run_server(port)
+    run_server(port, workers=max(1, args.workers))
@@ -1,69 +1,15 @@
 import os
+import importlib
 from typing import Optional
 from .speech.base import SpeechSynthesizer
-from .speech.local_adapter import LocalSpeechAdapter
-from .speech.sandbox_adapter import SandboxSpeechAdapter
-from .speech.prod_adapter import ProductionSpeechAdapter
+from . import cache, costbook
 from .costbook import CostBook
 from .cache import TTSCache
+from .container import CONTAINER, MODE_ENV, SPEECH_ENV, env_fingerprint
 
 
-def get_speech_service(mode: Optional[str] = None) -> SpeechSynthesizer:
-    """
-    获取语音合成服务实例
-    
-    Args:
-        mode: 运行模式 ('local', 'sandbox', 'prod')，如果为None则从环境变量读取
-        
-    Returns:
-        语音合成服务实例
-        
-    Raises:
-        ValueError: 当模式不支持时
-    """
-    if mode is None:
-        # 检测运行环境，优先使用生产模式
-        mode = os.getenv('MODE')
-        if mode is None:
-            # 根据环境自动检测模式
-            if os.getenv('VERCEL') or os.getenv('VERCEL_ENV'):
-                # 在 Vercel 环境中，检查是否配置了TTS服务
-                # 支持两种配置方式：TTS_API_KEY 或 火山引擎的 TTS_APP_ID+TTS_ACCESS_TOKEN
-                tts_api_key = os.getenv('TTS_API_KEY', '')
-                tts_app_id = os.getenv('TTS_APP_ID', '')
-                tts_access_token = os.getenv('TTS_ACCESS_TOKEN', '')
-                
-                has_api_key = bool(tts_api_key and tts_api_key != 'your_tts_api_key_here')
-                has_volc_config = bool(tts_app_id and tts_access_token and 
-                                     tts_app_id != 'your_app_id_here' and 
-                                     tts_access_token != 'your_access_token_here')
-                
-                mode = 'prod' if (has_api_key or has_volc_config) else 'local'
-            elif os.getenv('RAILWAY_ENVIRONMENT') or os.getenv('RENDER'):
-                mode = 'prod'  # 其他云平台默认使用生产模式
-            else:
-                mode = 'local'  # 本地开发环境
-        mode = mode.lower()
-    
-    mode = mode.lower()
-    
-    if mode == 'local':
-        return LocalSpeechAdapter()
-    elif mode == 'sandbox':
-        return SandboxSpeechAdapter()
-    elif mode == 'prod':
-        try:
-            return ProductionSpeechAdapter()
-        except ValueError as e:
-            # 如果生产模式配置有问题，自动降级到本地模式
-            print(f"WARNING: Production TTS config error, falling back to local mode: {e}")
-            return LocalSpeechAdapter()
-    else:
-        raise ValueError(f"Unsupported mode: {mode}. Supported modes: local, sandbox, prod")
-
-
-def get_current_mode() -> str:
-    """获取当前运行模式"""
+def _detect_mode() -> str:
+    """根据环境变量判断运行模式"""
     mode = os.getenv('MODE')
     if mode is None:
         # 根据环境自动检测模式
@@ -87,6 +33,94 @@ def get_current_mode() -> str:
     return mode.lower()
 
 
+# 适配器模块在第一次构建对应模式的服务时才导入：生产适配器依赖 httpx，
+# services 包被每个路由（包括健康检查、指标）导入，冷启动时不应为此付出导入开销
+_ADAPTERS = {
+    'LocalSpeechAdapter': '.speech.local_adapter',
+    'SandboxSpeechAdapter': '.speech.sandbox_adapter',
+    'ProductionSpeechAdapter': '.speech.prod_adapter',
+}
+
+
+def __getattr__(name: str):
+    # 兼容 `from services import ProductionSpeechAdapter` 这类按名称导入
+    module = _ADAPTERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
+
+
+def _build_speech_service(mode: str) -> SpeechSynthesizer:
+    if mode == 'local':
+        from .speech.local_adapter import LocalSpeechAdapter
+        return LocalSpeechAdapter()
+    elif mode == 'sandbox':
+        from .speech.sandbox_adapter import SandboxSpeechAdapter
+        return SandboxSpeechAdapter()
+    elif mode == 'prod':
+        try:
+            from .speech.prod_adapter import ProductionSpeechAdapter
+            return ProductionSpeechAdapter()
+        except ValueError as e:
+            # 如果生产模式配置有问题，自动降级到本地模式
+            print(f"WARNING: Production TTS config error, falling back to local mode: {e}")
+            from .speech.local_adapter import LocalSpeechAdapter
+            return LocalSpeechAdapter()
+    else:
+        raise ValueError(f"Unsupported mode: {mode}. Supported modes: local, sandbox, prod")
+
+
+def get_speech_service(mode: Optional[str] = None) -> SpeechSynthesizer:
+    """
+    获取语音合成服务实例
+    
+    每种模式的适配器在进程内只构建一次并由各处理器共享（共用连接池，不再逐请求打印配置），
+    相关环境变量变化后下一次调用时重新构建。
+    
+    Args:
+        mode: 运行模式 ('local', 'sandbox', 'prod')，如果为None则从环境变量读取
+        
+    Returns:
+        语音合成服务实例
+        
+    Raises:
+        ValueError: 当模式不支持时
+    """
+    mode = get_current_mode() if mode is None else mode.lower()
+    if mode not in ('local', 'sandbox', 'prod'):
+        raise ValueError(f"Unsupported mode: {mode}. Supported modes: local, sandbox, prod")
+    return CONTAINER.get(f"speech:{mode}", env_fingerprint(SPEECH_ENV), lambda: _build_speech_service(mode))
+
+
+def _build_async_speech_service():
+    try:
+        from .speech.async_prod_adapter import AsyncProductionSpeechAdapter
+        return AsyncProductionSpeechAdapter()
+    except ValueError as e:
+        print(f"WARNING: Production TTS config error, async adapter disabled: {e}")
+        return None
+
+
+def get_async_speech_service():
+    """
+    获取 asyncio 版生产适配器（进程内共享），供后台任务在事件循环上合成
+    
+    只有 prod 模式才有异步适配器；其它模式，或 RECORD / REPLAY 时（磁带只接在同步客户端上）返回None，
+    调用方应退回同步路径。
+    
+    Returns:
+        AsyncProductionSpeechAdapter 实例或None
+    """
+    if get_current_mode() != 'prod' or is_record_mode() or is_replay_mode():
+        return None
+    return CONTAINER.get("speech_async:prod", env_fingerprint(SPEECH_ENV), _build_async_speech_service)
+
+
+def get_current_mode() -> str:
+    """获取当前运行模式（按相关环境变量缓存）"""
+    return CONTAINER.get("mode", env_fingerprint(MODE_ENV), _detect_mode)
+
+
 def is_dry_run() -> bool:
     """检查是否为干跑模式"""
     return os.getenv('DRY_RUN', 'false').lower() in ('true', '1', 'yes')
@@ -116,10 +150,10 @@ def is_record_mode() -> bool:
 
 
 def get_cost_book() -> CostBook:
-    """获取费用账本实例"""
-    return CostBook()
+    """获取费用账本实例（进程内共享）"""
+    return costbook.get_cost_book()
 
 
 def get_tts_cache() -> TTSCache:
-    """获取TTS缓存实例"""
-    return TTSCache()
\ No newline at end of file
+    """获取TTS缓存实例（进程内共享）"""
+    return cache.get_tts_cache()
\ No newline at end of file
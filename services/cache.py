@@ -4,12 +4,18 @@ import json
 import time
 from typing import Optional, Dict, Any
 from pathlib import Path
+from .cache_index import CacheIndex
+from .memory_cache import MemoryCache
+from .container import CONTAINER, CACHE_ENV, env_fingerprint
+
+# 内存层命中时同一条目至多每隔这么久（秒）向索引写一次访问时间
+ACCESS_TOUCH_INTERVAL = 60.0
 
 
 class TTSCache:
     """TTS结果缓存管理"""
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, memory_budget_bytes: Optional[int] = None):
         if cache_dir is None:
             # 在无状态平台上优先使用 /tmp，其它路径仅在可写时使用
             candidates = [
@@ -31,37 +37,11 @@ class TTSCache:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # 元数据文件
-        self.metadata_file = self.cache_dir / 'metadata.json'
-        self.metadata = self._load_metadata()
-    
-    def _load_metadata(self) -> Dict[str, Any]:
-        """加载缓存元数据"""
-        if self.metadata_file.exists():
-            try:
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                pass
+        # 索引（追加式 journal + 后台压缩的快照，兼容读取旧版 metadata.json）
+        self.index = CacheIndex(self.cache_dir)
         
-        return {
-            "version": "1.0",
-            "created": time.time(),
-            "entries": {},  # hash -> {file, text, voice, params, created, accessed, size}
-            "stats": {
-                "hits": 0,
-                "misses": 0,
-                "total_size": 0
-            }
-        }
-    
-    def _save_metadata(self):
-        """保存缓存元数据"""
-        try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Warning: Failed to save cache metadata: {e}")
+        # 进程内内存层（按字节预算LRU淘汰，预算为0时禁用）
+        self.memory = MemoryCache(memory_budget_bytes)
     
     def _generate_cache_key(self, text: str, voice: str = "default", params: Optional[Dict] = None) -> str:
         """
@@ -93,7 +73,8 @@ class TTSCache:
         """获取缓存文件路径"""
         return self.cache_dir / f"{cache_key}.bin"
     
-    def get(self, text: str, voice: str = "default", params: Optional[Dict] = None) -> Optional[bytes]:
+    def get(self, text: str, voice: str = "default", params: Optional[Dict] = None,
+            count_miss: bool = True) -> Optional[bytes]:
         """
         获取缓存的音频数据
         
@@ -101,35 +82,51 @@ class TTSCache:
             text: 要合成的文本
             voice: 音色参数
             params: 其他参数
+            count_miss: 未命中时是否计入统计（同一请求的重复查询应传 False）
             
         Returns:
             缓存的音频数据，如果不存在则返回None
         """
         cache_key = self._generate_cache_key(text, voice, params)
+        
+        # 内存层命中直接返回同一个 bytes 对象，不访问磁盘
+        audio_data = self.memory.get(cache_key)
+        if audio_data is not None:
+            # 最热的条目都在内存层命中；仍需刷新索引中的访问时间，否则 cleanup 会按年龄把它们淘汰
+            entry = self.index.entries.get(cache_key)
+            now = time.time()
+            if entry is not None and now - entry.get("accessed", 0) >= ACCESS_TOUCH_INTERVAL:
+                self.index.record_access(cache_key, now)
+            return audio_data
+        
         cache_file = self._get_cache_file_path(cache_key)
         
-        if not cache_file.exists():
-            self.metadata["stats"]["misses"] += 1
-            self._save_metadata()
+        # 先查内存索引（O(1)），避免对未缓存的文本做文件系统访问
+        if self.index.get(cache_key) is None:
+            if count_miss:
+                self.index.record_miss()
             return None
         
         try:
             with open(cache_file, 'rb') as f:
                 audio_data = f.read()
             
-            # 更新访问时间和统计
-            if cache_key in self.metadata["entries"]:
-                self.metadata["entries"][cache_key]["accessed"] = time.time()
-            
-            self.metadata["stats"]["hits"] += 1
-            self._save_metadata()
+            # 更新访问时间和统计（追加一条 touch 记录，O(1)）
+            self.index.record_touch(cache_key)
+            self.memory.put(cache_key, audio_data)
             
             return audio_data
             
+        except FileNotFoundError:
+            # 文件已被外部清理，同步索引
+            self.index.record_delete(cache_key)
+            if count_miss:
+                self.index.record_miss()
+            return None
         except Exception as e:
             print(f"Warning: Failed to read cache file {cache_file}: {e}")
-            self.metadata["stats"]["misses"] += 1
-            self._save_metadata()
+            if count_miss:
+                self.index.record_miss()
             return None
     
     def set(self, text: str, audio_data: bytes, voice: str = "default", params: Optional[Dict] = None):
@@ -153,7 +150,7 @@ class TTSCache:
             file_size = len(audio_data)
             current_time = time.time()
             
-            self.metadata["entries"][cache_key] = {
+            self.index.record_set(cache_key, {
                 "file": cache_file.name,
                 "text": text[:100],  # 只保存前100个字符用于调试
                 "voice": voice,
@@ -161,10 +158,8 @@ class TTSCache:
                 "created": current_time,
                 "accessed": current_time,
                 "size": file_size
-            }
-            
-            self.metadata["stats"]["total_size"] += file_size
-            self._save_metadata()
+            })
+            self.memory.put(cache_key, audio_data)
             
         except Exception as e:
             print(f"Warning: Failed to save cache file {cache_file}: {e}")
@@ -182,8 +177,7 @@ class TTSCache:
             是否存在缓存
         """
         cache_key = self._generate_cache_key(text, voice, params)
-        cache_file = self._get_cache_file_path(cache_key)
-        return cache_file.exists()
+        return self.index.get(cache_key) is not None
     
     def delete(self, text: str, voice: str = "default", params: Optional[Dict] = None) -> bool:
         """
@@ -199,19 +193,14 @@ class TTSCache:
         """
         cache_key = self._generate_cache_key(text, voice, params)
         cache_file = self._get_cache_file_path(cache_key)
+        self.memory.pop(cache_key)
         
         if not cache_file.exists():
             return False
         
         try:
-            # 更新统计
-            if cache_key in self.metadata["entries"]:
-                file_size = self.metadata["entries"][cache_key]["size"]
-                self.metadata["stats"]["total_size"] -= file_size
-                del self.metadata["entries"][cache_key]
-            
             cache_file.unlink()
-            self._save_metadata()
+            self.index.record_delete(cache_key)
             return True
             
         except Exception as e:
@@ -230,24 +219,28 @@ class TTSCache:
         max_age_seconds = max_age_days * 24 * 3600
         max_size_bytes = max_size_mb * 1024 * 1024
         
+        # 先追上其他进程的写入
+        self.index.refresh()
+        entries = list(self.index.entries.items())
+        
         # 收集需要删除的条目
         entries_to_delete = []
         
-        for cache_key, entry in self.metadata["entries"].items():
+        for cache_key, entry in entries:
             # 检查年龄
             age = current_time - entry["accessed"]
             if age > max_age_seconds:
                 entries_to_delete.append(cache_key)
         
         # 如果总大小超过限制，删除最旧的条目
-        if self.metadata["stats"]["total_size"] > max_size_bytes:
+        if self.index.stats["total_size"] > max_size_bytes:
             # 按访问时间排序
             sorted_entries = sorted(
-                self.metadata["entries"].items(),
+                entries,
                 key=lambda x: x[1]["accessed"]
             )
             
-            current_size = self.metadata["stats"]["total_size"]
+            current_size = self.index.stats["total_size"]
             for cache_key, entry in sorted_entries:
                 if current_size <= max_size_bytes:
                     break
@@ -259,14 +252,13 @@ class TTSCache:
         deleted_count = 0
         for cache_key in entries_to_delete:
             cache_file = self._get_cache_file_path(cache_key)
+            self.memory.pop(cache_key)
             try:
                 if cache_file.exists():
                     cache_file.unlink()
                 
-                if cache_key in self.metadata["entries"]:
-                    file_size = self.metadata["entries"][cache_key]["size"]
-                    self.metadata["stats"]["total_size"] -= file_size
-                    del self.metadata["entries"][cache_key]
+                if cache_key in self.index:
+                    self.index.record_delete(cache_key)
                 
                 deleted_count += 1
                 
@@ -274,35 +266,50 @@ class TTSCache:
                 print(f"Warning: Failed to delete cache file {cache_file}: {e}")
         
         if deleted_count > 0:
-            self._save_metadata()
             print(f"Cleaned up {deleted_count} cache entries")
     
     def get_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        stats = self.metadata["stats"].copy()
+        self.index.refresh()
+        stats = self.index.stats.copy()
+        memory_stats = self.memory.get_stats()
         
-        # 计算命中率
-        total_requests = stats["hits"] + stats["misses"]
-        hit_rate = (stats["hits"] / total_requests * 100) if total_requests > 0 else 0
+        # 磁盘层命中率（只统计穿透内存层的请求）
+        disk_requests = stats["hits"] + stats["misses"]
+        disk_hit_rate = (stats["hits"] / disk_requests * 100) if disk_requests > 0 else 0
+        
+        # 总命中率：内存层命中 + 磁盘层命中
+        hits = memory_stats["hits"] + stats["hits"]
+        total_requests = hits + stats["misses"]
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         
         # 计算大小（MB）
         size_mb = stats["total_size"] / (1024 * 1024)
         
         return {
             "hit_rate": round(hit_rate, 1),
-            "total_entries": len(self.metadata["entries"]),
+            "total_entries": len(self.index),
             "total_size_mb": round(size_mb, 2),
-            "hits": stats["hits"],
-            "misses": stats["misses"]
+            "hits": hits,
+            "misses": stats["misses"],
+            "tiers": {
+                "memory": memory_stats,
+                "disk": {
+                    "entries": len(self.index),
+                    "bytes_held": stats["total_size"],
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "hit_rate": round(disk_hit_rate, 1)
+                }
+            }
         }
 
 
-# 全局实例
+# 全局实例（由服务容器管理，缓存相关配置变化后重新构建）
 _tts_cache = None
 
 def get_tts_cache() -> TTSCache:
     """获取全局TTS缓存实例"""
     global _tts_cache
-    if _tts_cache is None:
-        _tts_cache = TTSCache()
+    _tts_cache = CONTAINER.get("tts_cache", env_fingerprint(CACHE_ENV), TTSCache)
     return _tts_cache
\ No newline at end of file
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import threading
+from typing import Optional, Dict, Any
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发环境没有 fcntl，退化为进程内锁
+    fcntl = None
+
+
+class CacheIndex:
+    """
+    TTS缓存索引（追加式日志 + 快照）
+
+    - 所有变更（set/touch/access/delete/miss）以单行JSON追加写入 journal，写入代价为 O(1)
+    - 内存中维护 entries 字典，查找为 O(1)
+    - journal 记录数超过阈值时，在后台线程中压缩为 snapshot，并切换到新的 journal
+    - 多进程通过锁文件协调：追加写持共享锁，压缩持排他锁
+    """
+
+    SNAPSHOT_NAME = 'index.snapshot.json'
+    JOURNAL_NAME = 'index.journal'
+    LOCK_NAME = 'index.lock'
+    LEGACY_METADATA_NAME = 'metadata.json'
+
+    def __init__(self, index_dir: Path, compact_threshold: Optional[int] = None):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        if compact_threshold is None:
+            compact_threshold = int(os.getenv('TTS_CACHE_COMPACT_THRESHOLD', '10000'))
+        self.compact_threshold = compact_threshold
+
+        self.snapshot_file = self.index_dir / self.SNAPSHOT_NAME
+        self.journal_file = self.index_dir / self.JOURNAL_NAME
+        self.lock_file = self.index_dir / self.LOCK_NAME
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, Any] = {"hits": 0, "misses": 0, "total_size": 0}
+        self.created = time.time()
+
+        self._lock = threading.RLock()
+        self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        self._journal_fd = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._compacting = False
+
+        self._load()
+
+    # --- 文件锁 ---
+
+    def _flock(self, exclusive: bool):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _funlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # --- 加载与回放 ---
+
+    def _load(self):
+        """加载快照并回放 journal"""
+        with self._lock:
+            self._flock(exclusive=False)
+            try:
+                self._load_snapshot()
+                self._open_journal()
+                self._replay_tail()
+            finally:
+                self._funlock()
+
+    def _load_snapshot(self):
+        """加载快照；首次启动时从旧版 metadata.json 迁移"""
+        data = None
+        for path in (self.snapshot_file, self.index_dir / self.LEGACY_METADATA_NAME):
+            if path.exists():
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    break
+                except Exception:
+                    continue
+
+        self.entries = {}
+        self.stats = {"hits": 0, "misses": 0, "total_size": 0}
+        if data:
+            self.entries = data.get("entries", {})
+            self.stats.update(data.get("stats", {}))
+            self.created = data.get("created", self.created)
+
+    def _open_journal(self):
+        """打开（或创建）当前 journal，从头开始回放"""
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+        self._journal_fd = os.open(self.journal_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._journal_offset = 0
+        self._journal_records = 0
+
+    def _journal_rotated(self) -> bool:
+        """检查当前打开的 journal 是否已被其他进程压缩替换"""
+        try:
+            return os.fstat(self._journal_fd).st_ino != os.stat(self.journal_file).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _replay_tail(self):
+        """回放 journal 中自上次读取以来新增的记录"""
+        size = os.fstat(self._journal_fd).st_size
+        if size <= self._journal_offset:
+            return
+
+        chunk = os.pread(self._journal_fd, size - self._journal_offset, self._journal_offset)
+        # 只处理完整的行，残缺的尾行留到下次
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            return
+        for line in chunk[:end].split(b'\n'):
+            if not line:
+                continue
+            try:
+                self._apply(json.loads(line))
+            except Exception:
+                continue
+            self._journal_records += 1
+        self._journal_offset += end + 1
+
+    def _apply(self, record: Dict[str, Any]):
+        """将一条 journal 记录应用到内存状态"""
+        op = record.get("op")
+        key = record.get("k")
+        if op == "set":
+            old = self.entries.get(key)
+            if old:
+                self.stats["total_size"] -= old.get("size", 0)
+            self.entries[key] = record["e"]
+            self.stats["total_size"] += record["e"].get("size", 0)
+        elif op == "touch":
+            if key in self.entries:
+                self.entries[key]["accessed"] = record["t"]
+            self.stats["hits"] += 1
+        elif op == "access":
+            if key in self.entries:
+                self.entries[key]["accessed"] = record["t"]
+        elif op == "delete":
+            old = self.entries.pop(key, None)
+            if old:
+                self.stats["total_size"] -= old.get("size", 0)
+        elif op == "miss":
+            self.stats["misses"] += 1
+
+    def refresh(self):
+        """追上其他进程写入的记录（无新记录时仅需一次 fstat）"""
+        with self._lock:
+            if self._journal_rotated():
+                self._load()
+            else:
+                self._replay_tail()
+
+    # --- 写入 ---
+
+    def _append(self, record: Dict[str, Any]):
+        """追加一条记录到 journal 并应用到内存"""
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._flock(exclusive=False)
+            try:
+                if self._journal_rotated():
+                    self._load_snapshot()
+                    self._open_journal()
+                # 共享锁下其他进程可能同时追加，本条记录之前或之后都可能插入别人的记录；
+                # 写入后回放到文件末尾（包括本条），内存状态始终按 journal 中的实际顺序应用
+                os.write(self._journal_fd, line)
+                self._replay_tail()
+            finally:
+                self._funlock()
+
+            if self._journal_records >= self.compact_threshold and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def record_set(self, key: str, entry: Dict[str, Any]):
+        """记录新增或覆盖的缓存条目"""
+        self._append({"op": "set", "k": key, "e": entry})
+
+    def record_touch(self, key: str, accessed: Optional[float] = None):
+        """记录一次命中（同时更新访问时间）"""
+        self._append({"op": "touch", "k": key, "t": accessed or time.time()})
+
+    def record_access(self, key: str, accessed: Optional[float] = None):
+        """只更新访问时间、不计入命中（内存层命中由内存层自己统计）"""
+        self._append({"op": "access", "k": key, "t": accessed or time.time()})
+
+    def record_delete(self, key: str):
+        """记录删除的缓存条目"""
+        self._append({"op": "delete", "k": key})
+
+    def record_miss(self):
+        """记录一次未命中"""
+        self._append({"op": "miss"})
+
+    # --- 查询 ---
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """O(1) 查找条目元数据（先追上其他进程的写入，无新记录时只有一次 fstat/stat）"""
+        self.refresh()
+        return self.entries.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # --- 压缩 ---
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Warning: Failed to compact cache index: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """将当前状态写入快照，并以空 journal 替换旧 journal"""
+        with self._lock:
+            self._flock(exclusive=True)
+            try:
+                if self._journal_rotated():
+                    self._load_snapshot()
+                    self._open_journal()
+                self._replay_tail()
+
+                snapshot = {
+                    "version": "2.0",
+                    "created": self.created,
+                    "compacted": time.time(),
+                    "entries": self.entries,
+                    "stats": self.stats
+                }
+                tmp_snapshot = self.snapshot_file.with_suffix('.tmp')
+                with open(tmp_snapshot, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_snapshot, self.snapshot_file)
+
+                # 以新文件替换 journal；其他进程通过 inode 变化感知并重新加载
+                tmp_journal = self.journal_file.with_suffix('.journal.tmp')
+                open(tmp_journal, 'wb').close()
+                os.replace(tmp_journal, self.journal_file)
+                self._open_journal()
+            finally:
+                self._funlock()
+
+    def close(self):
+        """关闭文件描述符"""
+        with self._lock:
+            if self._journal_fd is not None:
+                os.close(self._journal_fd)
+                self._journal_fd = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def __del__(self):
+        # 服务容器替换实例时不主动关闭（仍可能有请求在用），最后一个引用释放时关闭文件描述符
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,70 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 各服务构建时读取的环境变量；取值变化后下一次获取会重新构建
+MODE_ENV = ('MODE', 'VERCEL', 'VERCEL_ENV', 'TTS_API_KEY', 'TTS_APP_ID', 'TTS_ACCESS_TOKEN',
+            'RAILWAY_ENVIRONMENT', 'RENDER')
+SPEECH_ENV = MODE_ENV + ('TTS_API_URL', 'TTS_MAX_WAIT_MS', 'TTS_POLL_INTERVAL_MS', 'TTS_BACKOFF_FACTOR',
+                         'TTS_MAX_POLL_INTERVAL_MS', 'TTS_PRICE_PER_1K_CHAR', 'TTS_HIGH_QUALITY_MULTIPLIER')
+CACHE_ENV = ('TTS_MEMORY_CACHE_MB', 'TTS_CACHE_COMPACT_THRESHOLD')
+COSTBOOK_ENV = ('COSTBOOK_COMPACT_THRESHOLD', 'COSTBOOK_RESERVATION_TTL')
+
+
+def env_fingerprint(names: Tuple[str, ...]) -> Tuple[Optional[str], ...]:
+    """相关环境变量的当前取值（每次获取服务都会计算）"""
+    return tuple(map(os.environ.get, names))
+
+
+class ServiceContainer:
+    """
+    进程内共享的服务实例
+
+    每个实例与构建时的配置指纹（相关环境变量的取值）一起保存：
+    - 指纹未变时直接返回已有实例（只读字典，不加锁）
+    - 指纹变化或首次获取时在锁内重新构建，并发的首次请求只构建一次
+    被替换（或 reset 丢弃）的旧实例只释放容器持有的引用，仍在使用它的请求可以正常完成；
+    最后一个引用释放时实例自行关闭文件描述符（CostBook / CacheIndex 的 __del__）。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Tuple[tuple, Any]] = {}
+        self._builds: Dict[str, int] = {}
+
+    def get(self, name: str, fingerprint: tuple, factory: Callable[[], Any]) -> Any:
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == fingerprint:
+                return entry[1]
+            instance = factory()
+            self._entries[name] = (fingerprint, instance)
+            self._builds[name] = self._builds.get(name, 0) + 1
+            return instance
+
+    def peek(self, name: str) -> Any:
+        """已构建的实例（不触发构建），不存在时返回None"""
+        entry = self._entries.get(name)
+        return entry[1] if entry is not None else None
+
+    def reset(self, name: Optional[str] = None):
+        """丢弃实例（name 为None时全部丢弃），下次获取时重新构建"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "services": sorted(self._entries),
+                "builds": dict(self._builds)
+            }
+
+
+# 全局实例
+CONTAINER = ServiceContainer()
@@ -1,14 +1,53 @@
 import os
 import json
 import time
+import uuid
+import struct
+import threading
 from datetime import datetime, date, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from .histogram import LatencyHistogram
+from .container import CONTAINER, COSTBOOK_ENV, env_fingerprint
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发环境没有 fcntl，退化为进程内锁
+    fcntl = None
 
 
 class CostBook:
-    """费用账本管理"""
-    
-    def __init__(self, storage_path: Optional[str] = None):
+    """
+    费用账本管理（追加式定长记录 + 汇总快照）
+
+    - 每次 commit 只向 costbook.v2.log 追加一条 96 字节的定长记录，不重写历史
+    - 内存中增量维护总计、按日和按小时汇总，以及按 提供商/音色/缓存命中 拆分的延迟直方图；
+      读取前只回放其他进程新追加的记录
+    - record_latency 写入的记录（如 /api/tts 的每次合成）只进延迟直方图，不计入费用和调用汇总，
+      不影响预算检查
+    - 多进程通过锁文件协调：追加写持共享锁（O_APPEND 保证单条记录原子写入），压缩持排他锁
+    - 日志记录数超过阈值时，把汇总写入快照（costbook.json）并以空日志替换
+    - 预算预留（reserve → commit/release）保存在独立的定长槽位文件中，持该文件的排他锁完成
+      “检查余额 + 占位”，多线程/多进程并发请求不会同时通过预算检查
+    """
+
+    # 日志头：魔数、格式版本、快照代数；记录：时间戳、费用、延迟、标志位、提供商、音色
+    HEADER = struct.Struct('<4sHxxQ16x')
+    RECORD = struct.Struct('<dddB7x16s48s')
+    MAGIC = b'CBK1'
+    FORMAT_VERSION = 2
+    # 旧格式日志（v1 无提供商/音色字段），加载时迁移
+    LEGACY_RECORDS = {1: struct.Struct('<dddB7x')}
+    FLAG_FROM_CACHE = 0x01
+    FLAG_ERROR = 0x02
+    FLAG_METRICS_ONLY = 0x04
+    # 每个日/小时桶内单独统计的音色数上限（音色来自请求体），超出的新音色归入 OTHER_VOICE
+    MAX_TRACKED_VOICES = 64
+    OTHER_VOICE = "other"
+    # 预留槽位：预留ID（全零表示空槽）、金额、过期时间
+    RESERVATION_SLOT = struct.Struct('<16sdd')
+    EMPTY_RESERVATION = bytes(16)
+
+    def __init__(self, storage_path: Optional[str] = None, compact_threshold: Optional[int] = None):
         if storage_path is None:
             # 选择一个可写的路径，优先 /tmp（Vercel 等无状态平台唯一可写目录）
             candidates = [
@@ -28,22 +67,42 @@ class CostBook:
                 except Exception:
                     continue
             storage_path = chosen or './costbook.json'
-        
+
+        if compact_threshold is None:
+            compact_threshold = int(os.getenv('COSTBOOK_COMPACT_THRESHOLD', '10000'))
+        self.compact_threshold = compact_threshold
+        # 未结算的预留超过该时间（如进程崩溃）后自动失效
+        self.reservation_ttl = float(os.getenv('COSTBOOK_RESERVATION_TTL', '300'))
+
         self.storage_path = storage_path
-        self.data = self._load_data()
-    
-    def _load_data(self) -> Dict[str, Any]:
-        """加载账本数据"""
-        if os.path.exists(self.storage_path):
-            try:
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                pass
-        
-        # 默认数据结构
+        self._base_path = storage_path[:-len('.json')] if storage_path.endswith('.json') else storage_path
+        self.log_path = f"{self._base_path}.v{self.FORMAT_VERSION}.log"
+        self.lock_path = f"{self._base_path}.lock"
+        self.reservations_path = f"{self._base_path}.reservations"
+        os.makedirs(os.path.dirname(os.path.abspath(storage_path)), exist_ok=True)
+
+        self.data: Dict[str, Any] = self._empty_data()
+        # {"daily"/"hourly": {时间键: {(提供商, 音色, "hit"/"miss"): 直方图}}}
+        self.histograms: Dict[str, Dict[str, Dict[Tuple[str, str, str], LatencyHistogram]]] = {"daily": {}, "hourly": {}}
+        self.generation = 0
+
+        self._lock = threading.RLock()
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._reservations_fd = os.open(self.reservations_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._log_fd = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._compacting = False
+
+        self._load()
+        self._migrate_legacy_logs()
+
+    @staticmethod
+    def _empty_data() -> Dict[str, Any]:
+        """默认数据结构"""
         return {
             "daily_stats": {},  # 按日期存储统计
+            "hourly_stats": {},  # 按小时存储统计（YYYY-MM-DDTHH）
             "total_calls": 0,
             "total_cost": 0.0,
             "cache_hits": 0,
@@ -51,112 +110,466 @@ class CostBook:
             "errors": 0,
             "last_updated": time.time()
         }
-    
-    def _save_data(self):
-        """保存账本数据"""
-        self.data["last_updated"] = time.time()
+
+    @staticmethod
+    def _empty_bucket() -> Dict[str, Any]:
+        return {
+            "calls": 0,
+            "cost": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "errors": 0,
+            "avg_latency": 0.0,
+            "total_latency": 0.0
+        }
+
+    # --- 文件锁 ---
+
+    def _flock(self, exclusive: bool, fd: Optional[int] = None):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd if fd is None else fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _funlock(self, fd: Optional[int] = None):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd if fd is None else fd, fcntl.LOCK_UN)
+
+    # --- 加载与回放 ---
+
+    def _load(self):
+        """加载快照并回放日志；日志缺失或早于快照时在排他锁下重建"""
+        with self._lock:
+            self._flock(exclusive=False)
+            try:
+                log_valid = self._reload_locked()
+            finally:
+                self._funlock()
+            if log_valid:
+                return
+
+            self._flock(exclusive=True)
+            try:
+                if not self._reload_locked():
+                    self._replace_log(self.generation)
+            finally:
+                self._funlock()
+
+    def _reload_locked(self) -> bool:
+        """重新加载快照和日志（调用方持有文件锁），日志可用时返回True"""
+        self._load_snapshot()
+        self._open_log()
+        if not self._check_log_header():
+            return False
+        self._replay_tail()
+        return True
+
+    def _load_snapshot(self):
+        """加载汇总快照（兼容旧版整体重写的 costbook.json）"""
+        self.data = self._empty_data()
+        self.histograms = {"daily": {}, "hourly": {}}
+        self.generation = 0
+        if os.path.exists(self.storage_path):
+            try:
+                with open(self.storage_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self.generation = snapshot.pop("generation", 0)
+                snapshot.pop("version", None)
+                for period, buckets in snapshot.pop("latency_histograms", {}).items():
+                    self.histograms[period] = {key: self._load_dimensions(dims) for key, dims in buckets.items()}
+                self.data.update(snapshot)
+            except Exception:
+                pass
+
+    def _open_log(self):
+        if self._log_fd is not None:
+            os.close(self._log_fd)
+        self._log_fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._log_offset = 0
+        self._log_records = 0
+
+    def _check_log_header(self) -> bool:
+        """
+        校验日志头
+
+        日志代数小于快照代数说明压缩时在替换日志前中断，其中的记录已计入快照，不能再回放。
+        """
+        header = os.pread(self._log_fd, self.HEADER.size, 0)
+        if len(header) < self.HEADER.size:
+            return False
+        magic, version, generation = self.HEADER.unpack(header)
+        if magic != self.MAGIC or version != self.FORMAT_VERSION or generation < self.generation:
+            return False
+        self._log_offset = self.HEADER.size
+        return True
+
+    def _replace_log(self, generation: int):
+        """以只含日志头的新文件替换日志；其他进程通过 inode 变化感知"""
+        tmp_log = f"{self.log_path}.tmp"
+        with open(tmp_log, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, generation))
+        os.replace(tmp_log, self.log_path)
+        self._open_log()
+        self._log_offset = self.HEADER.size
+
+    def _log_rotated(self) -> bool:
+        """检查当前打开的日志是否已被其他进程替换"""
         try:
-            os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Warning: Failed to save cost book: {e}")
-    
+            return os.fstat(self._log_fd).st_ino != os.stat(self.log_path).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _replay_tail(self):
+        """回放日志中自上次读取以来新增的完整记录"""
+        size = os.fstat(self._log_fd).st_size
+        count = (size - self._log_offset) // self.RECORD.size
+        if count <= 0:
+            return
+        chunk = os.pread(self._log_fd, count * self.RECORD.size, self._log_offset)
+        for timestamp, cost, latency, flags, provider, voice in self.RECORD.iter_unpack(chunk):
+            self._apply(timestamp, cost, latency, flags, self._decode_label(provider), self._decode_label(voice))
+        self._log_offset += len(chunk)
+        self._log_records += count
+
+    @staticmethod
+    def _encode_label(value: Optional[str], size: int) -> bytes:
+        return (value or "unknown").encode('utf-8')[:size]
+
+    @staticmethod
+    def _decode_label(value: bytes) -> str:
+        return value.rstrip(b'\0').decode('utf-8', errors='ignore') or "unknown"
+
+    @staticmethod
+    def _dimension_key(provider: str, voice: str, from_cache: bool) -> Tuple[str, str, str]:
+        return (provider, voice, 'hit' if from_cache else 'miss')
+
+    @classmethod
+    def _load_dimensions(cls, dims) -> Dict[Tuple[str, str, str], LatencyHistogram]:
+        """
+        读取快照中一个时间桶的直方图
+
+        当前格式为 [[提供商, 音色, hit/miss, 直方图], ...]；旧格式以 "提供商|音色|hit/miss" 为键，
+        音色本身可能含 "|"，按首个和最后一个分隔符拆分。
+        """
+        if isinstance(dims, list):
+            return {(provider, voice, cache): LatencyHistogram.from_dict(h) for provider, voice, cache, h in dims}
+        loaded = {}
+        for dimension, h in dims.items():
+            provider, _, rest = dimension.partition('|')
+            voice, _, cache = rest.rpartition('|')
+            loaded[(provider, voice, cache)] = LatencyHistogram.from_dict(h)
+        return loaded
+
+    def _histogram_for(self, dims: Dict[Tuple[str, str, str], LatencyHistogram], provider: str, voice: str,
+                       from_cache: bool) -> LatencyHistogram:
+        """
+        取出（或创建）一个维度的直方图
+
+        音色取自请求体，每个时间桶内最多单独统计 MAX_TRACKED_VOICES 个，之后出现的新音色归入 OTHER_VOICE。
+        各进程按相同顺序回放同一份日志，归并结果一致。
+        """
+        dimension = self._dimension_key(provider, voice, from_cache)
+        histogram = dims.get(dimension)
+        if histogram is not None:
+            return histogram
+        voices = {dim_voice for _, dim_voice, _ in dims}
+        if voice not in voices and len(voices) >= self.MAX_TRACKED_VOICES:
+            dimension = self._dimension_key(provider, self.OTHER_VOICE, from_cache)
+            histogram = dims.get(dimension)
+            if histogram is not None:
+                return histogram
+        histogram = dims[dimension] = LatencyHistogram()
+        return histogram
+
+    def _apply(self, timestamp: float, cost: float, latency: float, flags: int,
+               provider: str = "unknown", voice: str = "unknown"):
+        """将一条记录增量计入总计、当日和当小时汇总及延迟直方图（只计延迟的记录只进直方图）"""
+        moment = datetime.fromtimestamp(timestamp)
+        day_key = moment.date().isoformat()
+        hour_key = moment.strftime('%Y-%m-%dT%H')
+
+        from_cache = bool(flags & self.FLAG_FROM_CACHE)
+        error = bool(flags & self.FLAG_ERROR)
+
+        for period, key in (("daily", day_key), ("hourly", hour_key)):
+            dims = self.histograms[period].setdefault(key, {})
+            self._histogram_for(dims, provider, voice, from_cache).record(latency)
+
+        if flags & self.FLAG_METRICS_ONLY:
+            return
+
+        day_stats = self.data["daily_stats"].setdefault(day_key, self._empty_bucket())
+        hour_stats = self.data["hourly_stats"].setdefault(hour_key, self._empty_bucket())
+
+        for stats in (day_stats, hour_stats):
+            stats["calls"] += 1
+            stats["cost"] += cost
+            stats["total_latency"] += latency
+            stats["avg_latency"] = stats["total_latency"] / stats["calls"]
+            stats["cache_hits" if from_cache else "cache_misses"] += 1
+            if error:
+                stats["errors"] += 1
+
+        self.data["cache_hits" if from_cache else "cache_misses"] += 1
+        if error:
+            self.data["errors"] += 1
+        self.data["total_calls"] += 1
+        self.data["total_cost"] += cost
+        self.data["last_updated"] = max(self.data["last_updated"], timestamp)
+
+    def refresh(self):
+        """追上其他进程追加的记录（无新记录时只有一次 fstat/stat）"""
+        with self._lock:
+            if self._log_rotated():
+                self._load()
+            else:
+                self._replay_tail()
+
+    # --- 写入 ---
+
+    def commit(self, cost: float, latency: float = 0.0, from_cache: bool = False, error: bool = False,
+               provider: Optional[str] = None, voice: Optional[str] = None,
+               reservation_id: Optional[str] = None, metrics_only: bool = False):
+        """
+        提交一次调用记录
+
+        Args:
+            cost: 本次调用费用（实际费用，可与预留金额不同）
+            latency: 延迟时间（秒）
+            from_cache: 是否来自缓存
+            error: 是否出错
+            provider: 提供商名称（延迟直方图维度）
+            voice: 音色（延迟直方图维度，超过48字节截断）
+            reservation_id: reserve() 返回的预留ID，记录写入后释放该预留
+            metrics_only: 只计入延迟直方图，不计入费用和调用汇总（见 record_latency）
+        """
+        flags = (self.FLAG_FROM_CACHE if from_cache else 0) | (self.FLAG_ERROR if error else 0) | \
+            (self.FLAG_METRICS_ONLY if metrics_only else 0)
+        timestamp = time.time()
+        provider_label = self._encode_label(provider, 16)
+        voice_label = self._encode_label(voice, 48)
+        record = self.RECORD.pack(timestamp, cost, latency, flags, provider_label, voice_label)
+
+        with self._lock:
+            try:
+                self._flock(exclusive=False)
+                try:
+                    while self._log_rotated() and not self._reload_locked():
+                        # 新日志尚未写好日志头：释放共享锁，在排他锁下重建后重试
+                        self._funlock()
+                        self._load()
+                        self._flock(exclusive=False)
+                    # 共享锁下其他进程可能同时追加，本条记录前后都可能插入别人的记录；
+                    # 写入后回放到文件末尾（包括本条），本地汇总始终按日志中的实际顺序计入
+                    os.write(self._log_fd, record)
+                    self._replay_tail()
+                finally:
+                    self._funlock()
+            except Exception as e:
+                print(f"Warning: Failed to save cost book: {e}")
+
+            if self._log_records >= self.compact_threshold and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+        # 先记账再释放预留：两步之间的并发检查会把这笔费用算两次，只会更保守
+        if reservation_id is not None:
+            self.release(reservation_id)
+
+    def record_latency(self, latency: float, from_cache: bool = False, error: bool = False,
+                       provider: Optional[str] = None, voice: Optional[str] = None):
+        """
+        只记录一次调用的延迟（按 提供商/音色/缓存命中 计入直方图）
+
+        不计入费用、调用数和缓存命中等汇总，预算检查（reserve / will_exceed_today）不受影响。
+        """
+        self.commit(cost=0.0, latency=latency, from_cache=from_cache, error=error,
+                    provider=provider, voice=voice, metrics_only=True)
+
+    # --- 预算预留 ---
+
+    def _read_reservation_slots(self):
+        content = os.pread(self._reservations_fd, os.fstat(self._reservations_fd).st_size, 0)
+        usable = len(content) - len(content) % self.RESERVATION_SLOT.size
+        return list(self.RESERVATION_SLOT.iter_unpack(content[:usable]))
+
+    def _active_reserved(self, slots, now: float) -> float:
+        return sum(amount for slot_id, amount, expires in slots
+                   if slot_id != self.EMPTY_RESERVATION and expires > now)
+
+    def reserve(self, amount: float, limit: float, ttl_seconds: Optional[float] = None) -> Optional[str]:
+        """
+        原子地预留一笔费用
+
+        在预留文件的排他锁内读取今日已花费和所有未过期的预留，加上本次金额不超过限额时占用一个槽位。
+        调用方完成后用 commit(..., reservation_id=...) 按实际费用结算，失败时 release() 释放。
+
+        Args:
+            amount: 预留金额（通常为 estimate_cost 的结果）
+            limit: 每日费用限制（元）
+            ttl_seconds: 预留有效期，默认读取 COSTBOOK_RESERVATION_TTL
+
+        Returns:
+            预留ID；预算不足时返回None
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.reservation_ttl
+        reservation_id = uuid.uuid4().bytes
+        with self._lock:
+            self._flock(exclusive=True, fd=self._reservations_fd)
+            try:
+                self.refresh()
+                now = time.time()
+                slots = self._read_reservation_slots()
+                committed = self._get_today_stats()["cost"] + self._active_reserved(slots, now)
+                if committed >= limit or committed + amount > limit:
+                    return None
+
+                free_index = next((index for index, (slot_id, _, expires) in enumerate(slots)
+                                   if slot_id == self.EMPTY_RESERVATION or expires <= now), len(slots))
+                os.pwrite(self._reservations_fd,
+                          self.RESERVATION_SLOT.pack(reservation_id, amount, now + ttl_seconds),
+                          free_index * self.RESERVATION_SLOT.size)
+            finally:
+                self._funlock(fd=self._reservations_fd)
+        return reservation_id.hex()
+
+    def release(self, reservation_id: str) -> bool:
+        """
+        释放预留（不记账）
+
+        Returns:
+            是否找到并释放了该预留（已过期被复用的槽位返回False）
+        """
+        target = bytes.fromhex(reservation_id)
+        with self._lock:
+            self._flock(exclusive=True, fd=self._reservations_fd)
+            try:
+                for index, (slot_id, _, _) in enumerate(self._read_reservation_slots()):
+                    if slot_id == target:
+                        os.pwrite(self._reservations_fd, bytes(self.RESERVATION_SLOT.size),
+                                  index * self.RESERVATION_SLOT.size)
+                        return True
+                return False
+            finally:
+                self._funlock(fd=self._reservations_fd)
+
+    def get_reserved_total(self) -> float:
+        """当前未结算、未过期的预留总额"""
+        with self._lock:
+            self._flock(exclusive=False, fd=self._reservations_fd)
+            try:
+                return self._active_reserved(self._read_reservation_slots(), time.time())
+            finally:
+                self._funlock(fd=self._reservations_fd)
+
+    # --- 查询 ---
+
     def _get_today_key(self) -> str:
         """获取今日日期键"""
         return date.today().isoformat()
-    
+
     def _get_today_stats(self) -> Dict[str, Any]:
         """获取今日统计数据"""
-        today = self._get_today_key()
-        if today not in self.data["daily_stats"]:
-            self.data["daily_stats"][today] = {
-                "calls": 0,
-                "cost": 0.0,
-                "cache_hits": 0,
-                "cache_misses": 0,
-                "errors": 0,
-                "avg_latency": 0.0,
-                "total_latency": 0.0
-            }
-        return self.data["daily_stats"][today]
-    
+        return self.data["daily_stats"].get(self._get_today_key()) or self._empty_bucket()
+
     def will_exceed_today(self, limit: float) -> bool:
         """
-        检查今日费用是否会超过限制
-        
+        检查今日费用是否会超过限制（只回放新增记录，然后读取当日汇总）
+
         Args:
             limit: 每日费用限制（元）
-            
+
         Returns:
-            是否会超过限制
+            是否会超过限制（含未结算的预留）
         """
+        self.refresh()
         today_stats = self._get_today_stats()
-        return today_stats["cost"] >= limit
-    
-    def commit(self, cost: float, latency: float = 0.0, from_cache: bool = False, error: bool = False):
-        """
-        提交一次调用记录
-        
-        Args:
-            cost: 本次调用费用
-            latency: 延迟时间（秒）
-            from_cache: 是否来自缓存
-            error: 是否出错
-        """
-        today_stats = self._get_today_stats()
-        
-        # 更新今日统计
-        today_stats["calls"] += 1
-        today_stats["cost"] += cost
-        today_stats["total_latency"] += latency
-        
-        if today_stats["calls"] > 0:
-            today_stats["avg_latency"] = today_stats["total_latency"] / today_stats["calls"]
-        
-        if from_cache:
-            today_stats["cache_hits"] += 1
-            self.data["cache_hits"] += 1
-        else:
-            today_stats["cache_misses"] += 1
-            self.data["cache_misses"] += 1
-        
-        if error:
-            today_stats["errors"] += 1
-            self.data["errors"] += 1
-        
-        # 更新总计
-        self.data["total_calls"] += 1
-        self.data["total_cost"] += cost
-        
-        self._save_data()
-    
+        return today_stats["cost"] + self.get_reserved_total() >= limit
+
+    def get_hourly_stats(self, hours: int = 24) -> Dict[str, Dict[str, Any]]:
+        """获取最近若干小时的汇总（按小时键排序）"""
+        self.refresh()
+        now = datetime.now()
+        keys = [(now - timedelta(hours=offset)).strftime('%Y-%m-%dT%H') for offset in range(hours - 1, -1, -1)]
+        return {key: self.data["hourly_stats"][key] for key in keys if key in self.data["hourly_stats"]}
+
     def get_today_summary(self) -> Dict[str, Any]:
         """获取今日汇总"""
+        self.refresh()
         today_stats = self._get_today_stats()
-        
+
         # 计算缓存命中率
         total_requests = today_stats["cache_hits"] + today_stats["cache_misses"]
         cache_hit_rate = (today_stats["cache_hits"] / total_requests * 100) if total_requests > 0 else 0
-        
+
         # 计算失败率
         error_rate = (today_stats["errors"] / today_stats["calls"] * 100) if today_stats["calls"] > 0 else 0
-        
+
+        latency = self.get_latency_histogram().summary()
+
         return {
             "date": self._get_today_key(),
             "calls": today_stats["calls"],
             "cost": round(today_stats["cost"], 4),
             "cache_hit_rate": round(cache_hit_rate, 1),
             "error_rate": round(error_rate, 1),
-            "avg_latency": round(today_stats["avg_latency"], 2)
+            "reserved": round(self.get_reserved_total(), 4),
+            "avg_latency": round(today_stats["avg_latency"], 2),
+            "p50_latency": latency["p50"],
+            "p90_latency": latency["p90"],
+            "p99_latency": latency["p99"],
+            "max_latency": latency["max"]
         }
-    
+
+    def _matching_histograms(self, period: str, key: str, provider: Optional[str] = None,
+                             voice: Optional[str] = None, from_cache: Optional[bool] = None):
+        for (dim_provider, dim_voice, dim_cache), histogram in self.histograms[period].get(key, {}).items():
+            if provider is not None and dim_provider != provider:
+                continue
+            if voice is not None and dim_voice != voice:
+                continue
+            if from_cache is not None and (dim_cache == 'hit') != from_cache:
+                continue
+            yield histogram
+
+    def get_latency_histogram(self, day: Optional[str] = None, hour: Optional[str] = None,
+                              provider: Optional[str] = None, voice: Optional[str] = None,
+                              from_cache: Optional[bool] = None) -> LatencyHistogram:
+        """
+        合并符合条件的延迟直方图
+
+        Args:
+            day: 日期键（YYYY-MM-DD），默认今日
+            hour: 小时键（YYYY-MM-DDTHH），指定时按小时查询
+            provider: 只统计该提供商
+            voice: 只统计该音色
+            from_cache: 只统计缓存命中（True）或未命中（False）
+
+        Returns:
+            合并后的直方图（可用 to_dict() 导出，与其他进程/节点的直方图再合并）
+        """
+        self.refresh()
+        if hour is not None:
+            period, key = "hourly", hour
+        else:
+            period, key = "daily", day or self._get_today_key()
+        return LatencyHistogram.merged(self._matching_histograms(period, key, provider, voice, from_cache))
+
+    def get_latency_breakdown(self, day: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """按 提供商 → 音色 → hit/miss 拆分的当日延迟统计"""
+        self.refresh()
+        dims = self.histograms["daily"].get(day or self._get_today_key(), {})
+        breakdown: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (provider, voice, cache), histogram in sorted(dims.items()):
+            breakdown.setdefault(provider, {}).setdefault(voice, {})[cache] = histogram.summary()
+        return breakdown
+
     def get_total_summary(self) -> Dict[str, Any]:
         """获取总体汇总"""
+        self.refresh()
         total_requests = self.data["cache_hits"] + self.data["cache_misses"]
         cache_hit_rate = (self.data["cache_hits"] / total_requests * 100) if total_requests > 0 else 0
         error_rate = (self.data["errors"] / self.data["total_calls"] * 100) if self.data["total_calls"] > 0 else 0
-        
+
         return {
             "total_calls": self.data["total_calls"],
             "total_cost": round(self.data["total_cost"], 4),
@@ -164,31 +577,116 @@ class CostBook:
             "error_rate": round(error_rate, 1),
             "last_updated": datetime.fromtimestamp(self.data["last_updated"]).isoformat()
         }
-    
+
+    # --- 压缩与清理 ---
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Warning: Failed to compact cost book: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self, days_to_keep: Optional[int] = None):
+        """
+        将当前汇总写入快照，并以空日志替换旧日志
+
+        快照先于日志替换：若在两者之间中断，旧日志的代数小于快照代数，加载时会被丢弃而不会重复计数。
+
+        Args:
+            days_to_keep: 同时清理早于该天数的按日/按小时汇总
+        """
+        with self._lock:
+            self._flock(exclusive=True)
+            try:
+                if self._log_rotated() or self._log_offset == 0:
+                    self._reload_locked()
+                else:
+                    self._replay_tail()
+                self._compact_locked(days_to_keep)
+            finally:
+                self._funlock()
+
+    def _compact_locked(self, days_to_keep: Optional[int] = None):
+        """写快照并替换日志（调用方持有排他锁且内存状态已追上日志）"""
+        if days_to_keep is not None:
+            cutoff = (datetime.now().date() - timedelta(days=days_to_keep)).isoformat()
+            for buckets in (self.data["daily_stats"], self.data["hourly_stats"],
+                            self.histograms["daily"], self.histograms["hourly"]):
+                for key in [k for k in buckets if k < cutoff]:
+                    del buckets[key]
+
+        self.generation += 1
+        snapshot = dict(self.data, version=3, generation=self.generation)
+        snapshot["latency_histograms"] = {
+            period: {key: [[*dim, h.to_dict()] for dim, h in dims.items()] for key, dims in buckets.items()}
+            for period, buckets in self.histograms.items()
+        }
+        tmp_snapshot = f"{self.storage_path}.tmp"
+        with open(tmp_snapshot, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_snapshot, self.storage_path)
+
+        self._replace_log(self.generation)
+
+    def _migrate_legacy_logs(self):
+        """把旧格式日志中尚未压缩的记录计入汇总（提供商/音色记为 unknown），写入快照后删除旧日志"""
+        for version, record_struct in self.LEGACY_RECORDS.items():
+            legacy_path = f"{self._base_path}.v{version}.log"
+            if not os.path.exists(legacy_path):
+                continue
+            with self._lock:
+                self._flock(exclusive=True)
+                try:
+                    if not os.path.exists(legacy_path):
+                        continue
+                    if not self._reload_locked():
+                        self._replace_log(self.generation)
+                    with open(legacy_path, 'rb') as f:
+                        content = f.read()
+                    if len(content) >= self.HEADER.size:
+                        magic, legacy_version, generation = self.HEADER.unpack_from(content)
+                        if magic == self.MAGIC and legacy_version == version and generation >= self.generation:
+                            body = content[self.HEADER.size:]
+                            body = body[:len(body) - len(body) % record_struct.size]
+                            for timestamp, cost, latency, flags in record_struct.iter_unpack(body):
+                                self._apply(timestamp, cost, latency, flags)
+                    self._compact_locked()
+                    os.unlink(legacy_path)
+                finally:
+                    self._funlock()
+
     def cleanup_old_data(self, days_to_keep: int = 30):
         """清理旧数据"""
-        cutoff_date = datetime.now().date()
-        cutoff_timestamp = (cutoff_date - timedelta(days=days_to_keep)).isoformat()
-        
-        # 删除过期的日统计
-        keys_to_remove = []
-        for date_key in list(self.data["daily_stats"].keys()):
-            if date_key < cutoff_timestamp:
-                keys_to_remove.append(date_key)
-        
-        for key in keys_to_remove:
-            del self.data["daily_stats"][key]
-        
-        if keys_to_remove:
-            self._save_data()
-
-
-# 全局实例
+        self.compact(days_to_keep=days_to_keep)
+
+    def close(self):
+        """关闭文件描述符"""
+        with self._lock:
+            if self._log_fd is not None:
+                os.close(self._log_fd)
+                self._log_fd = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+            if self._reservations_fd is not None:
+                os.close(self._reservations_fd)
+                self._reservations_fd = None
+
+    def __del__(self):
+        # 服务容器替换实例时不主动关闭（仍可能有请求在用），最后一个引用释放时关闭文件描述符
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# 全局实例（由服务容器管理，账本相关配置变化后重新构建）
 _cost_book = None
 
 def get_cost_book() -> CostBook:
     """获取全局费用账本实例"""
     global _cost_book
-    if _cost_book is None:
-        _cost_book = CostBook()
-    return _cost_book
\ No newline at end of file
+    _cost_book = CONTAINER.get("cost_book", env_fingerprint(COSTBOOK_ENV), CostBook)
+    return _cost_book
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from ..http_pool import get_pool_maxsize, get_ssl_context, _count_httpx_request
+
+# 默认磁带目录：与音频 fixtures 放在一起
+CASSETTE_DIR = Path(__file__).parent / 'cassettes'
+
+
+def get_cassette_path() -> Path:
+    """TTS_CASSETTE 可为文件路径或 cassettes 目录下的名称"""
+    name = os.getenv('TTS_CASSETTE', 'default')
+    path = Path(name)
+    if path.suffix != '.jsonl':
+        path = CASSETTE_DIR / f"{name}.jsonl"
+    return path
+
+
+def get_replay_speed() -> float:
+    """回放速度倍数：1 按录制时的响应耗时等待，4 表示快4倍，0 表示不等待"""
+    try:
+        return max(0.0, float(os.getenv('TTS_CASSETTE_SPEED', '1')))
+    except ValueError:
+        return 1.0
+
+
+class CassetteMissError(httpx.TransportError):
+    """回放时磁带中没有与请求匹配的（剩余）记录"""
+
+
+def _redact(body: Any) -> Any:
+    """录制前去掉请求体中的凭证"""
+    if isinstance(body, dict) and isinstance(body.get("app"), dict) and "token" in body["app"]:
+        body = dict(body, app=dict(body["app"], token="***"))
+    return body
+
+
+def _parse_body(content: bytes) -> Any:
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode('utf-8', errors='replace')
+
+
+def match_key(method: str, path: str, body: Any) -> str:
+    """
+    请求匹配键
+
+    submit 的 reqid 每次随机生成，不参与匹配；query 的 reqid 取自（回放的）submit 响应，
+    因此按 reqid 匹配即可把轮询序列对应回同一次合成。主机和凭证不参与匹配，
+    对着本地替身服务录制的磁带也能在指向真实地址的配置下回放。
+    """
+    body = _redact(body)
+    if isinstance(body, dict) and isinstance(body.get("request"), dict):
+        request = body["request"]
+        if request.get("operation", "submit") != "query":
+            body = dict(body, request={k: v for k, v in request.items() if k != "reqid"})
+    raw = json.dumps([method, path, body], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """
+    录制传输层：请求照常发往上游，每次交互（请求、响应、耗时）追加一行到磁带文件
+
+    追加写 JSONL，录制过程中崩溃也只丢失最后一行；多线程共用时按完成顺序写入。
+    新磁带的第一行是头部，记录录制时适配器的轮询配置（见 write_header）。
+    """
+
+    def __init__(self, path: Path, transport: httpx.BaseTransport):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._started = time.perf_counter()
+        self._header_written = self._file.tell() > 0  # 追加到已有磁带时不再写头部
+
+    def write_header(self, poll_settings: Dict[str, Any]):
+        """
+        写入磁带头部（只写一次）
+
+        轮询等待由适配器自己 sleep，不经过传输层；回放时按头部中的轮询配置等待，
+        录制时间短的磁带回放时也不会退回默认的轮询间隔。
+        """
+        with self._lock:
+            if self._header_written:
+                return
+            self._file.write(json.dumps({"header": {"poll": poll_settings}}, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._header_written = True
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = self._transport.handle_request(request)
+        content = response.read()
+        elapsed = time.perf_counter() - start
+
+        body = _parse_body(request.content)
+        url = str(request.url)
+        interaction = {
+            "key": match_key(request.method, request.url.path, body),
+            "offset_s": round(start - self._started, 6),
+            "elapsed_s": round(elapsed, 6),
+            "request": {"method": request.method, "url": url, "body": _redact(body)},
+            "response": {
+                "status": response.status_code,
+                "headers": {"content-type": response.headers.get("content-type", "application/json")},
+                "body": content.decode('utf-8', errors='replace')
+            }
+        }
+        line = json.dumps(interaction, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+        return httpx.Response(response.status_code, headers=response.headers, content=content,
+                              extensions=response.extensions)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self._transport.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """
+    回放传输层：不访问网络，按匹配键依次返回录制的响应
+
+    同一匹配键的多条记录（同一 reqid 的多次轮询、相同文本的多次提交）按录制顺序依次返回；
+    每次响应前按录制的耗时 / speed 等待，speed 为 0 时立即返回。
+    poll_settings 为头部记录的轮询配置（没有头部的旧磁带为 None），由适配器按 speed 缩放后使用。
+    """
+
+    def __init__(self, path: Path, speed: float = 1.0):
+        self.path = Path(path)
+        self.speed = speed
+        self.poll_settings: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.total = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    interaction = json.loads(line)
+                    if "header" in interaction:
+                        self.poll_settings = interaction["header"].get("poll")
+                        continue
+                    self._interactions[interaction["key"]].append(interaction)
+                    self.total += 1
+        self.played = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = match_key(request.method, request.url.path, _parse_body(request.content))
+        with self._lock:
+            pending = self._interactions.get(key)
+            interaction = pending.popleft() if pending else None
+            if interaction is not None:
+                self.played += 1
+        if interaction is None:
+            raise CassetteMissError(f"No recorded interaction for {request.method} {request.url} (key {key})",
+                                    request=request)
+
+        if self.speed > 0:
+            time.sleep(interaction["elapsed_s"] / self.speed)
+        response = interaction["response"]
+        return httpx.Response(response["status"], headers=response["headers"],
+                              content=response["body"].encode('utf-8'), request=request)
+
+    def remaining(self) -> int:
+        with self._lock:
+            return sum(len(pending) for pending in self._interactions.values())
+
+
+_lock = threading.Lock()
+_cassette_client = None
+_cassette_transport = None
+
+
+def get_cassette_client() -> Optional[httpx.Client]:
+    """
+    RECORD / REPLAY 模式下的 httpx 客户端（进程内共享），两者都未开启时返回None
+
+    录制模式复用共享连接池的SSL与连接数配置；回放模式不建立任何连接。
+    """
+    global _cassette_client, _cassette_transport
+    from .. import is_record_mode, is_replay_mode
+    if not (is_record_mode() or is_replay_mode()):
+        return None
+    if _cassette_client is None:
+        with _lock:
+            if _cassette_client is None:
+                path = get_cassette_path()
+                if is_replay_mode():
+                    transport = ReplayTransport(path, get_replay_speed())
+                    print(f"Replaying TTS cassette: {path} ({transport.total} interactions, speed {transport.speed}x)")
+                else:
+                    maxsize = get_pool_maxsize()
+                    transport = RecordingTransport(path, httpx.HTTPTransport(
+                        verify=get_ssl_context() or True,
+                        limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize)
+                    ))
+                    print(f"Recording TTS cassette: {path}")
+                _cassette_transport = transport
+                _cassette_client = httpx.Client(transport=transport, event_hooks={"request": [_count_httpx_request]})
+    return _cassette_client
+
+
+def get_cassette_transport():
+    """当前磁带客户端的传输层（RecordingTransport / ReplayTransport），尚未创建时返回None"""
+    return _cassette_transport
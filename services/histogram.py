@@ -0,0 +1,120 @@
+import math
+from typing import Dict, Any, Iterable, Optional
+
+# 对数-线性分桶（HDR风格）：小于 SUB_BUCKETS 微秒时每微秒一个桶，
+# 之后每个2的幂区间再均分为 SUB_BUCKETS 个桶，相对误差不超过 1/SUB_BUCKETS
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_VALUE_US = (1 << 32) - 1  # 约71分钟，更大的值计入最后一个桶
+
+
+def bucket_index(value_us: int) -> int:
+    """微秒值对应的桶序号"""
+    if value_us < SUB_BUCKETS:
+        return max(0, value_us)
+    value_us = min(value_us, MAX_VALUE_US)
+    shift = value_us.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value_us >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index: int) -> tuple:
+    """桶序号对应的微秒区间 [low, high)"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """
+    固定分桶的延迟直方图
+
+    - 只保存非空桶的计数，序列化后体积与样本数无关
+    - 桶边界固定，不同进程/节点的直方图可直接按桶相加合并
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def record(self, seconds: float):
+        """记录一次延迟（秒）"""
+        value_us = max(0, int(seconds * 1_000_000))
+        index = bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = value_us if self.max_us is None else max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """将另一个直方图合并到当前直方图"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        if other.max_us is not None:
+            self.max_us = other.max_us if self.max_us is None else max(self.max_us, other.max_us)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable["LatencyHistogram"]) -> "LatencyHistogram":
+        result = cls()
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    def percentile(self, percent: float) -> float:
+        """
+        百分位延迟（秒）
+
+        返回所在桶的中点，并限制在已观测到的最小/最大值之间。
+        """
+        if self.count == 0:
+            return 0.0
+        target = min(max(1, math.ceil(self.count * percent / 100.0)), self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = bucket_bounds(index)
+                value_us = min(max((low + high - 1) // 2, self.min_us), self.max_us)
+                return value_us / 1_000_000
+        return self.max_us / 1_000_000
+
+    def summary(self) -> Dict[str, Any]:
+        """常用统计（秒）：count / mean / p50 / p90 / p99 / max"""
+        return {
+            "count": self.count,
+            "mean": round(self.total_us / self.count / 1_000_000, 6) if self.count else 0.0,
+            "p50": round(self.percentile(50), 6),
+            "p90": round(self.percentile(90), 6),
+            "p99": round(self.percentile(99), 6),
+            "max": round((self.max_us or 0) / 1_000_000, 6)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为JSON友好的字典（桶序号作为字符串键）"""
+        return {
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+            "count": self.count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.count = data.get("count", sum(histogram.counts.values()))
+        histogram.total_us = data.get("total_us", 0)
+        histogram.min_us = data.get("min_us")
+        histogram.max_us = data.get("max_us")
+        return histogram
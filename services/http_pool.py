@@ -0,0 +1,154 @@
+import os
+import ssl
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+# httpx / urllib3 / certifi 导入较慢（合计数十毫秒），推迟到第一次出站请求时再导入，
+# 只用到统计接口的路由（健康检查、指标）冷启动时不需要加载它们
+if TYPE_CHECKING:
+    import httpx
+    import urllib3
+
+
+# 每个主机保留的最大连接数
+def get_pool_maxsize() -> int:
+    return int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+
+
+_lock = threading.RLock()
+_ssl_context = None
+_pool_manager = None
+_httpx_client = None
+_httpx_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "new_connections": 0})
+
+
+def get_ssl_context() -> Optional[ssl.SSLContext]:
+    """
+    进程级共享的SSL上下文
+
+    certifi 证书包只在首次调用时加载；构建失败时的降级顺序与各处理器原先的 _build_ssl_ctx 相同。
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        with _lock:
+            if _ssl_context is None:
+                try:
+                    import certifi
+                    _ssl_context = ssl.create_default_context(cafile=certifi.where())
+                except Exception:
+                    try:
+                        _ssl_context = ssl._create_unverified_context()
+                    except Exception:
+                        return None
+    return _ssl_context
+
+
+def get_pool_manager() -> "urllib3.PoolManager":
+    """
+    共享的 urllib3 连接池（用于 ARK 等同步 HTTPS 调用）
+
+    每个主机一个连接池，最多 HTTP_POOL_MAXSIZE 个连接；连接用完后保持 keep-alive 供下次复用，
+    池满时请求排队等待空闲连接。
+    """
+    global _pool_manager
+    if _pool_manager is None:
+        with _lock:
+            if _pool_manager is None:
+                import urllib3
+                _pool_manager = urllib3.PoolManager(
+                    num_pools=16,
+                    maxsize=get_pool_maxsize(),
+                    block=True,
+                    ssl_context=get_ssl_context(),
+                    retries=False
+                )
+    return _pool_manager
+
+
+def request(method: str, url: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 30, stream: bool = False) -> "urllib3.BaseHTTPResponse":
+    """
+    通过共享连接池发起请求
+
+    Args:
+        method: HTTP方法
+        url: 请求地址
+        body: 请求体
+        headers: 请求头
+        timeout: 连接/读取以及等待空闲连接的超时（秒）
+        stream: 为True时不预读响应体，调用方逐行读取后需调用 release_conn()
+
+    Returns:
+        urllib3 响应对象（不会因4xx/5xx抛出异常，由调用方检查 status）
+    """
+    import urllib3
+    return get_pool_manager().request(
+        method, url, body=body, headers=headers,
+        timeout=urllib3.Timeout(connect=timeout, read=timeout),
+        pool_timeout=timeout,
+        preload_content=not stream
+    )
+
+
+def _count_httpx_request(request: "httpx.Request"):
+    host = request.url.host
+    with _lock:
+        _httpx_stats[host]["requests"] += 1
+
+    def trace(event_name: str, info: Dict[str, Any]):
+        # httpcore 只在新建连接时触发 connect_tcp 事件
+        if event_name == "connection.connect_tcp.complete":
+            with _lock:
+                _httpx_stats[host]["new_connections"] += 1
+
+    request.extensions["trace"] = trace
+
+
+def get_httpx_client() -> "httpx.Client":
+    """
+    共享的 httpx 客户端（用于语音合成与声音复刻调用）
+
+    复用同一个SSL上下文和连接池；超时由调用方在每次请求时传入。
+    """
+    global _httpx_client
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                import httpx
+                maxsize = get_pool_maxsize()
+                _httpx_client = httpx.Client(
+                    verify=get_ssl_context() or True,
+                    limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize),
+                    event_hooks={"request": [_count_httpx_request]}
+                )
+    return _httpx_client
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    连接池统计：每个主机的请求数、新建连接数和连接复用次数
+    """
+    hosts: Dict[str, Dict[str, int]] = {}
+
+    def add(host: str, requests: int, new_connections: int):
+        entry = hosts.setdefault(host, {"requests": 0, "new_connections": 0, "reused": 0})
+        entry["requests"] += requests
+        entry["new_connections"] += new_connections
+        entry["reused"] = max(0, entry["requests"] - entry["new_connections"])
+
+    if _pool_manager is not None:
+        for key in _pool_manager.pools.keys():
+            pool = _pool_manager.pools.get(key)
+            if pool is not None:
+                add(pool.host, pool.num_requests, pool.num_connections)
+
+    with _lock:
+        for host, stats in _httpx_stats.items():
+            add(host, stats["requests"], stats["new_connections"])
+
+    return {
+        "max_connections_per_host": get_pool_maxsize(),
+        "ssl_context_cached": _ssl_context is not None,
+        "hosts": hosts
+    }
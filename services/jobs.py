@@ -0,0 +1,183 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class JobTableFullError(Exception):
+    """任务表已满（全部为未完成任务）时抛出"""
+    pass
+
+
+class JobManager:
+    """
+    后台合成任务管理
+
+    - 提交后立即返回任务ID，由后台线程池执行
+    - 协程任务（submit_async）在一个共享的事件循环线程上执行，等待上游时不占用线程池，
+      同时进行的任务数只受任务表容量限制
+    - 内存任务表有容量上限和TTL：已完成的任务过期或表满时按提交顺序淘汰
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_jobs: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv('TTS_JOB_WORKERS', '4'))
+        if max_jobs is None:
+            max_jobs = int(os.getenv('TTS_JOB_MAX', '256'))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv('TTS_JOB_TTL_SECONDS', '600'))
+
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts-job')
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, fn: Callable[[], Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        提交任务
+
+        Args:
+            fn: 在后台执行的函数，返回值保存为任务结果
+            meta: 附加到任务上的描述信息（如音色、文本长度）
+
+        Returns:
+            任务信息
+
+        Raises:
+            JobTableFullError: 任务表已满且没有可淘汰的已完成任务时
+        """
+        job = self._register(meta)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def submit_async(self, factory: Callable[[], Awaitable[Dict[str, Any]]],
+                     meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        提交协程任务，参数和返回值与 submit 相同
+
+        Args:
+            factory: 返回协程的函数，在任务的事件循环上调用并等待
+            meta: 附加到任务上的描述信息
+
+        Raises:
+            JobTableFullError: 任务表已满且没有可淘汰的已完成任务时
+        """
+        job = self._register(meta)
+        asyncio.run_coroutine_threadsafe(self._run_async(job, factory), self._get_loop())
+        return job
+
+    def _register(self, meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """在任务表中登记一个排队中的任务"""
+        job_id = f"job-{uuid.uuid4().hex[:16]}"
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "meta": meta or {},
+            "result": None,
+            "error": None
+        }
+
+        with self._lock:
+            self._purge_locked()
+            if len(self._jobs) >= self.max_jobs and not self._evict_finished_locked():
+                raise JobTableFullError(f"Job table is full ({self.max_jobs} unfinished jobs)")
+            self._jobs[job_id] = job
+        return job
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """协程任务的事件循环（首次使用时在守护线程中启动）"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='tts-job-loop', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _run(self, job: Dict[str, Any], fn: Callable[[], Dict[str, Any]]):
+        job["started"] = time.time()
+        job["status"] = "running"
+        try:
+            job["result"] = fn()
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "error"
+        finally:
+            job["finished"] = time.time()
+
+    async def _run_async(self, job: Dict[str, Any], factory: Callable[[], Awaitable[Dict[str, Any]]]):
+        job["started"] = time.time()
+        job["status"] = "running"
+        try:
+            job["result"] = await factory()
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "error"
+        finally:
+            job["finished"] = time.time()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务（过期或不存在时返回None）"""
+        with self._lock:
+            self._purge_locked()
+            return self._jobs.get(job_id)
+
+    def in_flight(self) -> int:
+        """排队或执行中的任务数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["finished"] is None)
+
+    def _purge_locked(self):
+        """删除超过TTL的已完成任务"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished"] is not None and job["finished"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _evict_finished_locked(self) -> bool:
+        """淘汰最早提交的已完成任务，成功返回True"""
+        for job_id, job in self._jobs.items():
+            if job["finished"] is not None:
+                del self._jobs[job_id]
+                return True
+        return False
+
+    @staticmethod
+    def describe(job: Dict[str, Any]) -> Dict[str, Any]:
+        """任务的公开状态（不含音频数据）"""
+        info = {
+            "job_id": job["id"],
+            "status": job["status"],
+            "created": job["created"],
+            "started": job["started"],
+            "finished": job["finished"],
+        }
+        info.update(job["meta"])
+        if job["error"]:
+            info["error"] = job["error"]
+        return info
+
+
+# 全局实例
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """获取全局任务管理器实例"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+    return _job_manager
@@ -0,0 +1,131 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发环境没有 fcntl，退化为进程内锁
+    fcntl = None
+
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".logseg"
+# 截断日志行中的引用格式：<段号>:<偏移>:<字节数>
+CHUNK_REF_PATTERN = re.compile(r"(\d{6,}):(\d+):(\d+)")
+# 截断日志行末尾的引用标记（由 CustomFormatter 生成）
+TRUNCATED_MARKER_PATTERN = re.compile(r"\[TRUNCATED\] Full content in chunk (\d{6,}):(\d+):(\d+)")
+
+
+def format_chunk_ref(segment_id: int, offset: int, length: int) -> str:
+    return f"{segment_id:06d}:{offset}:{length}"
+
+
+def parse_chunk_ref(ref: str) -> Optional[Tuple[int, int, int]]:
+    """解析 segment:offset:length 引用（可以是整行日志，取其中第一个引用）"""
+    match = TRUNCATED_MARKER_PATTERN.search(ref) or CHUNK_REF_PATTERN.search(ref)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+
+class ChunkSegmentStore:
+    """
+    超长日志行的滚动分段存储
+
+    - 完整内容追加到当前段文件（segment-000001.logseg ...），每条之间以换行分隔
+    - 段文件超过 max_segment_bytes 后滚动到下一段，只保留最近 max_segments 段
+    - 每条内容返回 segment:offset:length 引用，读取时打开对应段文件一次 pread 即可
+    - 多进程通过目录下的锁文件协调（持排他锁确定偏移并写入）
+    """
+
+    def __init__(self, directory: Path, max_segment_bytes: int = 16 * 1024 * 1024, max_segments: int = 8):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max(1, max_segments)
+        self._lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._segment_id: Optional[int] = None
+        self._segment_fd: Optional[int] = None
+
+    def segment_path(self, segment_id: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{segment_id:06d}{SEGMENT_SUFFIX}"
+
+    def _list_segments(self) -> list:
+        segment_ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    segment_ids.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(segment_ids)
+
+    def _open_segment(self, segment_id: int):
+        if self._segment_fd is not None:
+            os.close(self._segment_fd)
+        self._segment_fd = os.open(self.segment_path(segment_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment_id = segment_id
+
+    def _ensure_open(self):
+        if self._lock_fd is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._lock_fd = os.open(self.directory / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        # 其他进程可能已经滚动到了新段（当前段也可能已被其删除）
+        if (self._segment_id is None or os.path.exists(self.segment_path(self._segment_id + 1))
+                or os.fstat(self._segment_fd).st_nlink == 0):
+            segment_ids = self._list_segments()
+            self._open_segment(segment_ids[-1] if segment_ids else 1)
+
+    def _roll(self):
+        """滚动到下一段并删除超出保留数量的旧段"""
+        self._open_segment(self._segment_id + 1)
+        for segment_id in self._list_segments()[:-self.max_segments]:
+            try:
+                os.remove(self.segment_path(segment_id))
+            except FileNotFoundError:
+                pass
+
+    def append(self, text: str) -> str:
+        """追加一条完整内容，返回 segment:offset:length 引用"""
+        data = text.encode("utf-8")
+        with self._lock:
+            self._ensure_open()
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                self._ensure_open()
+                offset = os.fstat(self._segment_fd).st_size
+                if offset > 0 and offset + len(data) > self.max_segment_bytes:
+                    self._roll()
+                    offset = 0
+                os.write(self._segment_fd, data + b"\n")
+                return format_chunk_ref(self._segment_id, offset, len(data))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def read(self, ref: str) -> str:
+        """按引用读取完整内容；段已被滚动删除时抛出 FileNotFoundError"""
+        parsed = parse_chunk_ref(ref)
+        if parsed is None:
+            raise ValueError(f"Invalid chunk reference: {ref}")
+        segment_id, offset, length = parsed
+        fd = os.open(self.segment_path(segment_id), os.O_RDONLY)
+        try:
+            data = os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+        if len(data) != length:
+            raise ValueError(f"Chunk reference out of range: {ref}")
+        return data.decode("utf-8")
+
+    def close(self):
+        with self._lock:
+            for fd in (self._segment_fd, self._lock_fd):
+                if fd is not None:
+                    os.close(fd)
+            self._segment_fd = None
+            self._lock_fd = None
+            self._segment_id = None
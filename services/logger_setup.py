@@ -1,23 +1,42 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import re
 import sys
-import uuid
+import threading
 from pathlib import Path
 
+from services.log_segments import ChunkSegmentStore
+
 # --- 配置项 ---
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 DEBUG_VERBOSE = os.getenv("DEBUG_VERBOSE", "false").lower() == "true"
 LOG_MAX_LINE = int(os.getenv("LOG_MAX_LINE", 8192))  # 8KB
 LOG_ROTATE_SIZE_MB = int(os.getenv("LOG_ROTATE_SIZE_MB", 5))
 LOG_ROTATE_BACKUP_COUNT = 5
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop").lower()  # drop | block
+LOG_CHUNK_SEGMENT_MB = int(os.getenv("LOG_CHUNK_SEGMENT_MB", 16))
+LOG_CHUNK_SEGMENTS = int(os.getenv("LOG_CHUNK_SEGMENTS", 8))
 LOG_DIR = Path("logs")
 CHUNK_DIR = LOG_DIR / "chunks"
 
-# 确保日志目录存在
-LOG_DIR.mkdir(exist_ok=True)
-CHUNK_DIR.mkdir(exist_ok=True)
+# 超长日志行的完整内容追加到滚动段文件，日志行中只保留 segment:offset:length 引用
+# 段目录在第一次出现超长日志行时才创建，导入本模块不触碰文件系统
+_chunk_store = None
+_chunk_store_lock = threading.Lock()
+
+
+def _get_chunk_store() -> ChunkSegmentStore:
+    global _chunk_store
+    if _chunk_store is None:
+        with _chunk_store_lock:
+            if _chunk_store is None:
+                CHUNK_DIR.mkdir(parents=True, exist_ok=True)
+                _chunk_store = ChunkSegmentStore(CHUNK_DIR, LOG_CHUNK_SEGMENT_MB * 1024 * 1024, LOG_CHUNK_SEGMENTS)
+    return _chunk_store
 
 # --- 敏感信息掩码 ---
 # 经过仔细修正的正则表达式字典
@@ -36,12 +55,76 @@ SENSITIVE_PATTERNS = {
     re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'): r'[EMAIL_MASKED]',
 }
 
-def mask_sensitive_data(message: str) -> str:
-    """对字符串中的敏感数据进行掩码处理"""
-    for pattern, replacement in SENSITIVE_PATTERNS.items():
-        message = pattern.sub(replacement, message)
+# 每个模式的触发子串（小写，与 SENSITIVE_PATTERNS 顺序一一对应）：模式命中的文本必然包含该子串
+MASK_TRIGGERS = ("authorization", "token", "ak", "cookie", "phone", "@")
+
+# re 的 IGNORECASE 会把 İ/ı 当作 i，str.lower() 不会，预扫描前先折叠
+_MASK_FOLD = {0x130: "i", 0x131: "i"}
+_EMAIL_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-@")
+# 触发子串在其模式命中文本中的最大结束偏移（"access_token" / "Authorization" 前的引号等）
+_MASK_WINDOW = 16
+
+_MASK_RULES = list(SENSITIVE_PATTERNS.items())
+# 所有模式合并为一个交替正则，每个模式一个命名分组，按原顺序优先
+_MASK_COMBINED = re.compile("|".join(
+    f"(?P<m{index}>(?i:{pattern.pattern}))" if pattern.flags & re.IGNORECASE else f"(?P<m{index}>{pattern.pattern})"
+    for index, (pattern, _) in enumerate(_MASK_RULES)
+))
+# 分发表：命名分组 -> (模式序号, 替换函数)；在命中文本上执行原模式的替换，结果与原替换完全一致
+_MASK_DISPATCH = {
+    f"m{index}": (index, lambda text, pattern=pattern, replacement=replacement: pattern.sub(replacement, text, count=1))
+    for index, (pattern, replacement) in enumerate(_MASK_RULES)
+}
+
+
+def _mask_sequential(message: str, active) -> str:
+    """依次执行触发子串出现过的模式（与逐个执行全部模式结果相同：替换文本中不含任何触发子串）"""
+    for (pattern, replacement), is_active in zip(_MASK_RULES, active):
+        if is_active:
+            message = pattern.sub(replacement, message)
     return message
 
+
+def mask_sensitive_data(message: str) -> str:
+    """
+    对字符串中的敏感数据进行掩码处理
+
+    输出与依次执行 SENSITIVE_PATTERNS 中的每个替换完全一致：
+    1. 预扫描触发子串，一个都不含的行直接返回（绝大多数日志行）。
+    2. 只有一类触发子串时只执行对应模式。
+    3. 多类并存时用合并后的正则单次扫描、按分发表替换；若某处命中附近出现其他类的触发子串
+       （即按顺序替换时可能互相影响，例如字段值里嵌着另一个敏感字段），回退为逐个模式替换。
+    """
+    scan_text = message
+    if not message.isascii() and ("\u0130" in message or "\u0131" in message):
+        scan_text = message.translate(_MASK_FOLD)
+    scan_text = scan_text.lower()
+
+    active = [trigger in scan_text for trigger in MASK_TRIGGERS]
+    active_count = sum(active)
+    if active_count == 0:
+        return message
+    if active_count == 1:
+        return _mask_sequential(message, active)
+
+    pieces = []
+    position = 0
+    for match in _MASK_COMBINED.finditer(message):
+        index, replace = _MASK_DISPATCH[match.lastgroup]
+        start, end = match.span()
+        window = scan_text[start:end + _MASK_WINDOW]
+        for other, trigger in enumerate(MASK_TRIGGERS):
+            if other != index and active[other] and trigger in window:
+                return _mask_sequential(message, active)
+        # 前三类的替换文本以 "2" 结尾，后面紧跟邮箱字符时可能与后文拼成新的邮箱
+        if index < 3 and active[5] and message[end:end + 1] in _EMAIL_LOCAL_CHARS:
+            return _mask_sequential(message, active)
+        pieces.append(message[position:start])
+        pieces.append(replace(match.group()))
+        position = end
+    pieces.append(message[position:])
+    return "".join(pieces)
+
 def truncate_and_sample(data, field_name="data"):
     """
     对长数据（如Base64音频）进行截断和采样。
@@ -69,7 +152,7 @@ class CustomFormatter(logging.Formatter):
     """
     自定义日志格式化器：
     1. 对敏感信息进行掩码。
-    2. 对超长日志行进行截断，并将完整原文写入chunks目录。
+    2. 对超长日志行进行截断，并将完整原文追加到chunks目录的滚动段文件。
     """
     def format(self, record):
         # 首先让父类完成基本格式化
@@ -82,12 +165,16 @@ class CustomFormatter(logging.Formatter):
         
         # 2. 超长日志行截断
         if len(masked_message) > LOG_MAX_LINE:
-            chunk_filename = CHUNK_DIR / f"{record.created}-{uuid.uuid4()}.logchunk"
             try:
-                with open(chunk_filename, "w", encoding="utf-8") as f:
-                    f.write(masked_message) # 写入掩码后的完整消息
-                
-                truncated_message = masked_message[:LOG_MAX_LINE - 50] + f"... [TRUNCATED] Full content in: {chunk_filename}"
+                # 同一条记录会被文件和控制台处理器各格式化一次，完整内容只写入一份
+                cached = getattr(record, "_chunk_ref", None)
+                if cached is not None and cached[0] == masked_message:
+                    chunk_ref = cached[1]
+                else:
+                    chunk_ref = _get_chunk_store().append(masked_message) # 写入掩码后的完整消息
+                    record._chunk_ref = (masked_message, chunk_ref)
+
+                truncated_message = masked_message[:LOG_MAX_LINE - 50] + f"... [TRUNCATED] Full content in chunk {chunk_ref}"
                 return truncated_message
 
             except Exception as e:
@@ -96,10 +183,76 @@ class CustomFormatter(logging.Formatter):
         
         return masked_message
 
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    非阻塞的日志入队处理器：
+    1. 请求线程只把记录放入有界队列，格式化、掩码和写文件都由后台监听线程完成。
+    2. 队列满时按策略处理：drop 丢弃并计数（默认），block 等待队列有空位。
+    """
+    def __init__(self, log_queue, policy="drop"):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self.dropped_by_level = {}
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record):
+        # 只固定消息参数（避免入队后参数被修改），格式化留给监听线程
+        if record.args:
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self.dropped_by_level[record.levelname] = self.dropped_by_level.get(record.levelname, 0) + 1
+
+
+_queue_handler = None
+_queue_listener = None
+
+
+def _stop_listener():
+    """停止监听线程并写出队列中剩余的记录"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+        if _queue_handler is not None and _queue_handler.dropped:
+            print(f"WARNING: {_queue_handler.dropped} log records dropped (queue full): "
+                  f"{_queue_handler.dropped_by_level}", file=sys.stderr)
+
+
+atexit.register(_stop_listener)
+
+
+def get_logging_stats():
+    """日志队列统计：容量、当前积压、丢弃数"""
+    if _queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "policy": _queue_handler.policy,
+        "capacity": LOG_QUEUE_SIZE,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "dropped_by_level": dict(_queue_handler.dropped_by_level)
+    }
+
+
 def setup_logging():
     """
     配置全局日志记录器。
     """
+    global _queue_handler, _queue_listener
     # 创建一个自定义格式化器实例
     formatter = CustomFormatter(
         fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -109,6 +262,7 @@ def setup_logging():
     # 获取根记录器
     root_logger = logging.getLogger()
     # 清除所有现有的处理器，以防万一（例如在重载模块时）
+    _stop_listener()
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
         
@@ -116,6 +270,7 @@ def setup_logging():
 
     # --- 文件处理器 (File Handler) ---
     # 负责将DEBUG及以上级别的日志写入文件，并进行轮转
+    LOG_DIR.mkdir(exist_ok=True)
     file_handler = logging.handlers.RotatingFileHandler(
         LOG_DIR / "app.log",
         maxBytes=LOG_ROTATE_SIZE_MB * 1024 * 1024,
@@ -124,27 +279,29 @@ def setup_logging():
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
 
     # --- 控制台处理器 (Console Handler) ---
     # 负责将指定级别（默认为INFO）及以上的日志输出到控制台
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(LOG_LEVEL)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-
-    # --- 打印生效的配置 ---
-    logging.info("="*50)
-    logging.info("Logging Service Initialized")
-    logging.info(f"  Console Log Level: {LOG_LEVEL}")
-    logging.info(f"  File Log Level:    DEBUG")
-    logging.info(f"  Log File:          {LOG_DIR / 'app.log'}")
-    logging.info(f"  Rotation Size:     {LOG_ROTATE_SIZE_MB} MB")
-    logging.info(f"  Rotation Backups:  {LOG_ROTATE_BACKUP_COUNT}")
-    logging.info(f"  Max Line Length:   {LOG_MAX_LINE} bytes")
-    logging.info(f"  Verbose Debug:     {DEBUG_VERBOSE}")
-    logging.info(f"  Long Log Chunks:   {CHUNK_DIR}")
-    logging.info("="*50)
+
+    # --- 队列处理器 (Queue Handler) ---
+    # 根记录器上只挂入队处理器；文件和控制台处理器由后台监听线程驱动
+    policy = LOG_QUEUE_POLICY if LOG_QUEUE_POLICY in ("drop", "block") else "drop"
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE), policy=policy)
+    root_logger.addHandler(_queue_handler)
+    _queue_listener = logging.handlers.QueueListener(
+        _queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+
+    # --- 打印生效的配置（单行，冷启动时不刷屏）---
+    logging.info(
+        f"Logging initialized: console={LOG_LEVEL} file={LOG_DIR / 'app.log'} (DEBUG, "
+        f"{LOG_ROTATE_SIZE_MB} MB x {LOG_ROTATE_BACKUP_COUNT}) max_line={LOG_MAX_LINE} verbose={DEBUG_VERBOSE} "
+        f"chunks={CHUNK_DIR} ({LOG_CHUNK_SEGMENT_MB} MB x {LOG_CHUNK_SEGMENTS}) queue={LOG_QUEUE_SIZE}/{policy}"
+    )
 
     # 禁用其他库（如werkzeug）的日志记录器，让我们的根记录器全权管理
     logging.getLogger("werkzeug").propagate = False
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+
+def get_memory_budget_bytes() -> int:
+    """读取内存缓存层的字节预算（TTS_MEMORY_CACHE_MB，0 表示禁用）"""
+    try:
+        return int(float(os.getenv('TTS_MEMORY_CACHE_MB', '64')) * 1024 * 1024)
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+class MemoryCache:
+    """
+    进程内按字节预算淘汰的LRU缓存
+
+    命中时直接返回缓存的 bytes 对象本身，不做任何拷贝。
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        if budget_bytes is None:
+            budget_bytes = get_memory_budget_bytes()
+        self.budget_bytes = max(0, budget_bytes)
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        获取缓存数据
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的 bytes 对象，不存在时返回None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> bool:
+        """
+        写入缓存，超出预算时按LRU顺序淘汰
+
+        Args:
+            key: 缓存键
+            data: 音频数据
+
+        Returns:
+            是否已放入内存（超过整个预算的数据不会缓存）
+        """
+        size = len(data)
+        if not self.enabled or size > self.budget_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_held -= len(old)
+            self._entries[key] = data
+            self.bytes_held += size
+            while self.bytes_held > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_held -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def pop(self, key: str):
+        """移除缓存条目"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_held -= len(old)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_held = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取内存层统计信息"""
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes_held": self.bytes_held,
+            "budget_bytes": self.budget_bytes,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(hit_rate, 1)
+        }
@@ -0,0 +1,256 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# 请求/上游调用耗时的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 采集时生成的指标：(名称, 类型, 说明, [(标签字典, 数值), ...])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels_dict(self, label_values: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, label_values))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增计数器，标签值按 labelnames 顺序以位置参数传入"""
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels_dict(key))} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """可增可减的当前值"""
+    type_name = "gauge"
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    """固定分桶直方图（输出累计的 _bucket / _sum / _count）"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数（末位为 +Inf）, 总和, 样本数]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def get_count(self, *label_values) -> int:
+        entry = self._values.get(label_values)
+        return entry[2] if entry else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*entry[0]], entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            labels = self._labels_dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=_format_value(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表
+
+    - 计数器/直方图在请求路径上直接更新（一次加锁的字典操作）
+    - 其他模块已有的统计（缓存层、任务表、日志队列、连接池）由采集函数在抓取时读取，不增加请求路径开销
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {_escape(e)}")
+                continue
+            for name, type_name, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局实例
+REGISTRY = MetricsRegistry()
+
+# --- 请求路径 ---
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "API requests by route, method and response status", ("route", "method", "status"))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "API request handling time by route", ("route", "method"))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "API requests currently being handled", ("route",))
+
+# --- 上游语音合成 ---
+TTS_UPSTREAM_PHASE = REGISTRY.histogram(
+    "tts_upstream_phase_seconds", "Upstream TTS time split into submit, poll and decode", ("phase",))
+TTS_UPSTREAM_POLLS = REGISTRY.histogram(
+    "tts_upstream_polls", "Poll requests needed per upstream synthesis", (),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+TTS_UPSTREAM_ERRORS = REGISTRY.counter(
+    "tts_upstream_errors_total", "Upstream TTS errors by category (AUTH, RATE_LIMIT, PARAMS, SERVER, UNKNOWN, NETWORK, TIMEOUT)",
+    ("category", "action"))
+
+
+def _collect_cache() -> Iterable[MetricFamily]:
+    from services.cache import _tts_cache
+    if _tts_cache is None:
+        return []
+    tiers = _tts_cache.get_stats()["tiers"]
+    hits, misses, ratio, entries, size = [], [], [], [], []
+    for tier, stats in tiers.items():
+        labels = {"tier": tier}
+        hits.append((labels, stats["hits"]))
+        misses.append((labels, stats["misses"]))
+        total = stats["hits"] + stats["misses"]
+        ratio.append((labels, round(stats["hits"] / total, 4) if total else 0.0))
+        entries.append((labels, stats["entries"]))
+        size.append((labels, stats["bytes_held"]))
+    return [
+        ("tts_cache_hits_total", "counter", "TTS cache hits by tier", hits),
+        ("tts_cache_misses_total", "counter", "TTS cache misses by tier (disk misses go upstream)", misses),
+        ("tts_cache_hit_ratio", "gauge", "TTS cache hit ratio by tier", ratio),
+        ("tts_cache_entries", "gauge", "TTS cache entries by tier", entries),
+        ("tts_cache_bytes", "gauge", "TTS cache bytes held by tier", size),
+    ]
+
+
+def _collect_jobs() -> Iterable[MetricFamily]:
+    from services.jobs import _job_manager
+    in_flight = _job_manager.in_flight() if _job_manager is not None else 0
+    return [("tts_jobs_in_flight", "gauge", "Background TTS jobs queued or running", [({}, in_flight)])]
+
+
+def _collect_logging() -> Iterable[MetricFamily]:
+    from services.logger_setup import get_logging_stats
+    stats = get_logging_stats()
+    if not stats.get("enabled"):
+        return []
+    return [
+        ("log_queue_depth", "gauge", "Log records waiting for the background writer", [({}, stats["queued"])]),
+        ("log_records_dropped_total", "counter", "Log records dropped because the queue was full",
+         [({"level": level}, count) for level, count in sorted(stats["dropped_by_level"].items())]),
+    ]
+
+
+def _collect_http_pool() -> Iterable[MetricFamily]:
+    from services.http_pool import get_pool_stats
+    hosts = get_pool_stats()["hosts"]
+    return [
+        ("http_pool_requests_total", "counter", "Outbound requests by host",
+         [({"host": host}, stats["requests"]) for host, stats in sorted(hosts.items())]),
+        ("http_pool_new_connections_total", "counter", "Outbound connections opened by host",
+         [({"host": host}, stats["new_connections"]) for host, stats in sorted(hosts.items())]),
+    ]
+
+
+for _collector in (_collect_cache, _collect_jobs, _collect_logging, _collect_http_pool):
+    REGISTRY.register_collector(_collector)
@@ -0,0 +1,93 @@
+import sys
+import struct
+from array import array
+from functools import lru_cache
+from math import gcd, pi, sin
+
+from .wav_utils import WavFormat, build_wav
+
+# 占位音频统一为 16-bit 单声道 PCM
+SAMPLE_WIDTH = 2
+
+
+def pcm16_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """用标准44字节头包装 16-bit 单声道 PCM（与 wave 模块写出的文件逐字节相同）"""
+    return build_wav(WavFormat(1, 1, sample_rate, 16), [memoryview(pcm)])
+
+
+def _to_le_bytes(samples: array) -> bytes:
+    if sys.byteorder == 'big':
+        samples = array('h', samples)
+        samples.byteswap()
+    return samples.tobytes()
+
+
+# --- 本地适配器的哔声 ---
+
+@lru_cache(maxsize=8)
+def _beep_block(sample_rate: int, level: int) -> bytes:
+    """0.1秒的哔声块：前1/10为固定电平，其余为静音"""
+    beep_samples = int(sample_rate * 0.1)
+    loud = beep_samples // 10
+    return struct.pack('<h', level) * loud + b'\x00\x00' * (beep_samples - loud)
+
+
+def beep_pcm(num_samples: int, sample_rate: int = 22050, level: int = int(16384 * 0.3)) -> bytes:
+    """短促哔声 + 静音，共 num_samples 个样本"""
+    block = _beep_block(sample_rate, level)
+    if num_samples * SAMPLE_WIDTH <= len(block):
+        return block[:num_samples * SAMPLE_WIDTH]
+    return block + bytes(num_samples * SAMPLE_WIDTH - len(block))
+
+
+# --- 带淡入淡出的正弦波 ---
+
+def _period_samples(sample_rate: int, frequency: int) -> int:
+    """整数个周期恰好对齐到整数个样本所需的最短样本数"""
+    return sample_rate // gcd(sample_rate, frequency)
+
+
+@lru_cache(maxsize=16)
+def _tone_period(sample_rate: int, frequency: int, amplitude: float) -> array:
+    """一个完整的正弦波模板（首尾相接，可直接平铺）"""
+    period = _period_samples(sample_rate, frequency)
+    peak = amplitude * 32767
+    return array('h', (int(peak * sin(2 * pi * frequency * i / sample_rate)) for i in range(period)))
+
+
+@lru_cache(maxsize=512)
+def _tone_fade(sample_rate: int, frequency: int, amplitude: float, fade_samples: int,
+               phase: int, fade_in: bool) -> array:
+    """淡入（从相位0开始）或淡出（从给定相位开始）的一段样本"""
+    period = _tone_period(sample_rate, frequency, amplitude)
+    length = len(period)
+    result = array('h', bytes(fade_samples * SAMPLE_WIDTH))
+    for i in range(fade_samples):
+        factor = i / fade_samples if fade_in else (fade_samples - i) / fade_samples
+        result[i] = int(period[(phase + i) % length] * factor)
+    return result
+
+
+def tone_pcm(num_samples: int, sample_rate: int = 16000, frequency: int = 440, amplitude: float = 0.3,
+             fade_seconds: float = 0.1) -> bytes:
+    """
+    带线性淡入淡出的正弦波 PCM（16-bit 小端）
+
+    一个周期的模板平铺到所需长度，首尾的淡入淡出段按相位缓存，
+    生成过程中只有数组拼接和切片，不逐样本执行 Python 代码。
+    """
+    period = _tone_period(sample_rate, frequency, amplitude)
+    repeats = num_samples // len(period) + 1
+    samples = (period * repeats)[:num_samples]
+
+    fade_samples = min(int(sample_rate * fade_seconds), num_samples // 2)
+    if fade_samples > 0:
+        samples[:fade_samples] = _tone_fade(sample_rate, frequency, amplitude, fade_samples, 0, True)
+        tail_start = num_samples - fade_samples
+        samples[tail_start:] = _tone_fade(sample_rate, frequency, amplitude, fade_samples,
+                                          tail_start % len(period), False)
+    return _to_le_bytes(samples)
+
+
+def silence_pcm(num_samples: int) -> bytes:
+    return bytes(num_samples * SAMPLE_WIDTH)
@@ -0,0 +1,84 @@
+import re
+import zlib
+from typing import List
+
+# 中文句末标点（保留在句子末尾）以及换行
+_SENTENCE_END = re.compile(r'[^。！？；!?;…\n]*(?:[。！？；!?;…]+[”」』）)]*|\n+|$)')
+# 超长句子的次级切分点
+_CLAUSE_END = re.compile(r'[^，、,：:]*(?:[，、,：:]+|$)')
+
+# 分段长度（字符）
+SEGMENT_MIN_CHARS = 40
+SEGMENT_MAX_CHARS = 300
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按中文句末标点切分句子
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        句子列表（去除首尾空白，忽略空句）
+    """
+    sentences = []
+    for match in _SENTENCE_END.finditer(text):
+        sentence = match.group(0).strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """超长句子按逗号等次级标点切分，仍超长则硬切"""
+    parts = []
+    current = ''
+    for match in _CLAUSE_END.finditer(sentence):
+        clause = match.group(0)
+        if not clause:
+            continue
+        if current and len(current) + len(clause) > max_chars:
+            parts.append(current)
+            current = ''
+        current += clause
+        while len(current) > max_chars:
+            parts.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        parts.append(current)
+    return parts
+
+
+def segment_text(text: str, min_chars: int = SEGMENT_MIN_CHARS, max_chars: int = SEGMENT_MAX_CHARS) -> List[str]:
+    """
+    将长文本切分为可独立缓存的分段
+
+    分段边界由内容决定：累计长度达到 min_chars 后，只在句子哈希命中边界条件
+    或达到 max_chars 时结束一段。因此修改某一句只会影响它所在的分段，
+    后续分段的边界和缓存键保持不变。
+
+    Args:
+        text: 原始文本
+        min_chars: 分段最小长度
+        max_chars: 分段最大长度
+
+    Returns:
+        分段列表
+    """
+    segments = []
+    current = ''
+    for sentence in split_sentences(text):
+        pieces = _split_long_sentence(sentence, max_chars) if len(sentence) > max_chars else [sentence]
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                segments.append(current)
+                current = ''
+            current += piece
+            is_boundary = zlib.crc32(piece.encode('utf-8')) % 4 == 0
+            if len(current) >= min_chars and (is_boundary or len(current) >= max_chars):
+                segments.append(current)
+                current = ''
+    if current:
+        segments.append(current)
+    return segments
@@ -0,0 +1,123 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发环境没有 fcntl，只做进程内合并
+    fcntl = None
+
+
+class _Call:
+    """一次进行中的调用，跟随者等待 done 事件后读取结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    相同键的并发调用合并（single-flight）
+
+    - 进程内：同一键只有第一个线程（leader）执行，其余线程等待其结果
+    - 进程间：leader 在执行前获取 lock_dir/<key>.lock 的排他文件锁；
+      拿到锁后先调用 lookup（通常是查缓存），命中则直接复用其他进程的结果
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> Tuple[Any, bool]:
+        """
+        执行或等待同键调用
+
+        Args:
+            key: 合并键（如 TTSCache._generate_cache_key 的结果）
+            fn: 实际执行的函数
+            lookup: 获取进程锁后调用，返回非None时视为其他进程已产出结果
+
+        Returns:
+            (结果, 是否复用了其他调用的结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        shared = False
+        try:
+            lock_fd = self._acquire_process_lock(key)
+            try:
+                result = lookup() if lookup is not None else None
+                if result is not None:
+                    shared = True
+                else:
+                    result = fn()
+            finally:
+                self._release_process_lock(key, lock_fd)
+            call.result = result
+            return result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """当前进程内进行中的调用数"""
+        return len(self._calls)
+
+    # --- 进程间文件锁 ---
+
+    def _lock_path(self, key: str) -> Path:
+        return self.lock_dir / f"{key}.lock"
+
+    def _acquire_process_lock(self, key: str) -> Optional[int]:
+        """获取键对应的排他文件锁；锁文件在释放前被删除，因此需要校验 inode"""
+        if fcntl is None or self.lock_dir is None:
+            return None
+
+        path = self._lock_path(key)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            # 拿到的是已被上一个 leader 删除的锁文件，重试
+            os.close(fd)
+
+    def _release_process_lock(self, key: str, fd: Optional[int]):
+        if fd is None:
+            return
+        try:
+            os.unlink(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
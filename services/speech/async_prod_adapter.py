@@ -0,0 +1,277 @@
+import time
+import heapq
+import asyncio
+import weakref
+import itertools
+import httpx
+from collections import deque
+from typing import Dict, Any, Optional, List
+from .prod_adapter import ProductionSpeechAdapter
+from ..http_pool import get_ssl_context, get_pool_maxsize
+from ..metrics import TTS_UPSTREAM_PHASE, TTS_UPSTREAM_POLLS, TTS_UPSTREAM_ERRORS
+
+
+class _PendingPoll:
+    """调度器中一个待轮询的 reqid"""
+
+    def __init__(self, reqid: str, query_payload: Dict[str, Any], headers: Dict[str, str],
+                 debug_log: Dict[str, Any], deadline: float, poll_interval_ms: int,
+                 future: asyncio.Future):
+        self.reqid = reqid
+        self.query_payload = query_payload
+        self.headers = headers
+        self.debug_log = debug_log
+        self.deadline = deadline
+        self.poll_interval_ms = poll_interval_ms
+        self.poll_count = 0
+        self.last_responses = deque(maxlen=3)
+        self.future = future
+
+
+class PollScheduler:
+    """
+    共享轮询调度器
+
+    在一个事件循环上跟踪所有未完成的 reqid：按下次轮询时间放入小顶堆，
+    单个调度协程负责到期唤醒并发起查询，轮询间隔沿用适配器的退避规则
+    （poll_interval_ms / backoff_factor / max_poll_interval_ms）。
+    没有待轮询的 reqid 时调度协程退出，下一次登记时再启动。
+    """
+
+    def __init__(self, adapter: "AsyncProductionSpeechAdapter"):
+        self.adapter = adapter
+        # 连接池中的连接绑定在创建它们的事件循环上，每个循环各用一个客户端
+        self.client = adapter._new_async_client()
+        self.outstanding: Dict[str, _PendingPoll] = {}
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    def in_flight(self) -> int:
+        """当前等待中的 reqid 数量"""
+        return len(self.outstanding)
+
+    async def wait_for_audio(self, reqid: str, payload: Dict[str, Any], headers: Dict[str, str],
+                             debug_log: Dict[str, Any], deadline: float) -> bytes:
+        """
+        登记一个 reqid 并等待其音频就绪
+
+        Args:
+            reqid: 提交任务返回的请求ID
+            payload: 提交时的请求体（用于构建查询请求）
+            headers: 请求头
+            debug_log: 调试日志，轮询步骤追加到 steps
+            deadline: 截止时间（time.time() 时间戳）
+
+        Returns:
+            音频数据
+        """
+        loop = asyncio.get_running_loop()
+        pending = _PendingPoll(
+            reqid=reqid,
+            query_payload=self.adapter._build_query_payload(payload, reqid),
+            headers=headers,
+            debug_log=debug_log,
+            deadline=deadline,
+            poll_interval_ms=self.adapter.poll_interval_ms,
+            future=loop.create_future()
+        )
+        self.outstanding[reqid] = pending
+        self._schedule(pending, pending.poll_interval_ms)  # Initial wait
+
+        if self._runner is None or self._runner.done():
+            self._runner = loop.create_task(self._run())
+        try:
+            return await pending.future
+        finally:
+            self.outstanding.pop(reqid, None)
+            if not self.outstanding:
+                self._wakeup.set()  # 唤醒调度协程，让其退出
+
+    def _schedule(self, pending: _PendingPoll, delay_ms: int):
+        heapq.heappush(self._heap, (time.monotonic() + delay_ms / 1000, next(self._seq), pending))
+        self._wakeup.set()
+
+    async def _run(self):
+        """调度主循环：等待最早到期的轮询，到期后并发发起查询；没有待轮询的 reqid 时退出"""
+        while self.outstanding:
+            # 丢弃已完成（或调用方已取消）的条目，不为它们等待
+            while self._heap and self._heap[0][2].future.done():
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, pending = heapq.heappop(self._heap)
+            if not pending.future.done():
+                asyncio.get_running_loop().create_task(self._poll_once(pending))
+        # 退出时不再持有任务和已绑定循环的 Event，空闲的调度器不会让事件循环无法回收
+        self._heap.clear()
+        self._runner = None
+        self._wakeup = asyncio.Event()
+
+    async def _poll_once(self, pending: _PendingPoll):
+        """对一个 reqid 发起一次查询，根据结果完成、重新调度或超时"""
+        if pending.future.done():  # 调用方已取消
+            return
+        if time.time() >= pending.deadline:
+            TTS_UPSTREAM_ERRORS.inc("TIMEOUT", "poll")
+            pending.future.set_exception(Exception(
+                f"Polling timeout: Audio not ready in time. Last 3 responses: {list(pending.last_responses)}"
+            ))
+            return
+
+        adapter = self.adapter
+        pending.poll_count += 1
+        poll_step = {"action": "poll", "url": adapter.api_url, "reqid": pending.reqid, "poll_count": pending.poll_count}
+        pending.debug_log["steps"].append(poll_step)
+        poll_start_time = time.time()
+
+        try:
+            q_response = await self.client.post(adapter.api_url, json=pending.query_payload, headers=pending.headers)
+            poll_step["first_packet_latency_s"] = round(time.time() - poll_start_time, 3)
+            q_response.raise_for_status()
+            q_json = q_response.json()
+            TTS_UPSTREAM_PHASE.observe(time.time() - poll_start_time, "poll")
+            poll_step["http_status"] = q_response.status_code
+            poll_step["response_body"] = q_json
+            pending.last_responses.append(q_json)
+
+            audio_data = adapter._handle_poll_response(q_json)
+        except httpx.HTTPStatusError as e:
+            try:
+                adapter._classify_and_raise(e, "poll", poll_step, list(pending.last_responses))
+            except Exception as classified:
+                if not pending.future.done():
+                    pending.future.set_exception(classified)
+            return
+        except Exception as e:
+            poll_step["error"] = {"type": "NETWORK", "message": str(e)}
+            TTS_UPSTREAM_ERRORS.inc("NETWORK", "poll")
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+
+        if pending.future.done():
+            return
+        if audio_data is not None:
+            pending.future.set_result(audio_data)
+            return
+
+        pending.poll_interval_ms = adapter._next_poll_interval(pending.poll_interval_ms, pending.poll_count)
+        self._schedule(pending, pending.poll_interval_ms)
+
+
+class AsyncProductionSpeechAdapter(ProductionSpeechAdapter):
+    """
+    生产环境语音合成适配器的 asyncio 版本
+
+    同一事件循环上的请求共用一个 httpx.AsyncClient，轮询由该循环的 PollScheduler 统一调度，
+    单个进程可同时挂起数百个合成任务而不占用线程。
+    声音复刻等管理接口沿用父类的同步实现。
+    """
+
+    def __init__(self):
+        super().__init__()
+        # 按事件循环弱引用保存调度器（及其客户端）；已关闭的循环在下次获取时清理，
+        # 客户端的连接仍引用着旧循环时也不会一直累积
+        self._schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PollScheduler]" = \
+            weakref.WeakKeyDictionary()
+
+    def _new_async_client(self) -> httpx.AsyncClient:
+        maxsize = get_pool_maxsize()
+        return httpx.AsyncClient(
+            timeout=(self.timeout_ms / 1000),
+            verify=get_ssl_context() or True,
+            limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize)
+        )
+
+    def get_scheduler(self) -> PollScheduler:
+        """获取当前事件循环上的轮询调度器"""
+        loop = asyncio.get_running_loop()
+        scheduler = self._schedulers.get(loop)
+        if scheduler is None:
+            for stale in [other for other in list(self._schedulers.keys()) if other.is_closed()]:
+                self._schedulers.pop(stale, None)
+            scheduler = PollScheduler(self)
+            self._schedulers[loop] = scheduler
+        return scheduler
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """当前事件循环上的异步客户端"""
+        return self.get_scheduler().client
+
+    async def synthesize_async(self, text: str, voice_type: str = "default", quality: str = "draft", **kwargs) -> tuple[bytes, dict]:
+        """异步合成语音，返回值与 synthesize 相同"""
+        debug_log = self._new_debug_log()
+
+        start_time = time.time()
+        try:
+            payload = self._build_submit_payload(text, voice_type, **kwargs)
+            audio_data = await self._make_request_async(payload, debug_log)
+            debug_log["final_audio_size"] = len(audio_data)
+            return audio_data, debug_log
+        except Exception as e:
+            debug_log["error_info"] = str(e)
+            raise
+        finally:
+            debug_log["total_duration_s"] = round(time.time() - start_time, 3)
+
+    async def _make_request_async(self, payload: Dict[str, Any], debug_log: Dict[str, Any]) -> bytes:
+        headers = self._build_headers()
+
+        # --- 1. Submit Task ---
+        submit_step = {"action": "submit", "url": self.api_url}
+        debug_log["steps"].append(submit_step)
+
+        submit_start_time = time.time()
+
+        try:
+            response = await self.async_client.post(self.api_url, json=payload, headers=headers)
+            submit_step["first_packet_latency_s"] = round(time.time() - submit_start_time, 3)
+            response.raise_for_status()
+            json_response = response.json()
+            TTS_UPSTREAM_PHASE.observe(time.time() - submit_start_time, "submit")
+            submit_step["http_status"] = response.status_code
+            submit_step["response_body"] = json_response
+        except httpx.HTTPStatusError as e:
+            self._classify_and_raise(e, "submit", submit_step)
+        except Exception as e:
+            submit_step["error"] = {"type": "NETWORK", "message": str(e)}
+            TTS_UPSTREAM_ERRORS.inc("NETWORK", "submit")
+            raise
+
+        # --- 2. Handle Response & hand off to the shared poll scheduler ---
+        audio_data, reqid = self._handle_submit_response(json_response)
+        if audio_data is not None:
+            TTS_UPSTREAM_POLLS.observe(0)
+            return audio_data
+
+        debug_log["task_id"] = reqid
+        deadline = submit_start_time + (self.timeout_ms / 1000)
+        try:
+            return await self.get_scheduler().wait_for_audio(reqid, payload, headers, debug_log, deadline)
+        finally:
+            TTS_UPSTREAM_POLLS.observe(sum(1 for step in debug_log["steps"] if step.get("action") == "poll"))
+
+    def in_flight(self) -> int:
+        """所有事件循环上等待轮询的任务数"""
+        return sum(scheduler.in_flight() for scheduler in list(self._schedulers.values()))
+
+    async def aclose(self):
+        """关闭当前事件循环上的异步客户端并丢弃其调度器"""
+        scheduler = self._schedulers.pop(asyncio.get_running_loop(), None)
+        if scheduler is not None:
+            await scheduler.client.aclose()
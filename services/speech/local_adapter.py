@@ -1,12 +1,14 @@
 import os
 import json
 import hashlib
-import struct
-import wave
-import io
 import time
 from typing import Dict, Any, List
 from .base import SpeechSynthesizer
+from ..memory_cache import MemoryCache
+from ..placeholder_audio import beep_pcm, pcm16_wav
+
+# 进程内共享的内存层：适配器按请求创建，缓存需要跨实例复用
+_memory_cache = MemoryCache()
 
 
 class LocalSpeechAdapter(SpeechSynthesizer):
@@ -54,40 +56,10 @@ class LocalSpeechAdapter(SpeechSynthesizer):
         return hashlib.md5(content.encode('utf-8')).hexdigest()
     
     def _generate_placeholder_audio(self, text: str, duration_seconds: float = 0.5) -> bytes:
-        """生成占位音频（静音或简单哔声）"""
+        """生成占位音频（短促哔声后接静音，由预先生成的0.1秒哔声块拼接）"""
         sample_rate = 22050
-        channels = 1
-        sample_width = 2  # 16-bit
-        
-        # 计算样本数
         num_samples = int(sample_rate * duration_seconds)
-        
-        # 生成简单的哔声（440Hz正弦波，持续0.1秒，然后静音）
-        beep_samples = int(sample_rate * 0.1)
-        samples = []
-        
-        # 哔声部分
-        for i in range(min(beep_samples, num_samples)):
-            # 440Hz正弦波
-            value = int(16384 * 0.3 * (1 if i < beep_samples // 10 else 0))  # 短促哔声
-            samples.append(value)
-        
-        # 静音部分
-        for i in range(num_samples - len(samples)):
-            samples.append(0)
-        
-        # 转换为字节
-        audio_data = b''.join(struct.pack('<h', sample) for sample in samples)
-        
-        # 创建WAV文件
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(sample_width)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio_data)
-        
-        return wav_buffer.getvalue()
+        return pcm16_wav(beep_pcm(num_samples, sample_rate), sample_rate)
     
     def synthesize(self, text: str, voice_type: str = "default", quality: str = "draft", **kwargs) -> bytes:
         """合成语音"""
@@ -97,10 +69,17 @@ class LocalSpeechAdapter(SpeechSynthesizer):
         cache_key = self._get_cache_key(text, voice_type, quality)
         cache_file = os.path.join(self.cache_dir, f"{cache_key}.wav")
         
+        # 检查内存层
+        audio_data = _memory_cache.get(cache_key)
+        if audio_data is not None:
+            return audio_data
+        
         # 检查缓存
         if os.path.exists(cache_file):
             with open(cache_file, 'rb') as f:
-                return f.read()
+                audio_data = f.read()
+            _memory_cache.put(cache_key, audio_data)
+            return audio_data
         
         # 检查fixtures
         if cache_key in self.fixtures_index:
@@ -111,6 +90,7 @@ class LocalSpeechAdapter(SpeechSynthesizer):
                     # 写入缓存
                     with open(cache_file, 'wb') as cache_f:
                         cache_f.write(audio_data)
+                    _memory_cache.put(cache_key, audio_data)
                     return audio_data
         
         # 生成占位音频
@@ -120,6 +100,7 @@ class LocalSpeechAdapter(SpeechSynthesizer):
         # 写入缓存
         with open(cache_file, 'wb') as f:
             f.write(audio_data)
+        _memory_cache.put(cache_key, audio_data)
         
         return audio_data
     
@@ -131,6 +112,10 @@ class LocalSpeechAdapter(SpeechSynthesizer):
         """获取提供商名称"""
         return "local"
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取内存层缓存统计"""
+        return _memory_cache.get_stats()
+    
     def voice_clone(self, speaker_id: str, audio_data: bytes, audio_format: str = "wav", 
                    language: str = "zh", model_type: int = 1, **kwargs) -> Dict[str, Any]:
         """声音复刻（本地模式占位符实现）"""
@@ -9,6 +9,8 @@ from datetime import datetime
 from collections import deque
 from typing import Dict, Any, List, Optional
 from .base import SpeechSynthesizer
+from ..http_pool import get_httpx_client
+from ..metrics import TTS_UPSTREAM_PHASE, TTS_UPSTREAM_POLLS, TTS_UPSTREAM_ERRORS
 
 class ProductionSpeechAdapter(SpeechSynthesizer):
     """生产环境语音合成适配器（火山引擎TTS）"""
@@ -21,7 +23,8 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         self.vc_access_token = self.access_token
 
         # --- 端点定义 ---
-        self.api_url = 'https://openspeech.bytedance.com/api/v1/tts'
+        # TTS_API_URL 可指向本地替身服务（scripts/volc_standin.py），离线压测完整的提交/轮询路径
+        self.api_url = os.environ.get('TTS_API_URL', 'https://openspeech.bytedance.com/api/v1/tts')
         vc_base_url = 'https://openspeech.bytedance.com/api/v1/mega_tts'
         self.voice_clone_upload_url = f"{vc_base_url}/audio/upload"
         self.voice_clone_status_url = f"{vc_base_url}/status"
@@ -32,8 +35,9 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         self.backoff_factor = float(os.environ.get('TTS_BACKOFF_FACTOR', '1.2')) # Reduced backoff
         self.max_poll_interval_ms = int(os.environ.get('TTS_MAX_POLL_INTERVAL_MS', '5000')) # Max 5s interval
         
-        # --- httpx Client ---
-        self.http_client = httpx.Client(timeout=(self.timeout_ms / 1000))
+        # --- httpx Client（进程内共享连接池与SSL上下文，第一次请求上游时获取）---
+        self._http_client = None
+        self.request_timeout_s = self.timeout_ms / 1000
 
         print("-" * 50)
         print("TTS Adapter Configuration:")
@@ -42,54 +46,47 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         print(f"  - Backoff Factor: {self.backoff_factor}")
         print("-" * 50)
 
-    def synthesize(self, text: str, voice_type: str = "default", quality: str = "draft", **kwargs) -> tuple[bytes, dict]:
-        job_id = f"tts-job-{uuid.uuid4().hex[:12]}"
-        debug_log = {
-            "job_id": job_id,
-            "submit_time_utc": datetime.utcnow().isoformat() + "Z",
-            "steps": [],
-            "final_audio_size": 0,
-            "error_info": None,
-            "total_duration_s": 0
+    @property
+    def http_client(self) -> httpx.Client:
+        """RECORD / REPLAY 模式下换成磁带客户端：录制或回放每次提交/轮询的完整交互"""
+        client = self._http_client
+        if client is None:
+            from ..fixtures.cassette import get_cassette_client
+            client = get_cassette_client()
+            if client is not None:
+                self._sync_cassette_timing()
+            client = self._http_client = client or get_httpx_client()
+        return client
+
+    def _poll_settings(self) -> Dict[str, Any]:
+        return {
+            "poll_interval_ms": self.poll_interval_ms,
+            "backoff_factor": self.backoff_factor,
+            "max_poll_interval_ms": self.max_poll_interval_ms
         }
 
-        start_time = time.time()
-        try:
-            if not self.validate_text(text):
-                raise ValueError("Invalid text input")
-            
-            is_voice_clone = bool(voice_type and voice_type.startswith('S_'))
-            
-            if is_voice_clone and not self._validate_voice_clone_id(voice_type):
-                raise ValueError(f"Invalid voice clone ID format: {voice_type}.")
+    def _sync_cassette_timing(self):
+        """
+        录制时把轮询配置写入磁带头部；回放时改用头部中的配置，并按回放速度缩放轮询等待
+        （速度为 0 时不等待），回放耗时不超过录制耗时
+        """
+        from ..fixtures.cassette import RecordingTransport, ReplayTransport, get_cassette_transport
+        transport = get_cassette_transport()
+        if isinstance(transport, RecordingTransport):
+            transport.write_header(self._poll_settings())
+        elif isinstance(transport, ReplayTransport):
+            settings = dict(self._poll_settings(), **(transport.poll_settings or {}))
+            scale = 1 / transport.speed if transport.speed > 0 else 0
+            self.poll_interval_ms = int(settings["poll_interval_ms"] * scale)
+            self.max_poll_interval_ms = int(settings["max_poll_interval_ms"] * scale)
+            self.backoff_factor = settings["backoff_factor"]
 
-            payload = {
-                "app": {
-                    "appid": self.app_id,
-                    "token": self.access_token,
-                    "cluster": "volcano_icl" if is_voice_clone else "volcano_tts"
-                },
-                "user": {"uid": "prenatal_education_user"},
-                "audio": {
-                    "voice_type": voice_type,
-                    "encoding": "wav",
-                    "speed_ratio": 1.0, "volume_ratio": 1.0, "pitch_ratio": 1.0
-                },
-                "request": {
-                    "reqid": f"prenatal_{int(time.time() * 1000)}",
-                    "text": text,
-                    "text_type": "plain",
-                    "operation": "submit"
-                }
-            }
-            
-            if is_voice_clone:
-                if voice_type == "S_DrtguyIB1":
-                     payload["request"]["resource_id"] = "Model_storage_yy3v7LU7E5J7Werh"
-                emotion = kwargs.get('emotion', 'neutral')
-                if emotion and emotion != 'neutral':
-                    payload["audio"]["emotion"] = emotion
+    def synthesize(self, text: str, voice_type: str = "default", quality: str = "draft", **kwargs) -> tuple[bytes, dict]:
+        debug_log = self._new_debug_log()
 
+        start_time = time.time()
+        try:
+            payload = self._build_submit_payload(text, voice_type, **kwargs)
             audio_data = self._make_request_with_retry(payload, debug_log)
             debug_log["final_audio_size"] = len(audio_data)
             return audio_data, debug_log
@@ -99,11 +96,121 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         finally:
             debug_log["total_duration_s"] = round(time.time() - start_time, 3)
 
-    def _make_request_with_retry(self, payload: Dict[str, Any], debug_log: Dict[str, Any]) -> bytes:
-        headers = {
+    def _new_debug_log(self) -> Dict[str, Any]:
+        return {
+            "job_id": f"tts-job-{uuid.uuid4().hex[:12]}",
+            "submit_time_utc": datetime.utcnow().isoformat() + "Z",
+            "steps": [],
+            "final_audio_size": 0,
+            "error_info": None,
+            "total_duration_s": 0
+        }
+
+    def _build_headers(self) -> Dict[str, str]:
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer;{self.access_token}"
         }
+
+    def _build_submit_payload(self, text: str, voice_type: str, **kwargs) -> Dict[str, Any]:
+        if not self.validate_text(text):
+            raise ValueError("Invalid text input")
+        
+        is_voice_clone = bool(voice_type and voice_type.startswith('S_'))
+        
+        if is_voice_clone and not self._validate_voice_clone_id(voice_type):
+            raise ValueError(f"Invalid voice clone ID format: {voice_type}.")
+
+        payload = {
+            "app": {
+                "appid": self.app_id,
+                "token": self.access_token,
+                "cluster": "volcano_icl" if is_voice_clone else "volcano_tts"
+            },
+            "user": {"uid": "prenatal_education_user"},
+            "audio": {
+                "voice_type": voice_type,
+                "encoding": "wav",
+                "speed_ratio": 1.0, "volume_ratio": 1.0, "pitch_ratio": 1.0
+            },
+            "request": {
+                "reqid": f"prenatal_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}",
+                "text": text,
+                "text_type": "plain",
+                "operation": "submit"
+            }
+        }
+        
+        if is_voice_clone:
+            if voice_type == "S_DrtguyIB1":
+                 payload["request"]["resource_id"] = "Model_storage_yy3v7LU7E5J7Werh"
+            emotion = kwargs.get('emotion', 'neutral')
+            if emotion and emotion != 'neutral':
+                payload["audio"]["emotion"] = emotion
+        return payload
+
+    def _build_query_payload(self, payload: Dict[str, Any], reqid: str) -> Dict[str, Any]:
+        query_payload = {
+            "app": payload["app"],
+            "user": payload["user"],
+            "audio": payload["audio"],
+            "request": {"reqid": reqid, "operation": "query", "text": payload["request"]["text"], "text_type": payload["request"]["text_type"]}
+        }
+        if payload["request"].get("resource_id"):
+            query_payload["request"]["resource_id"] = payload["request"]["resource_id"]
+        return query_payload
+
+    def _handle_submit_response(self, json_response: Dict[str, Any]):
+        """解析提交响应：返回 (音频, None) 表示同步完成，(None, reqid) 表示需要轮询"""
+        code = json_response.get("code")
+        if code == 0:
+            audio_base64 = json_response.get("data")
+            if audio_base64 and isinstance(audio_base64, str):
+                return self._decode_audio(audio_base64), None
+            raise Exception("API returned success code but no audio data")
+        elif code in [3000, 3032]:
+            reqid = json_response.get("reqid")
+            if not reqid:
+                raise Exception("API async response missing 'reqid'")
+            return None, reqid
+        else:
+            raise Exception(f"API Error ({code}): {json_response.get('message', 'Unknown')}")
+
+    def _handle_poll_response(self, q_json: Dict[str, Any]) -> Optional[bytes]:
+        """解析轮询响应：返回音频数据，仍在处理中时返回None"""
+        q_code = q_json.get("code")
+        if q_code == 0:
+            audio_base64 = q_json.get("data")
+            if audio_base64 and isinstance(audio_base64, str):
+                return self._decode_audio(audio_base64)
+            # Still processing, no data yet, continue polling
+        elif q_code in [3000, 3032]:
+            # FIX: Check for data even with code 3000 (success with data)
+            audio_base64 = q_json.get("data")
+            if audio_base64 and isinstance(audio_base64, str):
+                return self._decode_audio(audio_base64)
+            # If no data, it's still processing, so continue polling
+        else:
+            raise Exception(f"Polling failed with API Error ({q_code}): {q_json.get('message', 'Unknown')}")
+        return None
+
+    def _decode_audio(self, audio_base64: str) -> bytes:
+        decode_start_time = time.perf_counter()
+        audio_data = base64.b64decode(audio_base64)
+        TTS_UPSTREAM_PHASE.observe(time.perf_counter() - decode_start_time, "decode")
+        return audio_data
+
+    def _next_poll_interval(self, current_poll_interval: int, poll_count: int) -> int:
+        # 动态调整轮询间隔：随着时间增加，间隔逐渐增大
+        if poll_count > 5:  # 5次轮询后开始增加间隔
+            return min(
+                int(current_poll_interval * self.backoff_factor),
+                self.max_poll_interval_ms
+            )
+        return current_poll_interval
+
+    def _make_request_with_retry(self, payload: Dict[str, Any], debug_log: Dict[str, Any]) -> bytes:
+        headers = self._build_headers()
         
         # --- 1. Submit Task ---
         submit_step = {"action": "submit", "url": self.api_url}
@@ -112,98 +219,73 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         submit_start_time = time.time()
 
         try:
-            response = self.http_client.post(self.api_url, json=payload, headers=headers)
+            response = self.http_client.post(self.api_url, json=payload, headers=headers, timeout=self.request_timeout_s)
             submit_step["first_packet_latency_s"] = round(time.time() - submit_start_time, 3)
             response.raise_for_status() # Raise exception for 4xx/5xx
             json_response = response.json()
+            TTS_UPSTREAM_PHASE.observe(time.time() - submit_start_time, "submit")
             submit_step["http_status"] = response.status_code
             submit_step["response_body"] = json_response
         except httpx.HTTPStatusError as e:
             self._classify_and_raise(e, "submit", submit_step)
         except Exception as e:
             submit_step["error"] = {"type": "NETWORK", "message": str(e)}
+            TTS_UPSTREAM_ERRORS.inc("NETWORK", "submit")
             raise
 
         # --- 2. Handle Response & Poll if Necessary ---
-        code = json_response.get("code")
-        if code == 0:
-            audio_base64 = json_response.get("data")
-            if audio_base64 and isinstance(audio_base64, str):
-                return base64.b64decode(audio_base64)
-            raise Exception("API returned success code but no audio data")
+        audio_data, reqid = self._handle_submit_response(json_response)
+        if audio_data is not None:
+            TTS_UPSTREAM_POLLS.observe(0)
+            return audio_data
         
-        elif code in [3000, 3032]:
-            reqid = json_response.get("reqid")
-            if not reqid:
-                raise Exception("API async response missing 'reqid'")
-            
-            debug_log["task_id"] = reqid
-            last_poll_responses = deque(maxlen=3)
-            deadline = time.time() + (self.timeout_ms / 1000) - (time.time() - submit_start_time)
+        debug_log["task_id"] = reqid
+        last_poll_responses = deque(maxlen=3)
+        deadline = time.time() + (self.timeout_ms / 1000) - (time.time() - submit_start_time)
 
-            # 动态调整轮询间隔
-            current_poll_interval = self.poll_interval_ms
-            poll_count = 0
+        # 动态调整轮询间隔
+        current_poll_interval = self.poll_interval_ms
+        poll_count = 0
+        
+        time.sleep(current_poll_interval / 1000) # Initial wait
+
+        while time.time() < deadline:
+            poll_count += 1
+            poll_step = {"action": "poll", "url": self.api_url, "reqid": reqid, "poll_count": poll_count}
+            debug_log["steps"].append(poll_step)
+            poll_start_time = time.time()
+
+            query_payload = self._build_query_payload(payload, reqid)
+
+            try:
+                q_response = self.http_client.post(self.api_url, json=query_payload, headers=headers, timeout=self.request_timeout_s)
+                poll_step["first_packet_latency_s"] = round(time.time() - poll_start_time, 3)
+                q_response.raise_for_status()
+                q_json = q_response.json()
+                TTS_UPSTREAM_PHASE.observe(time.time() - poll_start_time, "poll")
+                poll_step["http_status"] = q_response.status_code
+                poll_step["response_body"] = q_json
+                last_poll_responses.append(q_json)
+
+                audio_data = self._handle_poll_response(q_json)
+                if audio_data is not None:
+                    TTS_UPSTREAM_POLLS.observe(poll_count)
+                    return audio_data
+            except httpx.HTTPStatusError as e:
+                TTS_UPSTREAM_POLLS.observe(poll_count)
+                self._classify_and_raise(e, "poll", poll_step, list(last_poll_responses))
+            except Exception as e:
+                poll_step["error"] = {"type": "NETWORK", "message": str(e)}
+                TTS_UPSTREAM_POLLS.observe(poll_count)
+                TTS_UPSTREAM_ERRORS.inc("NETWORK", "poll")
+                raise
             
-            time.sleep(current_poll_interval / 1000) # Initial wait
-
-            while time.time() < deadline:
-                poll_count += 1
-                poll_step = {"action": "poll", "url": self.api_url, "reqid": reqid, "poll_count": poll_count}
-                debug_log["steps"].append(poll_step)
-                poll_start_time = time.time()
-
-                query_payload = {
-                    "app": payload["app"],
-                    "user": payload["user"],
-                    "audio": payload["audio"],
-                    "request": {"reqid": reqid, "operation": "query", "text": payload["request"]["text"], "text_type": payload["request"]["text_type"]}
-                }
-                if payload["request"].get("resource_id"):
-                    query_payload["request"]["resource_id"] = payload["request"]["resource_id"]
-
-                try:
-                    q_response = self.http_client.post(self.api_url, json=query_payload, headers=headers)
-                    poll_step["first_packet_latency_s"] = round(time.time() - poll_start_time, 3)
-                    q_response.raise_for_status()
-                    q_json = q_response.json()
-                    poll_step["http_status"] = q_response.status_code
-                    poll_step["response_body"] = q_json
-                    last_poll_responses.append(q_json)
-
-                    q_code = q_json.get("code")
-                    if q_code == 0:
-                        audio_base64 = q_json.get("data")
-                        if audio_base64 and isinstance(audio_base64, str):
-                            return base64.b64decode(audio_base64)
-                        # Still processing, no data yet, continue polling
-                    elif q_code in [3000, 3032]:
-                        # FIX: Check for data even with code 3000 (success with data)
-                        audio_base64 = q_json.get("data")
-                        if audio_base64 and isinstance(audio_base64, str):
-                            return base64.b64decode(audio_base64)
-                        # If no data, it's still processing, so continue polling
-                        pass 
-                    else:
-                        raise Exception(f"Polling failed with API Error ({q_code}): {q_json.get('message', 'Unknown')}")
-                except httpx.HTTPStatusError as e:
-                    self._classify_and_raise(e, "poll", poll_step, list(last_poll_responses))
-                except Exception as e:
-                    poll_step["error"] = {"type": "NETWORK", "message": str(e)}
-                    raise
-                
-                # 动态调整轮询间隔：随着时间增加，间隔逐渐增大
-                if poll_count > 5:  # 5次轮询后开始增加间隔
-                    current_poll_interval = min(
-                        int(current_poll_interval * self.backoff_factor),
-                        self.max_poll_interval_ms
-                    )
-                
-                time.sleep(current_poll_interval / 1000)
-
-            raise Exception(f"Polling timeout: Audio not ready in time. Last 3 responses: {list(last_poll_responses)}")
-        else:
-            raise Exception(f"API Error ({code}): {json_response.get('message', 'Unknown')}")
+            current_poll_interval = self._next_poll_interval(current_poll_interval, poll_count)
+            time.sleep(current_poll_interval / 1000)
+
+        TTS_UPSTREAM_POLLS.observe(poll_count)
+        TTS_UPSTREAM_ERRORS.inc("TIMEOUT", "poll")
+        raise Exception(f"Polling timeout: Audio not ready in time. Last 3 responses: {list(last_poll_responses)}")
 
     def _classify_and_raise(self, error: httpx.HTTPStatusError, action: str, step: dict, history: list = None):
         status = error.response.status_code
@@ -215,6 +297,7 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
         elif 500 <= status < 600: error_type = "SERVER"
         
         step["error"] = {"type": error_type, "http_status": status, "message": error_body}
+        TTS_UPSTREAM_ERRORS.inc(error_type, action)
         if history:
             step["error"]["history"] = history
         raise Exception(f"{error_type} error during {action}: {error_body}")
@@ -237,7 +320,7 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
                 "Resource-Id": "volc.megatts.voiceclone"
             }
             
-            response = self.http_client.post(self.voice_clone_upload_url, json=payload, headers=headers)
+            response = self.http_client.post(self.voice_clone_upload_url, json=payload, headers=headers, timeout=self.request_timeout_s)
             response.raise_for_status()
             json_response = response.json()
 
@@ -257,7 +340,7 @@ class ProductionSpeechAdapter(SpeechSynthesizer):
                 "Resource-Id": "volc.megatts.voiceclone"
             }
 
-            response = self.http_client.post(self.voice_clone_status_url, json=payload, headers=headers)
+            response = self.http_client.post(self.voice_clone_status_url, json=payload, headers=headers, timeout=self.request_timeout_s)
             response.raise_for_status()
             json_response = response.json()
 
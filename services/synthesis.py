@@ -0,0 +1,210 @@
+import os
+import asyncio
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from .speech.base import SpeechSynthesizer
+from .cache import TTSCache, get_tts_cache
+from .singleflight import SingleFlight
+from .segmenter import segment_text
+from .wav_utils import stitch_wavs
+
+
+def _normalize_result(result) -> Tuple[bytes, Dict[str, Any]]:
+    """统一适配器返回值：生产适配器返回 (audio, debug_log)，本地/沙箱只返回 audio"""
+    if isinstance(result, tuple):
+        audio_data, debug_log = result
+        return audio_data, debug_log or {}
+    return result, {}
+
+
+def _follower_log(debug_log: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    并发合并中跟随者的调试信息
+
+    不沿用 leader 的 job_id（各自生成 trace_id，按 X-Trace-Id 查询时不会对应到多条记录），
+    改记为 coalesced_with。
+    """
+    follower = {key: value for key, value in debug_log.items() if key != "job_id"}
+    follower["coalesced"] = True
+    if debug_log.get("job_id"):
+        follower["coalesced_with"] = debug_log["job_id"]
+    return follower
+
+
+def build_cache_params(speech_service: SpeechSynthesizer, quality: str = "draft",
+                       emotion: str = "neutral") -> Dict[str, Any]:
+    """构建缓存键参数（包含提供商，避免占位音频与真实音频互相命中）"""
+    return {
+        "provider": speech_service.get_provider_name(),
+        "quality": quality,
+        "emotion": emotion
+    }
+
+
+def synthesize_cached(speech_service: SpeechSynthesizer, text: str, voice_type: str = "default",
+                      quality: str = "draft", emotion: str = "neutral",
+                      cache: Optional[TTSCache] = None,
+                      flight: Optional[SingleFlight] = None) -> Tuple[bytes, Dict[str, Any], bool]:
+    """
+    带缓存和并发合并的语音合成
+
+    Args:
+        speech_service: 语音合成服务实例
+        text: 要合成的文本
+        voice_type: 音色类型
+        quality: 音质
+        emotion: 情感
+        cache: TTS缓存实例，默认使用全局实例
+        flight: 并发合并器，默认使用全局实例
+
+    Returns:
+        (音频数据, 调试信息, 是否来自缓存或其他并发请求)
+    """
+    if cache is None:
+        cache = get_tts_cache()
+    if flight is None:
+        flight = get_single_flight()
+
+    params = build_cache_params(speech_service, quality, emotion)
+
+    cached = cache.get(text, voice_type, params)
+    if cached is not None:
+        return cached, {"cache": "hit"}, True
+
+    def run():
+        audio_data, debug_log = _normalize_result(
+            speech_service.synthesize(text, voice_type=voice_type, emotion=emotion, quality=quality)
+        )
+        cache.set(text, audio_data, voice_type, params)
+        return audio_data, debug_log
+
+    def lookup():
+        # 拿到进程锁后再查一次：其他进程可能刚完成同一合成（未命中已在上面记过，不重复计数）
+        audio_data = cache.get(text, voice_type, params, count_miss=False)
+        return (audio_data, {"cache": "hit"}) if audio_data is not None else None
+
+    cache_key = cache._generate_cache_key(text, voice_type, params)
+    (audio_data, debug_log), shared = flight.do(cache_key, run, lookup)
+    if shared:
+        debug_log = _follower_log(debug_log)
+    return audio_data, debug_log, shared
+
+
+# 每个事件循环上进行中的异步合成（缓存键 -> Future），循环结束后随之回收
+_async_flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = \
+    weakref.WeakKeyDictionary()
+
+
+async def synthesize_cached_async(speech_service, text: str, voice_type: str = "default",
+                                  quality: str = "draft", emotion: str = "neutral",
+                                  cache: Optional[TTSCache] = None) -> Tuple[bytes, Dict[str, Any], bool]:
+    """
+    synthesize_cached 的 asyncio 版本（speech_service 需提供 synthesize_async）
+
+    同一事件循环上相同缓存键的并发调用只合成一次；不获取进程间的合成锁，其他进程已完成的结果仍能通过缓存命中复用。
+    缓存读写会等待缓存索引的文件锁（其他进程压缩时）并读写磁盘，放到线程池中执行，不阻塞事件循环。
+
+    Returns:
+        (音频数据, 调试信息, 是否来自缓存或其他并发请求)
+    """
+    if cache is None:
+        cache = get_tts_cache()
+
+    params = build_cache_params(speech_service, quality, emotion)
+
+    cached = await asyncio.to_thread(cache.get, text, voice_type, params)
+    if cached is not None:
+        return cached, {"cache": "hit"}, True
+
+    cache_key = cache._generate_cache_key(text, voice_type, params)
+    flights = _async_flights.setdefault(asyncio.get_running_loop(), {})
+    flight = flights.get(cache_key)
+    if flight is not None:
+        audio_data, debug_log = await asyncio.shield(flight)
+        return audio_data, _follower_log(debug_log), True
+
+    flight = flights[cache_key] = asyncio.get_running_loop().create_future()
+    try:
+        audio_data, debug_log = await speech_service.synthesize_async(
+            text, voice_type=voice_type, emotion=emotion, quality=quality
+        )
+        await asyncio.to_thread(cache.set, text, audio_data, voice_type, params)
+        flight.set_result((audio_data, debug_log))
+        return audio_data, debug_log, False
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except BaseException as e:
+        flight.set_exception(e)
+        flight.exception()  # 没有跟随者时也不报 "exception was never retrieved"
+        raise
+    finally:
+        flights.pop(cache_key, None)
+
+
+def synthesize_segmented(speech_service: SpeechSynthesizer, text: str, voice_type: str = "default",
+                         quality: str = "draft", emotion: str = "neutral",
+                         cache: Optional[TTSCache] = None,
+                         flight: Optional[SingleFlight] = None,
+                         max_workers: Optional[int] = None) -> Tuple[bytes, Dict[str, Any], Dict[str, int]]:
+    """
+    分段缓存的长文本合成
+
+    文本按句切分后每段单独缓存，只合成缺失的分段，再把各段PCM直接拼接成一个WAV。
+
+    Args:
+        speech_service: 语音合成服务实例
+        text: 要合成的文本
+        voice_type: 音色类型
+        quality: 音质
+        emotion: 情感
+        cache: TTS缓存实例，默认使用全局实例
+        flight: 并发合并器，默认使用全局实例
+        max_workers: 并行合成的分段数，默认读取 TTS_SEGMENT_CONCURRENCY
+
+    Returns:
+        (音频数据, 调试信息, 分段统计 {"total": 分段数, "from_cache": 缓存命中的分段数})
+    """
+    segments = segment_text(text)
+    if max_workers is None:
+        max_workers = int(os.getenv('TTS_SEGMENT_CONCURRENCY', '4'))
+
+    def run(segment: str):
+        return synthesize_cached(speech_service, segment, voice_type=voice_type, quality=quality,
+                                 emotion=emotion, cache=cache, flight=flight)
+
+    if len(segments) <= 1 or max_workers <= 1:
+        results = [run(segment) for segment in segments]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(segments))) as executor:
+            results = list(executor.map(run, segments))
+
+    audio_data = stitch_wavs([audio for audio, _, _ in results])
+    segment_stats = {
+        "total": len(segments),
+        "from_cache": sum(1 for _, log, _ in results if log.get("cache") == "hit")
+    }
+    debug_log = {
+        "segments": [
+            {"chars": len(segment), "from_cache": log.get("cache") == "hit", **{k: v for k, v in log.items() if k != "cache"}}
+            for segment, (_, log, _) in zip(segments, results)
+        ],
+        "final_audio_size": len(audio_data)
+    }
+    return audio_data, debug_log, segment_stats
+
+
+# 全局实例
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> SingleFlight:
+    """获取全局并发合并器实例（锁文件放在缓存目录下）；并发首次调用也只创建一个，保证同键只有一个 leader"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(str(get_tts_cache().cache_dir / 'inflight'))
+    return _single_flight
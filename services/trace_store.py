@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.logger_setup import truncate_and_sample
+
+# 超过该长度的字符串/字节（如 base64 音频）只保留长度
+TRACE_MAX_STRING = 256
+# 会被建立索引的标识字段
+_REQID_KEYS = ("reqid", "task_id")
+
+
+def strip_payloads(value: Any, field_name: str = "data") -> Any:
+    """复制调试信息，超长字符串/字节替换为 {"byte_len": ...}（DEBUG_VERBOSE 时附带首尾样本）"""
+    if isinstance(value, dict):
+        return {key: strip_payloads(item, str(key)) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [strip_payloads(item, field_name) for item in value]
+    if isinstance(value, (str, bytes)) and len(value) > TRACE_MAX_STRING:
+        return truncate_and_sample(value, field_name=field_name)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _collect_ids(value: Any, keys: tuple, found: set):
+    """递归收集调试信息中指定键的字符串值（分段合成时每段各有 job_id / reqid）"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in keys and isinstance(item, str) and item:
+                found.add(item)
+            else:
+                _collect_ids(item, keys, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_ids(item, keys, found)
+
+
+class TraceStore:
+    """
+    最近若干次语音合成的调试信息
+
+    - 按记录顺序保存，总条数不超过 max_entries、序列化后总字节数不超过 max_bytes，超出时淘汰最旧的
+    - 保存前去掉大负载（response_body 中的 base64 音频等只保留长度）
+    - 按 job_id、reqid、音色、结果（ok / error）建立索引，可组合过滤
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('TTS_TRACE_MAX', '200'))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('TTS_TRACE_BUDGET_KB', '512')) * 1024
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._indexes: Dict[str, Dict[str, set]] = {"job_id": {}, "reqid": {}, "voice": {}, "outcome": {}}
+        self._next_seq = 0
+        self._total_bytes = 0
+        self.evicted = 0
+
+    def _index_keys(self, entry: Dict[str, Any]):
+        yield "voice", entry["voice"]
+        yield "outcome", entry["outcome"]
+        for job_id in entry["job_ids"]:
+            yield "job_id", job_id
+        for reqid in entry["reqids"]:
+            yield "reqid", reqid
+
+    def add(self, debug_log: Optional[Dict[str, Any]], voice: str, outcome: str,
+            trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        记录一次合成的调试信息
+
+        Args:
+            debug_log: 适配器/合成流程返回的调试信息（不会被修改）
+            voice: 音色
+            outcome: "ok" 或 "error"
+            trace_id: 返回给客户端的 X-Trace-Id
+
+        Returns:
+            保存的条目（去掉大负载后的副本）
+        """
+        stripped = strip_payloads(debug_log or {})
+        job_ids, reqids = set(), set()
+        _collect_ids(stripped, ("job_id",), job_ids)
+        _collect_ids(stripped, _REQID_KEYS, reqids)
+        trace_id = trace_id or stripped.get("trace_id") or stripped.get("job_id")
+        if trace_id:
+            job_ids.add(trace_id)  # 客户端拿到的 X-Trace-Id 也可以按 job_id 查询
+        entry = {
+            "trace_id": trace_id,
+            "recorded_at": round(time.time(), 3),
+            "voice": voice or "",
+            "outcome": outcome,
+            "job_ids": sorted(job_ids),
+            "reqids": sorted(reqids),
+            "debug_log": stripped
+        }
+        size = len(json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8'))
+        entry["size_bytes"] = size
+
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._traces[seq] = entry
+            self._total_bytes += size
+            for name, value in self._index_keys(entry):
+                self._indexes[name].setdefault(value, set()).add(seq)
+            # 最新一条总是保留（即使单条就超出预算）
+            while len(self._traces) > 1 and (len(self._traces) > self.max_entries or self._total_bytes > self.max_bytes):
+                self._evict_oldest()
+        return entry
+
+    def _evict_oldest(self):
+        seq, entry = self._traces.popitem(last=False)
+        self._total_bytes -= entry["size_bytes"]
+        self.evicted += 1
+        for name, value in self._index_keys(entry):
+            seqs = self._indexes[name].get(value)
+            if seqs is not None:
+                seqs.discard(seq)
+                if not seqs:
+                    del self._indexes[name][value]
+
+    def query(self, job_id: Optional[str] = None, reqid: Optional[str] = None, voice: Optional[str] = None,
+              outcome: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """按条件过滤（条件之间为“且”），最新的在前"""
+        filters = {"job_id": job_id, "reqid": reqid, "voice": voice, "outcome": outcome}
+        with self._lock:
+            matched = None
+            for name, value in filters.items():
+                if not value:
+                    continue
+                seqs = self._indexes[name].get(value, set())
+                matched = set(seqs) if matched is None else matched & seqs
+            if matched is None:
+                seqs = reversed(self._traces)
+            else:
+                seqs = sorted(matched, reverse=True)
+            result = []
+            for seq in seqs:
+                if len(result) >= limit:
+                    break
+                result.append(self._traces[seq])
+            return result
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._traces:
+                return None
+            return next(reversed(self._traces.values()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._traces),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted
+            }
@@ -0,0 +1,101 @@
+import struct
+from typing import List, Tuple, NamedTuple
+
+
+class WavFormat(NamedTuple):
+    """WAV fmt 块中决定 PCM 能否直接拼接的字段"""
+    audio_format: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+
+
+def read_wav_pcm(data: bytes) -> Tuple[WavFormat, memoryview]:
+    """
+    解析WAV容器，返回格式信息和 data 块的 PCM 视图（不拷贝、不解码）
+
+    Args:
+        data: 完整的WAV文件字节
+
+    Returns:
+        (格式信息, PCM数据的 memoryview)
+
+    Raises:
+        ValueError: 不是合法的WAV数据时
+    """
+    if len(data) < 12 or data[0:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError("Not a RIFF/WAVE stream")
+
+    view = memoryview(data)
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack_from('<I', data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', data, body)
+            fmt = WavFormat(audio_format, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # 流式输出的WAV可能把 data 长度写成 0 或 0xFFFFFFFF，以实际长度为准
+            end = len(data) if chunk_size in (0, 0xFFFFFFFF) else min(len(data), body + chunk_size)
+            return fmt, view[body:end]
+        # 块按偶数字节对齐
+        pos = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV stream has no data chunk")
+
+
+def build_wav(fmt: WavFormat, pcm_chunks: List[memoryview]) -> bytes:
+    """
+    用一个新的 RIFF 头包装多段 PCM 数据
+
+    Args:
+        fmt: 所有分段共享的格式
+        pcm_chunks: PCM 数据片段
+
+    Returns:
+        完整的WAV文件字节
+    """
+    data_size = sum(len(chunk) for chunk in pcm_chunks)
+    block_align = fmt.channels * fmt.bits_per_sample // 8
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, fmt.audio_format, fmt.channels, fmt.sample_rate,
+        fmt.sample_rate * block_align, block_align, fmt.bits_per_sample,
+        b'data', data_size
+    )
+    return b''.join([header, *pcm_chunks])
+
+
+def stitch_wavs(segments: List[bytes]) -> bytes:
+    """
+    按顺序拼接多个WAV，只复制PCM字节，不重新解码/编码
+
+    Args:
+        segments: WAV文件字节列表
+
+    Returns:
+        拼接后的WAV文件字节
+
+    Raises:
+        ValueError: 没有分段或分段格式不一致时
+    """
+    if not segments:
+        raise ValueError("Cannot stitch an empty list of WAV segments")
+    if len(segments) == 1:
+        return segments[0]
+
+    fmt = None
+    chunks = []
+    for segment in segments:
+        seg_fmt, pcm = read_wav_pcm(segment)
+        if fmt is None:
+            fmt = seg_fmt
+        elif seg_fmt != fmt:
+            raise ValueError(f"Cannot stitch WAV segments with different formats: {fmt} vs {seg_fmt}")
+        chunks.append(pcm)
+    return build_wav(fmt, chunks)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+负载曲线到达时间测试（不需要启动服务）
+
+用法:
+    python test_load_profile.py    # 或 python -m pytest test_load_profile.py
+
+检查 load_test.py 各负载曲线生成的请求数与到达率曲线的积分一致，
+包括从0开始的爬坡（到达率为0的时段不应发出请求，也不应跳过整个测试）。
+"""
+
+import sys
+import random
+import argparse
+
+from load_test import arrival_times, build_profile
+
+
+def _count(poisson=False, seed=1, **overrides):
+    options = dict(profile='constant', rate=5.0, to_rate=None, duration=120.0,
+                   step_rate=5.0, step_seconds=30.0, steps=4)
+    options.update(overrides)
+    rate, duration, _ = build_profile(argparse.Namespace(**options))
+    times = list(arrival_times(rate, duration, poisson, random.Random(seed)))
+    assert times == sorted(times) and all(0 < t < duration for t in times)
+    return len(times)
+
+
+def test_ramp_from_zero():
+    # ∫0→40 线性爬坡 120 秒 = 2400 个请求
+    assert abs(_count(profile='ramp', rate=0.0, to_rate=40.0) - 2400) <= 1
+
+
+def test_ramp_from_zero_poisson():
+    count = _count(poisson=True, profile='ramp', rate=0.0, to_rate=40.0)
+    assert abs(count - 2400) <= 4 * 2400 ** 0.5
+
+
+def test_ramp_down_to_zero():
+    assert abs(_count(profile='ramp', rate=40.0, to_rate=0.0) - 2400) <= 1
+
+
+def test_constant():
+    assert abs(_count(profile='constant', rate=10.0) - 1200) <= 1
+
+
+def test_step():
+    # 5、10、15、20 每级30秒
+    assert abs(_count(profile='step', rate=5.0, step_rate=5.0, step_seconds=30.0, steps=4) - 1500) <= 1
+
+
+def test_zero_rate():
+    assert _count(profile='constant', rate=0.0) == 0
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} {e}")
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()